@@ -0,0 +1,197 @@
+"""
+Load benchmark of the Flask app against its ASGI variant.
+
+Starts each server in a child process with a synthetic catalogue, then
+opens many concurrent keep-alive connections that send GET /products/<id>
+and GET /products?limit=20 requests (and, with --write-ratio, PUT
+/products/<id> updates) for a fixed time. Prints requests/sec and latency
+percentiles per server. The Flask app runs on Werkzeug's threaded server,
+the ASGI app on uvicorn, which must be installed.
+
+The load generator is a single asyncio process; with thousands of
+connections it may need its own core, and the open-file limit is raised
+to fit the connections.
+
+    python benchmarks/bench_asgi.py --connections 2000 --seconds 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+SERVERS = ('flask', 'asgi')
+
+
+def serve(server, port, products):
+    """
+    Runs one of the servers over a synthetic catalogue. Called in the child
+    process.
+    """
+    from scripts.inventory_man import Product
+    if server == 'flask':
+        import logging
+        from werkzeug.serving import WSGIRequestHandler, run_simple
+        from scripts.app import app, inventory
+        inventory.add_products([Product(i, f"Item {i}", "Benchmark", 1.0, 1) for i in range(products)])
+        # Keep connections alive as the ASGI server does
+        WSGIRequestHandler.protocol_version = 'HTTP/1.1'
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+        run_simple('127.0.0.1', port, app, threaded=True)
+    else:
+        import uvicorn
+        from scripts.asgi_app import app, inventory
+        inventory.add_products([Product(i, f"Item {i}", "Benchmark", 1.0, 1) for i in range(products)])
+        uvicorn.run(app, host='127.0.0.1', port=port, log_level='warning', backlog=4096)
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else float('nan')
+
+
+async def wait_until_up(port, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        except OSError:
+            await asyncio.sleep(0.1)
+            continue
+        writer.close()
+        return
+    raise RuntimeError(f"Server on port {port} did not start")
+
+
+async def send_request(reader, writer, method, path, body=None):
+    """
+    Sends one HTTP/1.1 request and reads the response.
+
+    Returns
+    -------
+    tuple
+        ``(status, keep_alive)``.
+    """
+    payload = json.dumps(body).encode() if body is not None else b''
+    head = f"{method} {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Length: {len(payload)}\r\n"
+    if payload:
+        head += "Content-Type: application/json\r\n"
+    writer.write(head.encode() + b"\r\n" + payload)
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionResetError("Connection closed")
+    length = None
+    keep_alive = status_line.startswith(b'HTTP/1.1')
+    chunked = False
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        name = name.strip().lower()
+        value = value.strip().lower()
+        if name == 'content-length':
+            length = int(value)
+        elif name == 'connection':
+            keep_alive = value != 'close'
+        elif name == 'transfer-encoding':
+            chunked = value == 'chunked'
+    if chunked:
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif length is not None:
+        await reader.readexactly(length)
+    else:
+        await reader.read()
+        keep_alive = False
+    return int(status_line.split()[1]), keep_alive
+
+
+async def load(port, connections, seconds, products, write_ratio):
+    latencies = []
+    errors = 0
+    deadline = time.monotonic() + seconds
+
+    async def client(n):
+        nonlocal errors
+        rng = random.Random(n)
+        connection = None
+        while time.monotonic() < deadline:
+            product_id = rng.randrange(products)
+            if write_ratio and rng.random() < write_ratio:
+                request = ('PUT', f'/products/{product_id}', {'quantity': rng.randrange(1, 100)})
+            elif rng.random() < 0.5:
+                request = ('GET', f'/products/{product_id}', None)
+            else:
+                request = ('GET', f'/products?limit=20&offset={product_id % 1000}', None)
+            try:
+                if connection is None:
+                    connection = await asyncio.open_connection('127.0.0.1', port)
+                start = time.perf_counter()
+                status, keep_alive = await send_request(*connection, *request)
+                latencies.append(time.perf_counter() - start)
+                if status >= 500:
+                    errors += 1
+            except (OSError, asyncio.IncompleteReadError, ValueError):
+                errors += 1
+                keep_alive = False
+            if not keep_alive and connection is not None:
+                connection[1].close()
+                connection = None
+        if connection is not None:
+            connection[1].close()
+
+    await asyncio.gather(*(client(n) for n in range(connections)))
+    latencies.sort()
+    return {
+        'requests_per_second': len(latencies) / seconds,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'errors': errors
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--products', type=int, default=100000)
+    parser.add_argument('--connections', type=int, default=2000)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--write-ratio', type=float, default=0.0,
+                        help="fraction of requests that are PUT /products/<id>")
+    parser.add_argument('--servers', default=','.join(SERVERS),
+                        help="comma-separated servers to benchmark: flask, asgi")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--serve', choices=SERVERS, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        return serve(args.serve, args.port, args.products)
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = min(hard, max(soft, args.connections + 256))
+    resource.setrlimit(resource.RLIMIT_NOFILE, (wanted, hard))
+
+    print(f"{'server':>7} {'req/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for server in args.servers.split(','):
+        child = subprocess.Popen([sys.executable, __file__, '--serve', server, '--port', str(args.port),
+                                  '--products', str(args.products)])
+        try:
+            asyncio.run(wait_until_up(args.port))
+            result = asyncio.run(load(args.port, args.connections, args.seconds, args.products, args.write_ratio))
+        finally:
+            child.terminate()
+            child.wait()
+        print(f"{server:>7} {result['requests_per_second']:>10,.0f} {result['p50_ms']:>8.2f} "
+              f"{result['p99_ms']:>8.2f} {result['errors']:>7}")
+
+
+if __name__ == '__main__':
+    main()
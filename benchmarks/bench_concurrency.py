@@ -0,0 +1,74 @@
+"""
+Stress benchmark for a thread-safe Inventory.
+
+Runs get_product lookups (and, with --write-ratio, update_product calls) on
+1, 2, 4, ... threads for a fixed time each and prints the throughput per
+thread count. On a GIL build of CPython the threads share one core, so the
+numbers show the locking overhead rather than parallel speedup; on a
+free-threaded build read throughput scales with the thread count.
+
+    python benchmarks/bench_concurrency.py --products 100000 --max-threads 8
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from scripts.inventory_man import Product, Inventory
+
+
+def run(inventory, products, threads, seconds, write_ratio):
+    stop = threading.Event()
+    counts = [0] * threads
+
+    def worker(n):
+        rng = random.Random(n)
+        done = 0
+        while not stop.is_set():
+            for _ in range(1000):
+                product_id = rng.randrange(products)
+                if write_ratio and rng.random() < write_ratio:
+                    inventory.update_product(product_id, quantity=rng.randrange(1, 100))
+                else:
+                    inventory.get_product(product_id)
+            done += 1000
+        counts[n] = done
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for thread in workers:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in workers:
+        thread.join()
+    return sum(counts) / seconds
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--products', type=int, default=100000)
+    parser.add_argument('--max-threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=2.0)
+    parser.add_argument('--write-ratio', type=float, default=0.0,
+                        help="fraction of operations that are update_product calls")
+    args = parser.parse_args(argv)
+
+    inventory = Inventory(thread_safe=True)
+    inventory.add_products([Product(i, f"Item {i}", "Benchmark", 1.0, 1) for i in range(args.products)])
+
+    threads = 1
+    baseline = None
+    print(f"{'threads':>7} {'ops/s':>12} {'speedup':>8}")
+    while threads <= args.max_threads:
+        throughput = run(inventory, args.products, threads, args.seconds, args.write_ratio)
+        baseline = baseline or throughput
+        print(f"{threads:>7} {throughput:>12,.0f} {throughput / baseline:>8.2f}")
+        threads *= 2
+
+
+if __name__ == '__main__':
+    main()
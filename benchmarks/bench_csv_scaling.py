@@ -0,0 +1,86 @@
+"""
+Scaling benchmark for parallel CSV saves and loads.
+
+Saves a synthetic catalogue to CSV and loads it back with 1 to N worker
+processes (the number of CPUs by default), reporting the best time of each
+and the speedup over one worker. Some descriptions hold quotes and
+newlines, so the loads also exercise splitting the file at quoted record
+boundaries. Every save is checked to write the same file:
+
+    python benchmarks/bench_csv_scaling.py --skus 2000000 --workers 1,2,4,8
+"""
+import argparse
+import filecmp
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from scripts.inventory_man import Product, Supplier, Inventory
+from scripts.columnar import ColumnarProductStore
+
+ADJECTIVES = ['red', 'blue', 'steel', 'compact', 'wireless', 'heavy', 'organic', 'smart', 'vintage', 'portable']
+NOUNS = ['widget', 'gadget', 'lamp', 'chair', 'kettle', 'drill', 'cable', 'speaker', 'bottle', 'monitor']
+
+
+def make_inventory(skus, store):
+    inventory = Inventory(product_store=ColumnarProductStore() if store == 'columnar' else None)
+    inventory.add_products([
+        Product(i, f"{ADJECTIVES[i % 10]} {NOUNS[i // 10 % 10]} {i}",
+                f'A "{ADJECTIVES[i // 7 % 10]}" {NOUNS[i % 10]},\nfor everyday use' if i % 100 == 0
+                else f"A {ADJECTIVES[i // 7 % 10]} {NOUNS[i % 10]} for everyday use",
+                round(1 + i % 500 * 0.99, 2), i % 1000)
+        for i in range(1, skus + 1)
+    ])
+    inventory.add_supplier(Supplier(1, "SupplierCo", "supplier@example.com"))
+    return inventory
+
+
+def best_of(repeat, run):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time CSV saves and loads across numbers of worker processes.")
+    parser.add_argument('--skus', type=int, default=1000000, help="Number of products.")
+    parser.add_argument('--workers', default=','.join(str(n) for n in range(1, (os.cpu_count() or 1) + 1)),
+                        help="Comma-separated numbers of workers to time.")
+    parser.add_argument('--store', choices=('memory', 'columnar'), default='memory')
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per measurement; the best is kept.")
+    args = parser.parse_args(argv)
+    counts = [int(n) for n in args.workers.split(',')]
+
+    inventory = make_inventory(args.skus, args.store)
+    directory = tempfile.mkdtemp()
+    try:
+        product_file = os.path.join(directory, 'products.csv')
+        supplier_file = os.path.join(directory, 'suppliers.csv')
+        reference = os.path.join(directory, 'reference.csv')
+        inventory.save_to_csv(reference, supplier_file)
+        size = os.path.getsize(reference)
+        print(f"{args.skus} SKUs, {size / 2 ** 20:.0f} MiB, {os.cpu_count()} CPUs, {args.store} store")
+        print(f"{'workers':>7} {'save s':>8} {'speedup':>8} {'load s':>8} {'speedup':>8}")
+        base = None
+        for workers in counts:
+            save = best_of(args.repeat, lambda: inventory.save_to_csv(product_file, supplier_file, workers=workers))
+            if not filecmp.cmp(product_file, reference, shallow=False):
+                raise SystemExit(f"The save with {workers} workers differs from the single-process one")
+            load = best_of(args.repeat, lambda: make_inventory(0, args.store).load_from_csv(
+                product_file, supplier_file, workers=workers))
+            if base is None:
+                base = (save, load)
+            print(f"{workers:>7} {save:>8.2f} {base[0] / save:>7.2f}x {load:>8.2f} {base[1] / load:>7.2f}x")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Startup benchmark for lazily loaded products.
+
+Saves a synthetic catalogue as CSV files and a snapshot, then loads each
+eagerly and into a LazyProductStore, reporting the load time, the memory
+held afterwards (traced with tracemalloc) and the time of cold and cached
+lookups:
+
+    python benchmarks/bench_lazy.py --skus 1000000 --cache-size 10000
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from scripts.inventory_man import Product, Supplier, Inventory
+from scripts.lazy import LazyProductStore
+
+
+def make_inventory(skus):
+    inventory = Inventory()
+    inventory.add_products([
+        Product(i, f"Product {i}", f"Description of product {i % 1000}", round(1 + i % 500 * 0.99, 2), i % 1000)
+        for i in range(1, skus + 1)
+    ])
+    inventory.add_supplier(Supplier(1, "SupplierCo", "supplier@example.com"))
+    return inventory
+
+
+def measure(label, make, load, lookups):
+    tracemalloc.start()
+    start = time.perf_counter()
+    inventory = make()
+    load(inventory)
+    seconds = time.perf_counter() - start
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    timings = []
+    for _ in range(2):
+        start = time.perf_counter()
+        for product_id in lookups:
+            inventory.get_product(product_id)
+        timings.append((time.perf_counter() - start) / len(lookups))
+    print(f"{label:<16} {seconds:>8.2f} {held / 2 ** 20:>10.1f} {timings[0] * 1e6:>10.1f} {timings[1] * 1e6:>10.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare eager and lazy loading of the products.")
+    parser.add_argument('--skus', type=int, default=1000000, help="Number of products.")
+    parser.add_argument('--cache-size', type=int, default=10000, help="Products cached by the lazy store.")
+    parser.add_argument('--lookups', type=int, default=1000, help="Random products looked up after loading.")
+    args = parser.parse_args(argv)
+
+    directory = tempfile.mkdtemp()
+    try:
+        product_file = os.path.join(directory, 'products.csv')
+        supplier_file = os.path.join(directory, 'suppliers.csv')
+        snapshot = os.path.join(directory, 'inventory.snap')
+        inventory = make_inventory(args.skus)
+        inventory.save_to_csv(product_file, supplier_file)
+        inventory.save_snapshot(snapshot)
+        del inventory
+        lookups = random.Random(1).sample(range(1, args.skus + 1), min(args.lookups, args.skus))
+
+        print(f"{args.skus} SKUs, cache of {args.cache_size}")
+        print(f"{'load':<16} {'seconds':>8} {'held MiB':>10} {'cold us':>10} {'cached us':>10}")
+        lazy = lambda: Inventory(product_store=LazyProductStore(args.cache_size))
+        measure('csv, eager', Inventory, lambda inv: inv.load_from_csv(product_file, supplier_file), lookups)
+        measure('csv, lazy', lazy, lambda inv: inv.load_from_csv(product_file, supplier_file), lookups)
+        measure('snapshot, eager', Inventory, lambda inv: inv.load_snapshot(snapshot), lookups)
+        measure('snapshot, lazy', lazy, lambda inv: inv.load_snapshot(snapshot), lookups)
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
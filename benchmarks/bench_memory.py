@@ -0,0 +1,135 @@
+"""
+Memory benchmark for the Product and Supplier objects.
+
+Builds a catalogue of synthetic products and suppliers the way a CSV load
+does, with every row's strings parsed into new string objects, and measures
+the memory it takes per SKU and per supplier with tracemalloc. The current
+slotted classes, which share repeated descriptions and contact info, are
+compared with the former layout: plain classes with a per-instance
+``__dict__``, their own copy of every string and an empty
+``supplied_products`` list per supplier. The columnar product store is
+measured too, for reference:
+
+    python benchmarks/bench_memory.py --skus 1000000 --suppliers 10000
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from scripts.columnar import ColumnarProductStore
+from scripts.inventory_man import Product, ProductStore, KeyedStore, Supplier
+
+ADJECTIVES = ['red', 'blue', 'steel', 'compact', 'wireless', 'heavy', 'organic', 'smart', 'vintage', 'portable']
+NOUNS = ['widget', 'gadget', 'lamp', 'chair', 'kettle', 'drill', 'cable', 'speaker', 'bottle', 'monitor']
+DOMAINS = ['example.com', 'example.org', 'example.net']
+
+
+class LegacyProduct:
+    # The layout of Product before it was slotted
+    def __init__(self, product_id, name, description, price, quantity):
+        self.product_id = product_id
+        self.name = name
+        self.description = description
+        self.price = price
+        self.quantity = quantity
+
+
+class LegacySupplier:
+    # The layout of Supplier before it was slotted
+    def __init__(self, supplier_id, name, contact_info):
+        self.supplier_id = supplier_id
+        self.name = name
+        self.contact_info = contact_info
+        self.supplied_products = []
+
+
+def product_rows(count, seed=0):
+    """
+    Yields the fields of ``count`` synthetic products. Descriptions repeat
+    across products, but each row gets its own string objects, as parsing
+    a CSV file gives.
+    """
+    rng = random.Random(seed)
+    for i in range(1, count + 1):
+        adjective = rng.choice(ADJECTIVES)
+        noun = rng.choice(NOUNS)
+        yield (i, f"{adjective} {noun} {i}", f"A {adjective} {noun} for everyday use",
+               round(rng.uniform(1, 500), 2), rng.randrange(0, 1000))
+
+
+def supplier_rows(count, seed=0):
+    """
+    Yields the fields of ``count`` synthetic suppliers, whose contact info
+    repeats across suppliers (e.g. a shared sales address).
+    """
+    rng = random.Random(seed)
+    for i in range(1, count + 1):
+        yield i, f"Supplier {i}", f"sales@{rng.choice(DOMAINS)}"
+
+
+def traced(build):
+    """
+    Returns the bytes still allocated after calling ``build`` (which must
+    return what it built, so it stays alive while measured).
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        built = build()
+        gc.collect()
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del built
+    return size
+
+
+def build_products(product_class, store, count):
+    def build():
+        products = store()
+        products.extend(product_class(*row) for row in product_rows(count))
+        return products
+    return build
+
+
+def build_columnar(count):
+    def build():
+        products = ColumnarProductStore()
+        products.extend_columns(*zip(*product_rows(count)))
+        return products
+    return build
+
+
+def build_suppliers(supplier_class, count):
+    def build():
+        suppliers = KeyedStore('supplier_id')
+        suppliers.extend(supplier_class(*row) for row in supplier_rows(count))
+        return suppliers
+    return build
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the memory per SKU and per supplier.")
+    parser.add_argument('--skus', type=int, default=200000, help="Number of products.")
+    parser.add_argument('--suppliers', type=int, default=10000, help="Number of suppliers.")
+    args = parser.parse_args(argv)
+
+    results = [
+        ('products', 'legacy objects', args.skus, traced(build_products(LegacyProduct, ProductStore, args.skus))),
+        ('products', 'slotted objects', args.skus, traced(build_products(Product, ProductStore, args.skus))),
+        ('products', 'columnar store', args.skus, traced(build_columnar(args.skus))),
+        ('suppliers', 'legacy objects', args.suppliers, traced(build_suppliers(LegacySupplier, args.suppliers))),
+        ('suppliers', 'slotted objects', args.suppliers, traced(build_suppliers(Supplier, args.suppliers))),
+    ]
+    print(f"{'records':<10} {'layout':<16} {'count':>10} {'total MiB':>10} {'bytes each':>11}")
+    for kind, layout, count, size in results:
+        print(f"{kind:<10} {layout:<16} {count:>10} {size / 2 ** 20:>10.1f} {size / count:>11.0f}")
+
+
+if __name__ == '__main__':
+    main()
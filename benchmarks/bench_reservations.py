@@ -0,0 +1,103 @@
+"""
+Contention benchmark for the atomic stock counters of an Inventory.
+
+Runs reserve/release pairs on 1, 2, 4, ... threads for a fixed time each,
+once with every thread hitting the same hot SKU and once with the threads
+spread over the whole catalogue, and prints the throughput per thread count.
+Each reserve is released again, so the stock ends where it started; the
+benchmark checks that no unit was lost or oversold. With --store sqlite the
+counters are conditional UPDATEs on a database file instead of in-memory
+objects.
+
+    python benchmarks/bench_reservations.py --max-threads 8 --store columnar
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from scripts.inventory_man import InsufficientStock, Product, Inventory
+
+STORES = ('memory', 'columnar', 'sqlite')
+
+
+def make_inventory(store, products, stock, directory):
+    if store == 'columnar':
+        from scripts.columnar import ColumnarProductStore
+        inventory = Inventory(product_store=ColumnarProductStore(), thread_safe=True)
+    elif store == 'sqlite':
+        from scripts.sqlite_store import SQLiteProductStore
+        inventory = Inventory(product_store=SQLiteProductStore(os.path.join(directory, 'inventory.db')),
+                              thread_safe=True)
+    else:
+        inventory = Inventory(thread_safe=True)
+    inventory.add_products([Product(i, f"Item {i}", "Benchmark", 1.0, stock) for i in range(products)])
+    return inventory
+
+
+def run(inventory, products, threads, seconds, hot):
+    stop = threading.Event()
+    counts = [0] * threads
+    refused = [0] * threads
+
+    def worker(n):
+        rng = random.Random(n)
+        done = 0
+        while not stop.is_set():
+            for _ in range(100):
+                product_id = 0 if hot else rng.randrange(products)
+                try:
+                    inventory.reserve(product_id, 1)
+                except InsufficientStock:
+                    refused[n] += 1
+                    continue
+                inventory.release(product_id, 1)
+            done += 100
+        counts[n] = done
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for thread in workers:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in workers:
+        thread.join()
+    return sum(counts) / seconds, sum(refused)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--products', type=int, default=10000)
+    parser.add_argument('--stock', type=int, default=1000,
+                        help="starting quantity of every product")
+    parser.add_argument('--max-threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=2.0)
+    parser.add_argument('--store', choices=STORES, default='memory')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        inventory = make_inventory(args.store, args.products, args.stock, directory)
+        print(f"{'sku':>6} {'threads':>7} {'pairs/s':>12} {'speedup':>8} {'refused':>8}")
+        for hot in (True, False):
+            threads = 1
+            baseline = None
+            while threads <= args.max_threads:
+                throughput, refused = run(inventory, args.products, threads, args.seconds, hot)
+                baseline = baseline or throughput
+                print(f"{'hot' if hot else 'spread':>6} {threads:>7} {throughput:>12,.0f} "
+                      f"{throughput / baseline:>8.2f} {refused:>8}")
+                threads *= 2
+
+        lost = args.products * args.stock - sum(inventory.products.columns()['quantity'])
+        if lost:
+            print(f"Stock is off by {lost} units")
+            return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
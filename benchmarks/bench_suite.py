@@ -0,0 +1,302 @@
+"""
+Benchmark suite for the Inventory and the REST API.
+
+Builds synthetic catalogues of each size (10k, 100k and 1M SKUs by default)
+and times the Inventory methods, from single-product lookups and updates to
+catalogue-wide price increases, listings and CSV saves and loads. It also
+times the main Flask routes through the test client over the same catalogue.
+For every benchmark it records the throughput, latency percentiles and the
+peak memory allocated by a separate, traced run (tracemalloc slows the
+calls down, so timing and memory are never measured together).
+
+The results are printed as a table and, with --output, written as JSON.
+Given a stored --baseline, the run is compared against it and every
+benchmark whose throughput, p99 latency or peak memory got worse by more
+than --threshold is flagged; the exit status is then 1. Two result files
+can also be compared without running anything:
+
+    python benchmarks/bench_suite.py --sizes 10000,100000 --output baseline.json
+    python benchmarks/bench_suite.py --sizes 10000,100000 --baseline baseline.json
+    python benchmarks/bench_suite.py --baseline baseline.json --results current.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from scripts.inventory_man import Product, Inventory
+
+ADJECTIVES = ['red', 'blue', 'steel', 'compact', 'wireless', 'heavy', 'organic', 'smart', 'vintage', 'portable']
+NOUNS = ['widget', 'gadget', 'lamp', 'chair', 'kettle', 'drill', 'cable', 'speaker', 'bottle', 'monitor']
+STORES = ('memory', 'columnar')
+
+# Differences in p99 latency (ms) and peak memory (bytes) up to which a
+# benchmark is not flagged, whatever the threshold: below them the timer
+# resolution and allocator noise dominate
+LATENCY_SLACK_MS = 0.05
+MEMORY_SLACK = 64 * 1024
+
+
+def make_products(start, count, seed=0):
+    """
+    Returns ``count`` synthetic products with IDs from ``start``.
+    """
+    rng = random.Random(seed)
+    return [
+        Product(i, f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {i}",
+                f"A {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} for everyday use",
+                round(rng.uniform(1, 500), 2), rng.randrange(0, 1000))
+        for i in range(start, start + count)
+    ]
+
+
+def make_inventory(store, products=(), **kwargs):
+    if store == 'columnar':
+        from scripts.columnar import ColumnarProductStore
+        kwargs['product_store'] = ColumnarProductStore()
+    inventory = Inventory(**kwargs)
+    inventory.add_products(products)
+    return inventory
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else float('nan')
+
+
+def measure(step, calls, memory_calls):
+    """
+    Times ``calls`` calls of ``step(i)``, then runs ``memory_calls`` more
+    with tracemalloc to find the peak memory they allocate.
+
+    Returns
+    -------
+    dict
+        Number of calls, total seconds, calls per second, latency
+        percentiles in milliseconds and peak memory in bytes.
+    """
+    latencies = []
+    clock = time.perf_counter
+    total_start = clock()
+    for i in range(calls):
+        start = clock()
+        step(i)
+        latencies.append(clock() - start)
+    seconds = clock() - total_start
+
+    peak = 0
+    if memory_calls:
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        for i in range(calls, calls + memory_calls):
+            step(i)
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+        tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        'calls': calls,
+        'seconds': seconds,
+        'throughput': calls / seconds if seconds else float('inf'),
+        'latency_ms': {
+            'p50': percentile(latencies, 0.50) * 1000,
+            'p90': percentile(latencies, 0.90) * 1000,
+            'p99': percentile(latencies, 0.99) * 1000,
+            'max': latencies[-1] * 1000
+        },
+        'peak_memory_bytes': max(peak, 0)
+    }
+
+
+def inventory_benchmarks(inventory, size, samples, repeat, directory, store):
+    """
+    Yields ``(name, step, calls, memory_calls)`` for the Inventory methods.
+    Each step is called with consecutive indexes, and the steps that add
+    and remove products touch the same new IDs, so the catalogue keeps its
+    size.
+    """
+    memory_samples = min(samples, 100)
+    rng = random.Random(1)
+    ids = [rng.randrange(size) for _ in range(samples + memory_samples)]
+    new_products = make_products(size, samples + memory_samples, seed=2)
+    product_file = os.path.join(directory, 'products.csv')
+    supplier_file = os.path.join(directory, 'suppliers.csv')
+
+    yield 'add_product', lambda i: inventory.add_product(new_products[i]), samples, memory_samples
+    yield 'get_product', lambda i: inventory.get_product(ids[i]), samples, memory_samples
+    yield 'update_product', lambda i: inventory.update_product(ids[i], quantity=i), samples, memory_samples
+    yield 'remove_product', lambda i: inventory.remove_product(size + i), samples, memory_samples
+    yield 'increase_price', lambda i: inventory.increase_price(0.1), repeat, 1
+    yield 'get_all_products', lambda i: inventory.get_all_products(), repeat, 1
+    yield 'save_to_csv', lambda i: inventory.save_to_csv(product_file, supplier_file), repeat, 1
+    yield 'load_from_csv', lambda i: make_inventory(store).load_from_csv(product_file, supplier_file), repeat, 1
+
+
+def route_benchmarks(client, size, samples, repeat):
+    """
+    Yields ``(name, step, calls, memory_calls)`` for the main routes.
+    """
+    memory_samples = min(samples, 100)
+    rng = random.Random(3)
+    ids = [rng.randrange(size) for _ in range(samples + memory_samples)]
+    new_products = [p.to_dict() for p in make_products(size, samples + memory_samples, seed=4)]
+    words = [rng.choice(NOUNS) for _ in range(samples + memory_samples)]
+    # Build the lazily created indexes outside the timings
+    client.get('/products?sort=price&limit=1')
+    client.get('/products/search?q=warmup')
+
+    def call(method, path, **kwargs):
+        response = client.open(path, method=method, **kwargs)
+        if response.status_code >= 400:
+            raise RuntimeError(f"{method} {path} answered {response.status_code}")
+
+    yield ('POST /products', lambda i: call('POST', '/products', json=new_products[i]),
+           samples, memory_samples)
+    yield 'GET /products/<id>', lambda i: call('GET', f'/products/{ids[i]}'), samples, memory_samples
+    yield ('PUT /products/<id>', lambda i: call('PUT', f'/products/{ids[i]}', json={'quantity': i + 1}),
+           samples, memory_samples)
+    yield ('GET /products?sort=price', lambda i: call('GET', f'/products?sort=price&limit=100&offset={i}'),
+           samples, memory_samples)
+    yield 'GET /products/search', lambda i: call('GET', f'/products/search?q={words[i]}'), samples, memory_samples
+    yield 'DELETE /products/<id>', lambda i: call('DELETE', f'/products/{size + i}'), samples, memory_samples
+    yield 'GET /export/products', lambda i: client.get('/export/products').get_data(), repeat, 1
+
+
+def run(sizes, store, samples, repeat, routes, report):
+    results = []
+    for size in sizes:
+        directory = tempfile.mkdtemp()
+        try:
+            inventory = make_inventory(store, make_products(0, size))
+            for name, step, calls, memory_calls in inventory_benchmarks(inventory, size, samples, repeat,
+                                                                        directory, store):
+                result = dict(size=size, name=f'inventory.{name}', **measure(step, calls, memory_calls))
+                report(result)
+                results.append(result)
+            del inventory
+
+            if routes:
+                # Imported here so the app's inventory is only built when needed
+                import scripts.app as app
+                app.inventory.load_from_csv(os.path.join(directory, 'products.csv'),
+                                            os.path.join(directory, 'suppliers.csv'))
+                client = app.app.test_client()
+                for name, step, calls, memory_calls in route_benchmarks(client, size, samples, repeat):
+                    result = dict(size=size, name=name, **measure(step, calls, memory_calls))
+                    report(result)
+                    results.append(result)
+        finally:
+            shutil.rmtree(directory)
+    return results
+
+
+def compare(baseline, results, threshold):
+    """
+    Compares results with a baseline.
+
+    Returns
+    -------
+    list
+        One ``(result, base, regressions)`` tuple per result that has a
+        baseline, where ``regressions`` names the metrics that got worse by
+        more than ``threshold``.
+    """
+    baselines = {(result['size'], result['name']): result for result in baseline}
+    rows = []
+    for result in results:
+        base = baselines.get((result['size'], result['name']))
+        if base is None:
+            continue
+        regressions = []
+        if result['throughput'] < base['throughput'] * (1 - threshold):
+            regressions.append('throughput')
+        if result['latency_ms']['p99'] > base['latency_ms']['p99'] * (1 + threshold) + LATENCY_SLACK_MS:
+            regressions.append('p99')
+        if result['peak_memory_bytes'] > base['peak_memory_bytes'] * (1 + threshold) + MEMORY_SLACK:
+            regressions.append('memory')
+        rows.append((result, base, regressions))
+    return rows
+
+
+def print_result(result):
+    latency = result['latency_ms']
+    print(f"{result['size']:>9} {result['name']:<28} {result['throughput']:>12,.1f} {latency['p50']:>9.3f} "
+          f"{latency['p99']:>9.3f} {result['peak_memory_bytes'] / 1024:>11,.1f}", flush=True)
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='10000,100000,1000000',
+                        help="comma-separated catalogue sizes")
+    parser.add_argument('--store', choices=STORES, default='memory')
+    parser.add_argument('--samples', type=int, default=1000,
+                        help="timed calls of each single-product benchmark")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="timed calls of each catalogue-wide benchmark")
+    parser.add_argument('--no-routes', action='store_true', help="only benchmark the Inventory methods")
+    parser.add_argument('--output', help="file to write the results to as JSON")
+    parser.add_argument('--baseline', help="results file to compare against")
+    parser.add_argument('--results', help="results file to compare instead of running the benchmarks")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="relative change above which a metric counts as regressed")
+    args = parser.parse_args(argv)
+
+    if args.results:
+        if not args.baseline:
+            parser.error("--results needs a --baseline to compare against")
+        with open(args.results) as f:
+            data = json.load(f)
+    else:
+        print(f"{'size':>9} {'benchmark':<28} {'calls/s':>12} {'p50 ms':>9} {'p99 ms':>9} {'peak KiB':>11}")
+        sizes = [int(size) for size in args.sizes.split(',')]
+        data = {
+            'meta': {
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                'revision': git_revision(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'store': args.store,
+                'samples': args.samples,
+                'repeat': args.repeat
+            },
+            'results': run(sizes, args.store, args.samples, args.repeat, not args.no_routes, print_result)
+        }
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(data, f, indent=2)
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    rows = compare(baseline['results'], data['results'], args.threshold)
+    print(f"\n{'size':>9} {'benchmark':<28} {'base calls/s':>12} {'calls/s':>12} {'base p99':>9} {'p99 ms':>9} "
+          f"{'base KiB':>11} {'peak KiB':>11}  status")
+    for result, base, regressions in rows:
+        print(f"{result['size']:>9} {result['name']:<28} {base['throughput']:>12,.1f} {result['throughput']:>12,.1f} "
+              f"{base['latency_ms']['p99']:>9.3f} {result['latency_ms']['p99']:>9.3f} "
+              f"{base['peak_memory_bytes'] / 1024:>11,.1f} {result['peak_memory_bytes'] / 1024:>11,.1f}  "
+              f"{'REGRESSED ' + ','.join(regressions) if regressions else 'ok'}")
+    regressed = sum(1 for _, _, regressions in rows if regressions)
+    print(f"\n{regressed} of {len(rows)} benchmarks regressed by more than {args.threshold:.0%}")
+    return 1 if regressed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
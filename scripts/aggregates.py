@@ -0,0 +1,233 @@
+import math
+import threading
+from operator import mul
+
+# Quantities below which a product counts as low on stock in the
+# aggregates; below 1 means out of stock
+LOW_STOCK_THRESHOLDS = (1, 10)
+
+
+class AggregateMismatch(AssertionError):
+    """
+    Raised when running aggregates differ from the ones recomputed from
+    scratch.
+
+    Attributes
+    ----------
+    field : str
+        Name of the aggregate that differs.
+    running, expected : object
+        The running and the recomputed value.
+    """
+    def __init__(self, field, running, expected):
+        super().__init__(f"Aggregate {field!r} is {running!r}, recomputed {expected!r}")
+        self.field = field
+        self.running = running
+        self.expected = expected
+
+
+def compute_stats(products, suppliers, links, thresholds=LOW_STOCK_THRESHOLDS):
+    """
+    Computes the stock aggregates of an inventory from scratch.
+
+    Parameters
+    ----------
+    products : ProductStore
+        Products of the inventory.
+    suppliers : KeyedStore
+        Suppliers of the inventory.
+    links : LinkIndex
+        Links between them.
+    thresholds : tuple
+        Quantities to count the low-stock products below.
+
+    Returns
+    -------
+    dict
+        The number of products under 'products', the total quantity under
+        'units', the total value (price * quantity) under 'stock_value', the
+        number of products below each threshold under 'low_stock' and the
+        total value of the products each supplier supplies under
+        'supplier_value', keyed by supplier ID.
+    """
+    # Imported here because inventory_man imports this module
+    from scripts.inventory_man import _as_list
+
+    columns = products.columns()
+    quantities = _as_list(columns['quantity'])
+    values = list(map(mul, _as_list(columns['price']), quantities))
+    value_of = dict(zip(_as_list(columns['product_id']), values))
+    return {
+        'products': len(values),
+        'units': sum(quantities),
+        'stock_value': math.fsum(values),
+        'low_stock': {threshold: sum(quantity < threshold for quantity in quantities) for threshold in thresholds},
+        'supplier_value': {
+            supplier_id: math.fsum(value_of[product_id] for product_id in links.products_of(supplier_id))
+            for supplier_id in suppliers.keys()
+        }
+    }
+
+
+class StockAggregates:
+    """
+    Stock aggregates of an Inventory, kept up to date from its changes.
+
+    Built once from scratch, then registered as a listener on the inventory:
+    each product change adjusts the totals by the difference between the
+    product's fields before and after it, in O(1) (plus the number of
+    suppliers of the product for the per-supplier values). A price increase
+    scales the totals; the per-supplier values are kept in units of a
+    common scale factor, so it is O(1) too. Reading the aggregates then
+    costs nothing that depends on the size of the catalogue.
+
+    The running sums of prices are floats and drift from the recomputed
+    ones by rounding errors, which grow with the magnitude of the values
+    summed; ``verify`` therefore tolerates differences of up to ``REL_TOL``
+    times the total stock value.
+
+    Attributes
+    ----------
+    thresholds : tuple
+        Quantities to count the low-stock products below.
+    """
+    REL_TOL = 1e-9
+
+    def __init__(self, products, suppliers, links, thresholds=LOW_STOCK_THRESHOLDS):
+        """
+        Computes the aggregates of an inventory's stores.
+
+        Parameters
+        ----------
+        products : ProductStore
+            Products of the inventory.
+        suppliers : KeyedStore
+            Suppliers of the inventory.
+        links : LinkIndex
+            Links between them. Linked suppliers are looked up when a
+            product changes or is removed.
+        thresholds : tuple
+            Quantities to count the low-stock products below.
+        """
+        self._products = products
+        self._suppliers = suppliers
+        self._links = links
+        self.thresholds = tuple(thresholds)
+        self._lock = threading.Lock()
+        self.rebuild()
+
+    def rebuild(self):
+        """
+        Recomputes the aggregates from scratch.
+        """
+        stats = compute_stats(self._products, self._suppliers, self._links, self.thresholds)
+        with self._lock:
+            self._count = stats['products']
+            self._units = stats['units']
+            self._value = stats['stock_value']
+            self._low = [stats['low_stock'][threshold] for threshold in self.thresholds]
+            self._supplier_value = stats['supplier_value']
+            self._scale = 1.0
+
+    def snapshot(self):
+        """
+        Returns the aggregates, as ``compute_stats`` does.
+        """
+        with self._lock:
+            scale = self._scale
+            return {
+                'products': self._count,
+                'units': self._units,
+                'stock_value': self._value,
+                'low_stock': dict(zip(self.thresholds, self._low)),
+                'supplier_value': {supplier_id: value * scale for supplier_id, value in self._supplier_value.items()}
+            }
+
+    def verify(self):
+        """
+        Recomputes the aggregates from scratch and checks that the running
+        ones match. The inventory must not change meanwhile.
+
+        Returns
+        -------
+        dict
+            The recomputed aggregates.
+
+        Raises
+        ------
+        AggregateMismatch
+            If an aggregate differs.
+        """
+        expected = compute_stats(self._products, self._suppliers, self._links, self.thresholds)
+        running = self.snapshot()
+        tolerance = self.REL_TOL * max(abs(expected['stock_value']), 1.0)
+        for field in ('products', 'units', 'low_stock'):
+            if running[field] != expected[field]:
+                raise AggregateMismatch(field, running[field], expected[field])
+        if abs(running['stock_value'] - expected['stock_value']) > tolerance:
+            raise AggregateMismatch('stock_value', running['stock_value'], expected['stock_value'])
+        if running['supplier_value'].keys() != expected['supplier_value'].keys():
+            raise AggregateMismatch('supplier_value', sorted(running['supplier_value']),
+                                    sorted(expected['supplier_value']))
+        for supplier_id, value in expected['supplier_value'].items():
+            if abs(running['supplier_value'][supplier_id] - value) > tolerance:
+                raise AggregateMismatch(f'supplier_value[{supplier_id}]', running['supplier_value'][supplier_id], value)
+        return expected
+
+    def __call__(self, change):
+        """
+        Applies an inventory Change to the aggregates.
+        """
+        if change.op == 'reset':
+            self.rebuild()
+        elif change.kind == 'product':
+            if change.op == 'increase_price':
+                self._increase_price(change.after['percentage'])
+            else:
+                self._product_changed(change.key, change.before, change.after)
+        elif change.kind == 'supplier':
+            with self._lock:
+                if change.op == 'add':
+                    self._supplier_value[change.key] = 0.0
+                elif change.op == 'remove':
+                    self._supplier_value.pop(change.key, None)
+        elif change.kind == 'link':
+            product_id, supplier_id = change.key
+            product = self._products.get(product_id)
+            value = product.price * product.quantity / self._scale
+            with self._lock:
+                values = self._supplier_value
+                values[supplier_id] = values.get(supplier_id, 0.0) + (value if change.op == 'add' else -value)
+
+    def _product_changed(self, product_id, before, after):
+        old_quantity = before['quantity'] if before is not None else 0
+        new_quantity = after['quantity'] if after is not None else 0
+        difference = ((after['price'] * new_quantity if after is not None else 0)
+                      - (before['price'] * old_quantity if before is not None else 0))
+        # Removals are reported before the product's links are dropped
+        suppliers = self._links.suppliers_of(product_id) if difference else ()
+        with self._lock:
+            self._count += (after is not None) - (before is not None)
+            self._units += new_quantity - old_quantity
+            self._value += difference
+            for i, threshold in enumerate(self.thresholds):
+                self._low[i] += ((after is not None and new_quantity < threshold)
+                                 - (before is not None and old_quantity < threshold))
+            if suppliers:
+                values = self._supplier_value
+                difference /= self._scale
+                for supplier_id in suppliers:
+                    values[supplier_id] = values.get(supplier_id, 0.0) + difference
+
+    def _increase_price(self, percentage):
+        factor = 1 + percentage / 100
+        if factor == 0:
+            # Every price is now 0 and the scale could not be divided by
+            self.rebuild()
+            return
+        with self._lock:
+            self._value *= factor
+            self._scale *= factor
+
+    def __repr__(self):
+        return f"StockAggregates(products={self._count}, stock_value={self._value})"
@@ -4,13 +4,231 @@ import os
 # Add the path to the scripts folder
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 
-from flask import Flask, request, jsonify
-from scripts.inventory_man import Inventory, Product, Supplier
+import atexit
+import base64
+import json
+import time
+
+from flask import Flask, Response, g, request, jsonify, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.exceptions import BadRequest
+from scripts.aggregates import AggregateMismatch
+from scripts.cache import ResponseCache
+from scripts.changes import ChangeFeed
+from scripts.inventory_man import InsufficientStock, Inventory, Product, Supplier
+from scripts.journal import Journal
+from scripts.metrics import SIZE_BUCKETS, Metrics
+from scripts.profiler import SamplingProfiler
+from scripts.serialize import CODINGS, COMPRESS_MIN_SIZE, EncodedProducts, compress, encode_list, get_encoder
+from scripts.sharded import ShardedProductStore
+from scripts.sqlite_store import SQLiteLinkStore, SQLiteProductStore, SQLiteSupplierStore
 
 app = Flask(__name__)
 
-# Initialize the inventory
-inventory = Inventory()
+# Encode responses with orjson when it is installed, unless INVENTORY_JSON
+# names another encoder ('json' for the standard library's)
+dumps = get_encoder(os.environ.get('INVENTORY_JSON'))
+
+
+class JSONProvider(DefaultJSONProvider):
+    """
+    Encodes the responses of jsonify with the app's JSON encoder.
+    """
+    def dumps(self, obj, **kwargs):
+        return dumps(obj).decode('utf-8')
+
+    def response(self, *args, **kwargs):
+        return self._app.response_class(dumps(self._prepare_response_obj(args, kwargs)), mimetype=self.mimetype)
+
+
+app.json = JSONProvider(app)
+
+EXPORT_MIMETYPES = {'ndjson': 'application/x-ndjson', 'json': 'application/json'}
+
+# Initialize the inventory. Flask serves requests on several threads. With
+# INVENTORY_DB set, the catalogue lives in an SQLite database that several
+# worker processes can share, e.g. under gunicorn --workers N scripts.app:app
+if os.environ.get('INVENTORY_DB'):
+    inventory = Inventory(
+        product_store=SQLiteProductStore(os.environ['INVENTORY_DB']),
+        supplier_store=SQLiteSupplierStore(os.environ['INVENTORY_DB']),
+        link_store=SQLiteLinkStore(os.environ['INVENTORY_DB']),
+        thread_safe=True
+    )
+elif int(os.environ.get('INVENTORY_SHARDS', 1)) > 1:
+    # Partition the products over INVENTORY_SHARDS worker processes
+    inventory = Inventory(product_store=ShardedProductStore(int(os.environ['INVENTORY_SHARDS'])), thread_safe=True)
+    atexit.register(inventory.products.close)
+else:
+    inventory = Inventory(thread_safe=True)
+
+# Recover from and persist to a write-ahead journal if a directory is given.
+# The journal replays into and compacts the inventory of one process, so it
+# cannot front a database that several worker processes share
+if os.environ.get('INVENTORY_JOURNAL') and os.environ.get('INVENTORY_DB'):
+    raise RuntimeError("INVENTORY_JOURNAL cannot be used with INVENTORY_DB: the database is the durable store")
+if os.environ.get('INVENTORY_JOURNAL'):
+    journal = Journal(os.environ['INVENTORY_JOURNAL'])
+    inventory.attach_journal(journal)
+    atexit.register(journal.close)
+
+# Cache serialized read responses, invalidated by the inventory's changes.
+# Changes made by other worker processes are not seen, so there is no cache
+# over a shared database
+cache = None
+if not os.environ.get('INVENTORY_DB') and int(os.environ.get('INVENTORY_CACHE_SIZE', 1024)) > 0:
+    cache = ResponseCache(int(os.environ.get('INVENTORY_CACHE_SIZE', 1024)))
+    inventory.add_listener(cache)
+
+# Keep the latest changes for consumers that sync incrementally through
+# GET /changes. As with the cache, the changes made by other worker
+# processes are not seen, so there is no feed over a shared database
+feed = None
+if not os.environ.get('INVENTORY_DB') and int(os.environ.get('INVENTORY_CHANGES_SIZE', 10000)) > 0:
+    feed = ChangeFeed(int(os.environ.get('INVENTORY_CHANGES_SIZE', 10000)))
+    inventory.add_listener(feed)
+
+# Cache the encoded JSON of each product until it changes, for the routes
+# that return products; over a shared database, as above, products are
+# encoded on every request
+encoded = None
+if not os.environ.get('INVENTORY_DB') and int(os.environ.get('INVENTORY_ENCODED_SIZE', 100000)) > 0:
+    encoded = EncodedProducts(dumps, int(os.environ.get('INVENTORY_ENCODED_SIZE', 100000)))
+    inventory.add_listener(encoded)
+
+# Record request and Inventory method metrics, served at GET /metrics, if
+# INVENTORY_METRICS is set. When it is not, every request only checks the
+# flags; the sampling profiler is started and stopped at runtime through
+# POST /metrics/profiler
+metrics = Metrics()
+metrics.describe('inventory_http_requests_total', 'counter', "HTTP requests by route and status.")
+metrics.describe('inventory_http_request_duration_seconds', 'histogram', "HTTP request latency by route.")
+metrics.describe('inventory_http_request_size_bytes', 'histogram', "HTTP request body size by route.")
+metrics.describe('inventory_http_response_size_bytes', 'histogram', "HTTP response body size by route.")
+metrics.gauge('inventory_products', "Products in the inventory.", lambda: len(inventory.products))
+metrics.gauge('inventory_suppliers', "Suppliers in the inventory.", lambda: len(inventory.suppliers))
+if os.environ.get('INVENTORY_METRICS'):
+    metrics.enable(inventory)
+profiler = SamplingProfiler()
+
+# Longest a GET /changes request may wait for a change, and how often an
+# idle event stream sends a keep-alive comment, in seconds
+CHANGES_MAX_WAIT = 30.0
+CHANGES_KEEPALIVE = 15.0
+
+
+@app.before_request
+def _start_request():
+    if metrics.enabled or profiler.running:
+        g.request_start = time.perf_counter()
+        g.route = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+        profiler.begin(f"{request.method} {g.route}")
+
+@app.after_request
+def _measure_response(response):
+    if 'request_start' in g:
+        g.status = response.status_code
+        g.response_size = response.content_length
+    return response
+
+# Registered after _measure_response so that it runs before it
+@app.after_request
+def _compress_response(response):
+    if (response.mimetype != 'application/json' or response.status_code != 200 or response.is_streamed
+            or 'Content-Encoding' in response.headers):
+        return response
+    response.vary.add('Accept-Encoding')
+    coding = request.accept_encodings.best_match(CODINGS)
+    if coding is not None and response.content_length >= COMPRESS_MIN_SIZE:
+        response.set_data(compress(response.get_data(), coding))
+        response.headers['Content-Encoding'] = coding
+    return response
+
+@app.teardown_request
+def _record_request(exc):
+    start = g.pop('request_start', None)
+    if start is None:
+        return
+    profiler.end()
+    if not metrics.enabled:
+        return
+    labels = {'method': request.method, 'route': g.route}
+    metrics.inc('inventory_http_requests_total', status=str(g.get('status', 500)), **labels)
+    metrics.observe('inventory_http_request_duration_seconds', time.perf_counter() - start, **labels)
+    if request.content_length is not None:
+        metrics.observe('inventory_http_request_size_bytes', request.content_length, SIZE_BUCKETS, **labels)
+    # Streamed responses have no known size
+    if g.get('response_size') is not None:
+        metrics.observe('inventory_http_response_size_bytes', g.response_size, SIZE_BUCKETS, **labels)
+
+
+def _cached(key, build):
+    """
+    Serves a read from the response cache, building and caching it on a
+    miss. The response carries an ETag, and a request whose If-None-Match
+    matches it gets an empty 304 response.
+
+    Parameters
+    ----------
+    key : hashable
+        Cache key of the response.
+    build : callable
+        Returns ``(payload, status, tags)``, where ``tags`` is what the
+        payload depends on (see ResponseCache) and ``payload`` may be
+        already encoded as bytes. Only 200 responses are cached.
+    """
+    entry = cache.get(key) if cache is not None else None
+    state = 'HIT'
+    if entry is None:
+        generation = cache.generation if cache is not None else None
+        payload, status, tags = build()
+        body = payload if isinstance(payload, bytes) else dumps(payload)
+        if cache is None or status != 200:
+            return Response(body, status, mimetype='application/json')
+        entry = cache.put(key, body, tags, generation)
+        state = 'MISS'
+    response = Response(entry.body, mimetype='application/json')
+    response.set_etag(entry.etag)
+    response.vary.add('Accept-Encoding')
+    coding = request.accept_encodings.best_match(CODINGS)
+    if coding is not None and len(entry.body) >= COMPRESS_MIN_SIZE:
+        # Compressed once per cached response and coding
+        body = entry.compressed.get(coding)
+        if body is None:
+            body = entry.compressed[coding] = compress(entry.body, coding)
+        response.set_data(body)
+        response.headers['Content-Encoding'] = coding
+        response.set_etag(f"{entry.etag}-{coding}")
+    response.headers['X-Cache'] = state
+    return response.make_conditional(request)
+
+
+def _product_generation():
+    """
+    Returns the generation of the encoded products cache, to be read before
+    reading the products to encode, or None if there is no cache.
+    """
+    return encoded.generation if encoded is not None else None
+
+
+def _encode_product(product, generation):
+    """
+    Returns the encoded JSON object of a product, reusing and filling the
+    encoded products cache.
+    """
+    if encoded is None:
+        return dumps(product.to_dict())
+    return encoded.encode([product], generation)[0]
+
+
+def _encode_products(products, generation):
+    """
+    Returns the encoded JSON array of products, reusing and filling the
+    encoded products cache.
+    """
+    if encoded is None:
+        return dumps([product.to_dict() for product in products])
+    return encode_list(encoded.encode(products, generation))
 
 @app.route('/products', methods=['POST'])
 def add_product():
@@ -25,7 +243,10 @@ def add_product():
     quantity = data['quantity']
 
     product = Product(product_id, name, description, price, quantity)
-    inventory.add_product(product)
+    try:
+        inventory.add_product(product)
+    except ValueError:
+        return jsonify({"message": "Product already exists"}), 409
 
     return jsonify({"message": "Product added successfully"}), 201
 
@@ -65,16 +286,113 @@ def query_product(product_id):
     """
     Get details of a product in the inventory.
     """
-    product = inventory.get_product(product_id)
-    if product:
-        return jsonify(repr(product)), 200
+    def build():
+        generation = _product_generation()
+        product = inventory.get_product(product_id)
+        if product:
+            return _encode_product(product, generation), 200, [('product', product_id), 'price']
+        else:
+            return {"message": "Product not found"}, 404, ()
+
+    return _cached(('product', product_id), build)
+
+def _encode_cursor(entry):
+    return base64.urlsafe_b64encode(json.dumps(entry).encode()).decode()
+
+
+# Types of the sort value in the cursor of a products page, by sort field
+_CURSOR_TYPES = {'product_id': (int,), 'quantity': (int,), 'price': (int, float), 'name': (str,)}
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _decode_cursor(token, sort=None):
+    """
+    Decodes the cursor of a page: an ID, or for a products page sorted by
+    ``sort`` its ``[sort value, product ID]`` entry. Raises BadRequest if
+    the token does not decode to a cursor of that shape.
+    """
+    try:
+        value = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except ValueError:
+        raise BadRequest("Invalid cursor")
+    if sort is None:
+        valid = _is_int(value)
     else:
-        return jsonify({"message": "Product not found"}), 404
+        valid = (isinstance(value, list) and len(value) == 2 and _is_int(value[1])
+                 and isinstance(value[0], _CURSOR_TYPES.get(sort, (int, float, str)))
+                 and not isinstance(value[0], bool))
+    if not valid:
+        raise BadRequest("Invalid cursor")
+    return value
+
+
+def _page_limit():
+    limit = request.args.get('limit', 100, type=int)
+    if not 1 <= limit <= 1000:
+        raise BadRequest("limit must be between 1 and 1000")
+    return limit
+
 
 @app.route('/products', methods=['GET'])
 def list_products():
-    products = inventory.get_all_products()
-    return jsonify(products), 200
+    """
+    List a page of products, optionally filtered and sorted.
+
+    Query parameters: ``min_price``, ``max_price``, ``quantity_below``,
+    ``name_prefix``, ``sort`` (product_id, price, quantity or name),
+    ``order`` (asc or desc), ``limit`` (at most 1000), and either ``offset``
+    or the ``cursor`` returned as ``next_cursor`` by the previous page.
+    With ``stream=ndjson`` or ``stream=json`` the whole catalogue is
+    streamed instead, as from ``/export/products``.
+    """
+    args = request.args
+    if args.get('stream'):
+        return _export('products', args['stream'])
+    limit = _page_limit()
+    cursor = args.get('cursor')
+
+    def build():
+        generation = _product_generation()
+        try:
+            page = inventory.query_products(
+                min_price=args.get('min_price', type=float),
+                max_price=args.get('max_price', type=float),
+                quantity_below=args.get('quantity_below', type=int),
+                name_prefix=args.get('name_prefix'),
+                sort=args.get('sort', 'product_id'),
+                descending=args.get('order', 'asc') == 'desc',
+                offset=args.get('offset', 0, type=int),
+                limit=limit,
+                after=_decode_cursor(cursor, args.get('sort', 'product_id')) if cursor else None
+            )
+        except ValueError as e:
+            raise BadRequest(str(e))
+        tags = ['product-list', 'price'] + [('product', product.product_id) for product in page['products']]
+        next_cursor = _encode_cursor(page['next']) if page['next'] is not None else None
+        return (b'{"products":' + _encode_products(page['products'], generation)
+                + b',"next_cursor":' + dumps(next_cursor) + b'}'), 200, tags
+
+    return _cached(('products', tuple(sorted(args.items(multi=True)))), build)
+
+
+@app.route('/products/search', methods=['GET'])
+def search_products():
+    """
+    Search products by keywords in their name and description, best match
+    first. Query parameters: ``q``, ``limit`` (at most 1000) and ``offset``.
+    """
+    query = request.args.get('q', '')
+    if not query.strip():
+        raise BadRequest("q must not be empty")
+    result = inventory.search_products(query, limit=_page_limit(), offset=request.args.get('offset', 0, type=int))
+    return jsonify({
+        "products": [dict(product.to_dict(), score=score)
+                     for product, score in zip(result['products'], result['scores']) if product is not None],
+        "total": result['total']
+    }), 200
 
 
 @app.route('/products/increase_price', methods=['POST'])
@@ -86,6 +404,212 @@ def increase_price():
     inventory.increase_price(percentage)
     return jsonify({'message': f'All product prices increased by {percentage}%'}), 200
 
+def _adjust_stock(method, product_id, field):
+    """
+    Applies one of the inventory's atomic stock operations with the integer
+    read from the ``field`` of the request body.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        quantity = method(product_id, data.get(field))
+    except InsufficientStock as e:
+        return jsonify({"message": "Insufficient stock", "quantity": e.quantity}), 409
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    if quantity is None:
+        return jsonify({"message": "Product not found"}), 404
+    return jsonify({"message": "Stock updated successfully", "quantity": quantity}), 200
+
+@app.route('/products/<int:product_id>/reserve', methods=['POST'])
+def reserve_product(product_id):
+    """
+    Take ``amount`` units of a product out of stock, all or nothing.
+    Responds 409 with the quantity in stock if there are fewer units.
+    """
+    return _adjust_stock(inventory.reserve, product_id, 'amount')
+
+@app.route('/products/<int:product_id>/release', methods=['POST'])
+def release_product(product_id):
+    """
+    Put ``amount`` reserved units of a product back into stock.
+    """
+    return _adjust_stock(inventory.release, product_id, 'amount')
+
+@app.route('/products/<int:product_id>/adjust', methods=['POST'])
+def adjust_product(product_id):
+    """
+    Add ``delta`` units, or take them out if negative, to a product's
+    stock. Responds 409 if the quantity would fall below zero.
+    """
+    return _adjust_stock(inventory.adjust_quantity, product_id, 'delta')
+
+def _read_batch():
+    """
+    Reads the items of a batch request: a JSON array, or one JSON value per
+    line when sent as NDJSON.
+    """
+    if request.mimetype in ('application/x-ndjson', 'application/ndjson'):
+        items = []
+        for number, line in enumerate(request.get_data().splitlines(), 1):
+            if line.strip():
+                try:
+                    items.append(json.loads(line))
+                except ValueError:
+                    raise BadRequest(f"Invalid JSON on line {number}")
+        return items
+    items = request.get_json()
+    if not isinstance(items, list):
+        raise BadRequest("Expected a JSON array of items")
+    return items
+
+
+def _atomic():
+    """
+    Returns whether the batch request asked for all-or-nothing semantics.
+    """
+    return request.args.get('atomic', '').lower() in ('1', 'true', 'yes')
+
+
+def _apply_batch(results, positions, method, values):
+    """
+    Applies the valid items of a batch through an Inventory bulk method and
+    records their results at their positions. In atomic mode an invalid
+    item means nothing is applied.
+    """
+    if _atomic() and len(positions) < len(results):
+        applied = [True] * len(positions)
+    else:
+        applied = method(values, atomic=_atomic())
+    for i, result in zip(positions, applied):
+        results[i] = result
+
+
+def _batch_response(items, results, success_status, failure_status, failure_message):
+    """
+    Builds the per-item status response of a batch request.
+
+    ``results`` holds one entry per item: True if it was applied, False if
+    it failed with ``failure_status``, or an (HTTP status, message) pair if
+    it was rejected before reaching the inventory.
+    """
+    rolled_back = _atomic() and not all(result is True for result in results)
+
+    statuses = []
+    for item, result in zip(items, results):
+        product_id = item.get('product_id') if isinstance(item, dict) else item
+        if result is True and rolled_back:
+            status, message = 424, "Not applied because another item failed"
+        elif result is True:
+            status, message = success_status, "OK"
+        elif result is False:
+            status, message = failure_status, failure_message
+        else:
+            status, message = result
+        statuses.append({"product_id": product_id, "status": status, "message": message})
+
+    failed = sum(1 for entry in statuses if entry["status"] != success_status)
+    if rolled_back:
+        code = 409
+    elif failed:
+        code = 207
+    else:
+        code = success_status
+    return jsonify({"applied": 0 if rolled_back else len(items) - failed, "failed": failed, "results": statuses}), code
+
+
+@app.route('/products/batch', methods=['POST'])
+def add_products():
+    """
+    Add several products to the inventory in one request.
+
+    Accepts a JSON array or NDJSON of product objects. With ``?atomic=true``
+    nothing is added unless every product can be added.
+    """
+    items = _read_batch()
+    results = [None] * len(items)
+    products = []
+    positions = []
+    for i, item in enumerate(items):
+        try:
+            if not _is_int(item['product_id']):
+                raise TypeError
+            products.append(Product(item['product_id'], item['name'], item['description'], item['price'], item['quantity']))
+        except (KeyError, TypeError):
+            results[i] = (400, "Invalid product")
+        else:
+            positions.append(i)
+
+    _apply_batch(results, positions, inventory.add_products, products)
+    return _batch_response(items, results, 201, 409, "Product already exists")
+
+@app.route('/products/batch', methods=['PATCH'])
+def update_products():
+    """
+    Update several products in the inventory in one request.
+
+    Accepts a JSON array or NDJSON of objects holding a product_id and the
+    fields to change. With ``?atomic=true`` nothing is updated unless every
+    product exists.
+    """
+    items = _read_batch()
+    results = [None] * len(items)
+    updates = []
+    positions = []
+    for i, item in enumerate(items):
+        if not isinstance(item, dict) or not _is_int(item.get('product_id')):
+            results[i] = (400, "Invalid update")
+            continue
+        updates.append({
+            'product_id': item['product_id'],
+            'name': item.get('name'),
+            'description': item.get('description'),
+            'price': item.get('price'),
+            'quantity': item.get('quantity')
+        })
+        positions.append(i)
+
+    _apply_batch(results, positions, inventory.update_products, updates)
+    return _batch_response(items, results, 200, 404, "Product not found")
+
+@app.route('/products/batch', methods=['DELETE'])
+def remove_products():
+    """
+    Delete several products from the inventory in one request.
+
+    Accepts a JSON array or NDJSON of product IDs (or objects holding a
+    product_id). With ``?atomic=true`` nothing is deleted unless every
+    product exists.
+    """
+    items = _read_batch()
+    results = [None] * len(items)
+    product_ids = []
+    positions = []
+    for i, item in enumerate(items):
+        product_id = item.get('product_id') if isinstance(item, dict) else item
+        if not _is_int(product_id):
+            results[i] = (400, "Invalid product ID")
+            continue
+        product_ids.append(product_id)
+        positions.append(i)
+
+    _apply_batch(results, positions, inventory.remove_products, product_ids)
+    return _batch_response(items, results, 200, 404, "Product not found")
+
+def _export(kind, format):
+    if format not in EXPORT_MIMETYPES:
+        raise BadRequest("format must be ndjson or json")
+    chunks = inventory.iter_export(kind, format)
+    return Response(stream_with_context(chunks), mimetype=EXPORT_MIMETYPES[format])
+
+
+@app.route('/export/<any(products, suppliers):kind>', methods=['GET'])
+def export(kind):
+    """
+    Stream all products or suppliers as NDJSON (the default) or, with
+    ``format=json``, as a JSON array.
+    """
+    return _export(kind, request.args.get('format', 'ndjson'))
+
 @app.route('/suppliers', methods=['POST'])
 def add_supplier():
     """
@@ -93,7 +617,10 @@ def add_supplier():
     """
     data = request.get_json()
     supplier = Supplier(data['supplier_id'], data['name'], data['contact_info'])
-    inventory.add_supplier(supplier)
+    try:
+        inventory.add_supplier(supplier)
+    except ValueError:
+        return jsonify({"message": "Supplier already exists"}), 409
 
     return jsonify({"message": "Supplier added successfully"}), 201
 
@@ -110,8 +637,185 @@ def remove_supplier(supplier_id):
 
 @app.route('/suppliers', methods=['GET'])
 def list_suppliers():
-    suppliers = inventory.get_all_suppliers()
-    return jsonify(suppliers), 200
+    return _cached(('suppliers',), lambda: (inventory.get_all_suppliers(as_dicts=True), 200, ['suppliers']))
+
+def _linked_page(ids, limit, lookup):
+    """
+    Builds a page of linked records from a list of up to ``limit`` IDs.
+    """
+    records = [record for record in map(lookup, ids) if record is not None]
+    return records, _encode_cursor(ids[-1]) if len(ids) == limit else None
+
+
+@app.route('/suppliers/<int:supplier_id>/products', methods=['GET'])
+def list_supplier_products(supplier_id):
+    """
+    List a page of the products a supplier supplies, by ascending product
+    ID. Query parameters: ``limit`` (at most 1000) and the ``cursor``
+    returned as ``next_cursor`` by the previous page.
+    """
+    limit = _page_limit()
+    cursor = request.args.get('cursor')
+    generation = _product_generation()
+    product_ids = inventory.get_supplier_products(supplier_id, _decode_cursor(cursor) if cursor else None, limit)
+    if product_ids is None:
+        return jsonify({"message": "Supplier not found"}), 404
+    products, next_cursor = _linked_page(product_ids, limit, inventory.get_product)
+    return Response(b'{"products":' + _encode_products(products, generation)
+                    + b',"next_cursor":' + dumps(next_cursor) + b'}', mimetype='application/json')
+
+@app.route('/suppliers/<int:supplier_id>/products', methods=['POST'])
+def add_supplier_product(supplier_id):
+    """
+    Record that a supplier supplies a product.
+    """
+    data = request.get_json()
+    if inventory.add_link(data['product_id'], supplier_id):
+        return jsonify({"message": "Product linked to supplier"}), 201
+    return jsonify({"message": "Product or supplier not found"}), 404
+
+@app.route('/suppliers/<int:supplier_id>/products/<int:product_id>', methods=['DELETE'])
+def remove_supplier_product(supplier_id, product_id):
+    """
+    Record that a supplier no longer supplies a product.
+    """
+    if inventory.remove_link(product_id, supplier_id):
+        return jsonify({"message": "Product unlinked from supplier"}), 200
+    return jsonify({"message": "Link not found"}), 404
+
+@app.route('/products/<int:product_id>/suppliers', methods=['GET'])
+def list_product_suppliers(product_id):
+    """
+    List a page of the suppliers of a product, by ascending supplier ID.
+    Takes the paging parameters of ``/suppliers/<id>/products``.
+    """
+    limit = _page_limit()
+    cursor = request.args.get('cursor')
+    supplier_ids = inventory.get_product_suppliers(product_id, _decode_cursor(cursor) if cursor else None, limit)
+    if supplier_ids is None:
+        return jsonify({"message": "Product not found"}), 404
+    suppliers, next_cursor = _linked_page(supplier_ids, limit, inventory.get_supplier)
+    return jsonify({
+        "suppliers": [supplier.to_dict() for supplier in suppliers],
+        "next_cursor": next_cursor
+    }), 200
+
+@app.route('/stats', methods=['GET'])
+def get_stats():
+    """
+    Get the stock aggregates of the inventory (see ``Inventory.stats``),
+    maintained as it changes. With ``verify=true`` they are also recomputed
+    from scratch, and a mismatch is answered with a 500. Over a shared
+    database they are always computed from scratch, as the changes made by
+    other worker processes are not seen.
+    """
+    verify = request.args.get('verify', '').lower() in ('1', 'true', 'yes')
+    try:
+        stats = inventory.stats(verify=verify, recompute=bool(os.environ.get('INVENTORY_DB')))
+    except AggregateMismatch as e:
+        return jsonify({"message": str(e), "field": e.field}), 500
+    return jsonify(stats), 200
+
+@app.route('/changes', methods=['GET'])
+def list_changes():
+    """
+    List the changes after sequence number ``since`` (default 0), oldest
+    first, at most ``limit`` of them. With ``wait`` (seconds, at most 30)
+    the request is held until a change arrives, for long-polling. When the
+    changes asked for are no longer kept, the response is 410 with the
+    current ``last_seq``: reload the catalogue and continue from there.
+
+    A request accepting ``text/event-stream`` gets the changes as
+    Server-Sent Events instead, one ``change`` event per change with its
+    sequence number as the event ID, followed by the new changes as they
+    happen. A reconnecting EventSource resumes from its Last-Event-ID. If
+    the client falls too far behind, the stream sends a ``resync`` event
+    and ends.
+    """
+    if feed is None:
+        return jsonify({"message": "Change feed is not enabled"}), 404
+    try:
+        since = int(request.args.get('since', request.headers.get('Last-Event-ID', 0)))
+    except ValueError:
+        raise BadRequest("since must be a sequence number")
+    if since < 0:
+        raise BadRequest("since must not be negative")
+    if request.accept_mimetypes.best_match(['application/json', 'text/event-stream']) == 'text/event-stream':
+        return Response(_change_events(since), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+    limit = _page_limit()
+    wait = min(max(request.args.get('wait', 0, type=float), 0), CHANGES_MAX_WAIT)
+    changes, resync = feed.read(since, limit, wait)
+    if resync:
+        return jsonify({"message": "Changes no longer available, resync", "last_seq": feed.last_seq}), 410
+    return jsonify({"changes": changes, "last_seq": changes[-1]['seq'] if changes else since}), 200
+
+def _change_events(since):
+    """
+    Yields the Server-Sent Events of the changes after ``since``, then of
+    the new changes as they arrive.
+    """
+    while True:
+        changes, resync = feed.read(since, 1000, CHANGES_KEEPALIVE)
+        if resync:
+            yield f"event: resync\ndata: {json.dumps({'last_seq': feed.last_seq})}\n\n"
+            return
+        if not changes:
+            yield ": keep-alive\n\n"
+        for change in changes:
+            yield f"id: {change['seq']}\nevent: change\ndata: {app.json.dumps(change)}\n\n"
+        since = changes[-1]['seq'] if changes else since
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """
+    Report the request and Inventory method metrics in the Prometheus text
+    format.
+    """
+    if not metrics.enabled:
+        return jsonify({"message": "Metrics are not enabled"}), 404
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/metrics/profiler', methods=['POST'])
+def toggle_profiler():
+    """
+    Start or stop the sampling profiler: ``{"enabled": true}``, optionally
+    with the sampling ``interval`` in seconds and the number of slowest
+    requests to ``keep``. Starting it discards the stacks kept so far.
+    """
+    data = request.get_json(silent=True) or {}
+    if data.get('enabled'):
+        interval = data.get('interval', profiler.interval)
+        keep = data.get('keep', profiler.keep)
+        if not isinstance(interval, (int, float)) or not 0.0005 <= interval <= 1:
+            raise BadRequest("interval must be between 0.0005 and 1 second")
+        if not isinstance(keep, int) or not 1 <= keep <= 1000:
+            raise BadRequest("keep must be between 1 and 1000")
+        profiler.start(interval, keep)
+    else:
+        profiler.stop()
+    return jsonify({"running": profiler.running, "interval": profiler.interval, "keep": profiler.keep}), 200
+
+@app.route('/metrics/profiler', methods=['GET'])
+def profiler_stacks():
+    """
+    Dump the sampled stacks of the slowest requests since the profiler was
+    started, in the collapsed format of flamegraph.pl and speedscope. With
+    ``format=json``, list the requests with their duration and stacks.
+    """
+    if request.args.get('format') == 'json':
+        return jsonify({"running": profiler.running, "requests": profiler.slowest()}), 200
+    return Response(profiler.collapsed(), mimetype='text/plain')
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    """
+    Report the hit and miss counters of the response cache.
+    """
+    if cache is None:
+        return jsonify({"enabled": False}), 200
+    return jsonify(dict(cache.stats(), enabled=True)), 200
 
 
 
@@ -0,0 +1,331 @@
+import sys
+import os
+
+# Add the path to the scripts folder
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import asyncio
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import parse_qs
+
+from werkzeug.exceptions import BadRequest
+from scripts.app import EXPORT_MIMETYPES, dumps, inventory, _encode_cursor, _decode_cursor
+from scripts.inventory_man import Product, Supplier
+
+# Asyncio version of the REST API, served by any ASGI server over the same
+# inventory as the Flask app, e.g. uvicorn scripts.asgi_app:app
+#
+# Calls that may block go to a thread pool so that the event loop keeps
+# serving other connections: mutations (which append to the journal and may
+# fsync it, or wait for the write lock), reads (which share the lock of the
+# app's thread-safe inventory with writers, and may read from disk or other
+# processes), and the serialization of streamed exports.
+executor = ThreadPoolExecutor(max_workers=int(os.environ.get('INVENTORY_IO_THREADS', 8)),
+                              thread_name_prefix='inventory-io')
+
+
+async def _blocking(func, *args, **kwargs):
+    """
+    Runs a blocking call on the I/O thread pool.
+    """
+    return await asyncio.get_running_loop().run_in_executor(executor, partial(func, *args, **kwargs))
+
+
+class Request:
+    """
+    The parts of an HTTP request the routes use.
+    """
+    def __init__(self, scope, body):
+        self.method = scope['method']
+        self.path = scope['path']
+        self.args = {name: values[0] for name, values in parse_qs(scope['query_string'].decode('latin-1')).items()}
+        self.body = body
+
+    def get(self, name, default=None, type=None):
+        """
+        Returns a query parameter, converted by ``type``. Like Flask's
+        ``request.args.get``, a value that does not convert gives the default.
+        """
+        if name not in self.args:
+            return default
+        if type is None:
+            return self.args[name]
+        try:
+            return type(self.args[name])
+        except ValueError:
+            return default
+
+    def json(self):
+        """
+        Returns the decoded JSON body.
+        """
+        try:
+            return json.loads(self.body)
+        except ValueError:
+            raise BadRequest("Invalid JSON body")
+
+
+class Stream:
+    """
+    A streamed response, produced chunk by chunk from a blocking iterator.
+    """
+    def __init__(self, chunks, mimetype):
+        self.chunks = chunks
+        self.mimetype = mimetype
+
+
+_routes = []
+
+
+def route(pattern, methods):
+    """
+    Registers a handler for a path pattern, where ``<name>`` matches an
+    integer path segment passed to the handler as a keyword argument.
+    """
+    regex = re.compile('^' + re.sub(r'<(\w+)>', r'(?P<\1>[0-9]+)', pattern) + '$')
+
+    def register(handler):
+        _routes.append((regex, methods, handler))
+        return handler
+    return register
+
+
+@route('/products', ['POST'])
+async def add_product(request):
+    """
+    Add a product to the inventory.
+    """
+    data = request.json()
+    product = Product(data['product_id'], data['name'], data['description'], data['price'], data['quantity'])
+    try:
+        await _blocking(inventory.add_product, product)
+    except ValueError:
+        return {"message": "Product already exists"}, 409
+
+    return {"message": "Product added successfully"}, 201
+
+
+@route('/products/<product_id>', ['DELETE'])
+async def remove_product(request, product_id):
+    """
+    Delete a product from the inventory.
+    """
+    if await _blocking(inventory.remove_product, product_id):
+        return {"message": "Product deleted successfully"}, 200
+    return {"message": "Product not found"}, 404
+
+
+@route('/products/<product_id>', ['PUT'])
+async def update_product(request, product_id):
+    """
+    Update a product in the inventory.
+    """
+    data = request.json()
+    result = await _blocking(
+        inventory.update_product,
+        product_id,
+        name=data.get('name'),
+        description=data.get('description'),
+        price=data.get('price'),
+        quantity=data.get('quantity')
+    )
+    if result:
+        return {"message": "Product updated successfully"}, 200
+    return {"message": "Product not found"}, 404
+
+
+@route('/products/<product_id>', ['GET'])
+async def query_product(request, product_id):
+    """
+    Get details of a product in the inventory.
+    """
+    product = await _blocking(inventory.get_product, product_id)
+    if product:
+        return product.to_dict(), 200
+    return {"message": "Product not found"}, 404
+
+
+@route('/products', ['GET'])
+async def list_products(request):
+    """
+    List a page of products, optionally filtered and sorted. Takes the query
+    parameters of the Flask route.
+    """
+    if request.get('stream'):
+        return _export('products', request.get('stream')), 200
+    limit = request.get('limit', 100, type=int)
+    if not 1 <= limit <= 1000:
+        raise BadRequest("limit must be between 1 and 1000")
+    cursor = request.get('cursor')
+    try:
+        page = await _blocking(
+            inventory.query_products,
+            min_price=request.get('min_price', type=float),
+            max_price=request.get('max_price', type=float),
+            quantity_below=request.get('quantity_below', type=int),
+            name_prefix=request.get('name_prefix'),
+            sort=request.get('sort', 'product_id'),
+            descending=request.get('order', 'asc') == 'desc',
+            offset=request.get('offset', 0, type=int),
+            limit=limit,
+            after=_decode_cursor(cursor, request.get('sort', 'product_id')) if cursor else None
+        )
+    except ValueError as e:
+        raise BadRequest(str(e))
+    return {
+        "products": [product.to_dict() for product in page['products']],
+        "next_cursor": _encode_cursor(page['next']) if page['next'] is not None else None
+    }, 200
+
+
+@route('/products/increase_price', ['POST'])
+async def increase_price(request):
+    """
+    Increase the price of all products in the inventory.
+    """
+    percentage = request.json().get('percentage')
+    await _blocking(inventory.increase_price, percentage)
+    return {'message': f'All product prices increased by {percentage}%'}, 200
+
+
+def _export(kind, format):
+    if format not in EXPORT_MIMETYPES:
+        raise BadRequest("format must be ndjson or json")
+    return Stream(inventory.iter_export(kind, format), EXPORT_MIMETYPES[format])
+
+
+@route('/export/products', ['GET'])
+async def export_products(request):
+    """
+    Stream all products as NDJSON or, with ``format=json``, a JSON array.
+    """
+    return _export('products', request.get('format', 'ndjson')), 200
+
+
+@route('/export/suppliers', ['GET'])
+async def export_suppliers(request):
+    """
+    Stream all suppliers as NDJSON or, with ``format=json``, a JSON array.
+    """
+    return _export('suppliers', request.get('format', 'ndjson')), 200
+
+
+@route('/suppliers', ['POST'])
+async def add_supplier(request):
+    """
+    Add a supplier to the inventory.
+    """
+    data = request.json()
+    supplier = Supplier(data['supplier_id'], data['name'], data['contact_info'])
+    try:
+        await _blocking(inventory.add_supplier, supplier)
+    except ValueError:
+        return {"message": "Supplier already exists"}, 409
+
+    return {"message": "Supplier added successfully"}, 201
+
+
+@route('/suppliers/<supplier_id>', ['DELETE'])
+async def remove_supplier(request, supplier_id):
+    """
+    Delete a supplier from the inventory.
+    """
+    if await _blocking(inventory.remove_supplier, supplier_id):
+        return {"message": "Supplier deleted successfully"}, 200
+    return {"message": "Supplier not found"}, 404
+
+
+@route('/suppliers', ['GET'])
+async def list_suppliers(request):
+    return await _blocking(inventory.get_all_suppliers, as_dicts=True), 200
+
+
+def _dispatch(method, path):
+    """
+    Finds the handler of a request and its path parameters.
+
+    Returns
+    -------
+    tuple
+        ``(handler, params)``, or ``(None, status)`` with 404 or 405 if no
+        route matches.
+    """
+    allowed = False
+    for regex, methods, handler in _routes:
+        match = regex.match(path)
+        if match is None:
+            continue
+        if method in methods:
+            return handler, {name: int(value) for name, value in match.groupdict().items()}
+        allowed = True
+    return None, 405 if allowed else 404
+
+
+async def _read_body(receive):
+    body = b''
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            break
+    return body
+
+
+async def _send_json(send, payload, status):
+    body = dumps(payload)
+    await send({'type': 'http.response.start', 'status': status, 'headers': [
+        (b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())
+    ]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _send_stream(send, stream):
+    await send({'type': 'http.response.start', 'status': 200,
+                'headers': [(b'content-type', stream.mimetype.encode())]})
+    chunks = iter(stream.chunks)
+    while True:
+        chunk = await _blocking(next, chunks, None)
+        if chunk is None:
+            break
+        await send({'type': 'http.response.body', 'body': chunk.encode('utf-8'), 'more_body': True})
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            executor.shutdown(wait=True)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    """
+    The ASGI application.
+    """
+    if scope['type'] == 'lifespan':
+        return await _lifespan(receive, send)
+    if scope['type'] != 'http':
+        raise ValueError(f"Unsupported ASGI scope type: {scope['type']!r}")
+
+    handler, params = _dispatch(scope['method'], scope['path'])
+    if handler is None:
+        message = "Not found" if params == 404 else "Method not allowed"
+        return await _send_json(send, {"message": message}, params)
+
+    request = Request(scope, await _read_body(receive))
+    try:
+        payload, status = await handler(request, **params)
+    except BadRequest as e:
+        return await _send_json(send, {"message": e.description}, 400)
+    if isinstance(payload, Stream):
+        return await _send_stream(send, payload)
+    await _send_json(send, payload, status)
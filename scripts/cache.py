@@ -0,0 +1,166 @@
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+
+# A cached response: the serialized body, its entity tag and compressed
+# copies of the body by content coding, filled in as clients ask for them
+CachedResponse = namedtuple('CachedResponse', ['body', 'etag', 'compressed'])
+
+# Product fields that decide whether a product appears on a list page, and
+# where; a change to any other field only affects the pages showing it
+_LIST_FIELDS = {'product_id', 'name', 'price', 'quantity'}
+
+
+def make_etag(body):
+    """
+    Returns a strong entity tag for a response body.
+    """
+    return hashlib.blake2b(body, digest_size=12).hexdigest()
+
+
+class ResponseCache:
+    """
+    A bounded LRU cache of serialized responses, invalidated by the changes
+    of an Inventory.
+
+    Every entry is stored under a key, e.g. the resource and its query
+    parameters, together with a set of tags naming what it depends on:
+
+    - ``('product', product_id)``: the entry shows that product;
+    - ``'product-list'``: the entry is a filtered or sorted product listing,
+      whose membership changes when products are added or removed, or when
+      a product's name, price or quantity changes;
+    - ``'price'``: the entry shows product prices;
+    - ``'suppliers'``: the entry shows suppliers.
+
+    Registered as a listener on the inventory, the cache drops exactly the
+    entries tagged by each change: updating a product's description drops
+    the entries showing that product, ``increase_price`` drops the
+    price-dependent entries, and so on.
+
+    An entry computed while a change was applied could be stale, so ``put``
+    only stores it if no invalidation happened since the caller read
+    ``generation`` before building the response.
+
+    Attributes
+    ----------
+    maxsize : int
+        Maximum number of entries.
+    hits, misses : int
+        Number of ``get`` calls that found or did not find an entry.
+    generation : int
+        Number of invalidations so far.
+    """
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+        self._entries = OrderedDict()
+        self._tags = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Returns the cached response for a key, or None.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, body, tags, generation):
+        """
+        Caches a serialized response body.
+
+        Parameters
+        ----------
+        key : hashable
+            Cache key.
+        body : bytes
+            Serialized response.
+        tags : iterable
+            What the response depends on (see the class documentation).
+        generation : int
+            Value of ``generation`` read before the response was built.
+
+        Returns
+        -------
+        CachedResponse
+            The response and its entity tag.
+        """
+        response = CachedResponse(body, make_etag(body), {})
+        with self._lock:
+            if generation != self.generation or self.maxsize <= 0:
+                return response
+            if key in self._entries:
+                self._discard(key)
+            tags = frozenset(tags)
+            self._entries[key] = (response, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._discard(next(iter(self._entries)))
+        return response
+
+    def _discard(self, key):
+        _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags[tag]
+            keys.discard(key)
+            if not keys:
+                del self._tags[tag]
+
+    def invalidate(self, *tags):
+        """
+        Drops the entries carrying any of the tags.
+        """
+        with self._lock:
+            self.generation += 1
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._discard(key)
+
+    def clear(self):
+        """
+        Drops all entries.
+        """
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._tags.clear()
+
+    def __call__(self, change):
+        """
+        Invalidates the entries affected by an inventory Change.
+        """
+        if change.op == 'reset':
+            self.clear()
+        elif change.kind == 'link':
+            return
+        elif change.kind == 'supplier':
+            self.invalidate('suppliers')
+        elif change.op == 'increase_price':
+            self.invalidate('price')
+        elif change.op == 'update' and change.before is not None and change.after is not None and not any(
+                change.before[field] != change.after[field] for field in _LIST_FIELDS):
+            self.invalidate(('product', change.key))
+        else:
+            self.invalidate(('product', change.key), 'product-list')
+
+    def stats(self):
+        """
+        Returns the hit and miss counters and the number of entries.
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries), 'maxsize': self.maxsize}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return f"ResponseCache(size={len(self._entries)}, maxsize={self.maxsize})"
@@ -0,0 +1,99 @@
+import threading
+
+
+class ChangeFeed:
+    """
+    A bounded, sequenced log of the changes of an Inventory, for consumers
+    that sync incrementally instead of re-reading the whole catalogue.
+
+    Registered as a listener on the inventory, the feed numbers every
+    Change with the next sequence number, starting at 1, and keeps the last
+    ``maxsize`` of them in a ring buffer: change ``seq`` lives in slot
+    ``seq % maxsize`` until it is overwritten by change ``seq + maxsize``.
+
+    A consumer remembers the sequence number of the last change it applied
+    and asks for the changes after it with ``read``. If some of those have
+    already been overwritten, or the number is ahead of the feed (e.g. the
+    server restarted), the consumer cannot catch up from the feed and must
+    resync: note ``last_seq``, reload the catalogue and continue from
+    there. A 'reset' change (the inventory was reloaded) calls for the
+    same.
+
+    Attributes
+    ----------
+    maxsize : int
+        Number of changes kept.
+    last_seq : int
+        Sequence number of the latest change, 0 before the first one.
+    """
+    def __init__(self, maxsize=10000):
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self.maxsize = maxsize
+        self.last_seq = 0
+        self._ring = [None] * maxsize
+        self._cond = threading.Condition(threading.Lock())
+
+    def __call__(self, change):
+        """
+        Appends an inventory Change to the feed.
+        """
+        with self._cond:
+            seq = self.last_seq + 1
+            self._ring[seq % self.maxsize] = {
+                'seq': seq,
+                'op': change.op,
+                'kind': change.kind,
+                'key': change.key,
+                'before': change.before,
+                'after': change.after
+            }
+            self.last_seq = seq
+            self._cond.notify_all()
+
+    @property
+    def first_seq(self):
+        """
+        Sequence number of the oldest change still kept.
+        """
+        return max(1, self.last_seq - self.maxsize + 1)
+
+    def read(self, since=0, limit=None, timeout=0):
+        """
+        Returns the changes after a sequence number, waiting for one if
+        there is none yet.
+
+        Parameters
+        ----------
+        since : int
+            Sequence number of the last change the consumer has seen; 0 for
+            none.
+        limit : int, optional
+            Maximum number of changes to return.
+        timeout : float
+            Seconds to wait for a change when there is none after
+            ``since``; 0 to return at once.
+
+        Returns
+        -------
+        tuple
+            ``(changes, resync)``: a list of change dicts with the keys
+            'seq', 'op', 'kind', 'key', 'before' and 'after', in sequence
+            order, and whether the consumer must resync instead (the list
+            is then empty).
+        """
+        with self._cond:
+            if timeout > 0 and since == self.last_seq:
+                self._cond.wait_for(lambda: self.last_seq != since, timeout)
+            last_seq = self.last_seq
+            if since > last_seq or since + 1 < self.first_seq:
+                return [], True
+            end = last_seq if limit is None else min(last_seq, since + limit)
+            ring = self._ring
+            return [ring[seq % self.maxsize] for seq in range(since + 1, end + 1)], False
+
+    def __len__(self):
+        return self.last_seq - self.first_seq + 1
+
+    def __repr__(self):
+        return f"ChangeFeed(last_seq={self.last_seq}, size={len(self)}, maxsize={self.maxsize})"
@@ -0,0 +1,393 @@
+from itertools import islice
+
+import numpy as np
+
+from scripts.inventory_man import InsufficientStock, Product, _as_list, _shared
+
+class ColumnarProductStore:
+    """
+    A product store that keeps the catalogue in column arrays.
+
+    IDs, prices and quantities live in NumPy arrays and names and
+    descriptions in parallel Python lists, so a product costs a few dozen
+    bytes instead of a full object. Catalogue-wide operations such as
+    ``increase_price`` and ``stock_value`` run as single vectorized array
+    operations. Product objects are only built on demand, so changes must be
+    made through ``update`` (as ``Inventory.update_product`` does) rather
+    than by mutating a returned product.
+
+    Removed rows are left as holes and compacted away once they make up
+    half of the table, which keeps removal O(1) and iteration in insertion
+    order.
+
+    Attributes
+    ----------
+    capacity : int
+        Number of rows currently allocated in the arrays.
+    """
+    _MIN_CAPACITY = 1024
+
+    def __init__(self, capacity=_MIN_CAPACITY):
+        """
+        Constructs an empty columnar store.
+
+        Parameters
+        ----------
+        capacity : int
+            Number of rows to preallocate.
+        """
+        self._reset(capacity)
+
+    def _reset(self, capacity):
+        capacity = max(capacity, 1)
+        self._ids = np.zeros(capacity, dtype=np.int64)
+        self._prices = np.zeros(capacity, dtype=np.float64)
+        self._quantities = np.zeros(capacity, dtype=np.int64)
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._names = [None] * capacity
+        self._descriptions = [None] * capacity
+        self._rows = {}
+        self._size = 0
+
+    @property
+    def capacity(self):
+        return len(self._ids)
+
+    def _resize(self, capacity):
+        used = self._size
+        for attr in ('_ids', '_prices', '_quantities', '_alive'):
+            old = getattr(self, attr)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:used] = old[:used]
+            setattr(self, attr, new)
+        self._names = self._names[:used] + [None] * (capacity - used)
+        self._descriptions = self._descriptions[:used] + [None] * (capacity - used)
+
+    def _compact(self):
+        """
+        Moves the live rows to the front of the arrays, preserving order.
+        """
+        keep = np.flatnonzero(self._alive[:self._size])
+        count = len(keep)
+        for attr in ('_ids', '_prices', '_quantities'):
+            column = getattr(self, attr)
+            column[:count] = column[keep]
+            column[count:self._size] = 0
+        self._alive[:count] = True
+        self._alive[count:self._size] = False
+        rows = keep.tolist()
+        for column in (self._names, self._descriptions):
+            column[:count] = [column[row] for row in rows]
+            column[count:self._size] = [None] * (self._size - count)
+        self._size = count
+        self._rows = dict(zip(self._ids[:count].tolist(), range(count)))
+
+    def _product(self, row):
+        return Product(int(self._ids[row]), self._names[row], self._descriptions[row],
+                       float(self._prices[row]), int(self._quantities[row]))
+
+    def add(self, product):
+        """
+        Adds a product to the store.
+
+        Parameters
+        ----------
+        product : Product
+            Product to be added. Its fields are copied into the columns.
+
+        Raises
+        ------
+        ValueError
+            If a product with the same ID is already stored.
+        """
+        if product.product_id in self._rows:
+            raise ValueError(f"Duplicate product_id: {product.product_id}")
+        if self._size == self.capacity:
+            if len(self._rows) <= self._size // 2:
+                self._compact()
+            else:
+                self._resize(self.capacity * 2)
+        row = self._size
+        self._ids[row] = product.product_id
+        self._prices[row] = product.price
+        self._quantities[row] = product.quantity
+        self._alive[row] = True
+        self._names[row] = product.name
+        self._descriptions[row] = product.description
+        self._rows[product.product_id] = row
+        self._size += 1
+
+    def extend_columns(self, ids, names, descriptions, prices, quantities):
+        """
+        Adds products given as whole columns, e.g. from a DataFrame.
+
+        Parameters
+        ----------
+        ids, names, descriptions, prices, quantities : sequence
+            Equal-length columns of product fields.
+
+        Raises
+        ------
+        ValueError
+            If a product ID is repeated or already stored. Nothing is added
+            then.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        count = len(ids)
+        start = self._size
+        new = dict(zip(ids.tolist(), range(start, start + count)))
+        if len(new) != count or not self._rows.keys().isdisjoint(new):
+            raise ValueError("Duplicate product_id in batch")
+        if start == 0 and count > self.capacity and self._adoptable(ids, prices, quantities):
+            # Take over the arrays (e.g. memory-mapped snapshot columns)
+            # instead of copying them
+            self._ids = ids
+            self._prices = prices
+            self._quantities = quantities
+            self._alive = np.ones(count, dtype=bool)
+            self._names = _as_list(names)
+            self._descriptions = list(map(_shared, _as_list(descriptions)))
+            self._rows = new
+            self._size = count
+            return
+        if start + count > self.capacity:
+            self._resize(max(self.capacity * 2, start + count))
+        end = start + count
+        self._ids[start:end] = ids
+        self._prices[start:end] = prices
+        self._quantities[start:end] = quantities
+        self._alive[start:end] = True
+        self._names[start:end] = _as_list(names)
+        self._descriptions[start:end] = map(_shared, _as_list(descriptions))
+        self._rows.update(new)
+        self._size = end
+
+    @staticmethod
+    def _adoptable(ids, prices, quantities):
+        return all(
+            isinstance(column, np.ndarray) and column.dtype == dtype and column.flags.writeable
+            for column, dtype in ((ids, np.int64), (prices, np.float64), (quantities, np.int64))
+        )
+
+    def columns(self):
+        """
+        Returns the stored products as columns, in insertion order.
+
+        Returns
+        -------
+        dict
+            Arrays (numeric fields) and lists (text fields) keyed by field
+            name.
+        """
+        size = self._size
+        alive = self._alive[:size]
+        rows = np.flatnonzero(alive).tolist()
+        return {
+            'product_id': self._ids[:size][alive],
+            'name': [self._names[row] for row in rows],
+            'description': [self._descriptions[row] for row in rows],
+            'price': self._prices[:size][alive],
+            'quantity': self._quantities[:size][alive]
+        }
+
+    def get(self, product_id):
+        """
+        Builds the Product stored under an ID.
+
+        Parameters
+        ----------
+        product_id : int
+            ID of the product to be retrieved.
+
+        Returns
+        -------
+        Product
+            A new Product built from the columns if found, None otherwise.
+        """
+        row = self._rows.get(product_id)
+        if row is None:
+            return None
+        return self._product(row)
+
+    def update(self, product_id, **fields):
+        """
+        Sets fields of a stored product.
+
+        Parameters
+        ----------
+        product_id : int
+            ID of the product to be updated.
+        **fields
+            Product attribute names and their new values.
+
+        Returns
+        -------
+        bool
+            True if the product was found, False otherwise.
+        """
+        row = self._rows.get(product_id)
+        if row is None:
+            return False
+        for name, value in fields.items():
+            if name == 'price':
+                self._prices[row] = value
+            elif name == 'quantity':
+                self._quantities[row] = value
+            elif name == 'name':
+                self._names[row] = value
+            elif name == 'description':
+                self._descriptions[row] = value
+            else:
+                raise AttributeError(f"Product has no field {name!r}")
+        return True
+
+    def remove(self, product_id):
+        """
+        Removes a product by ID.
+
+        Parameters
+        ----------
+        product_id : int
+            ID of the product to be removed.
+
+        Returns
+        -------
+        bool
+            True if the product was removed, False if it was not found.
+        """
+        row = self._rows.pop(product_id, None)
+        if row is None:
+            return False
+        # Zeroed price and quantity keep the dead row out of the aggregates
+        self._prices[row] = 0
+        self._quantities[row] = 0
+        self._alive[row] = False
+        self._names[row] = None
+        self._descriptions[row] = None
+        if self._size > self._MIN_CAPACITY and len(self._rows) < self._size // 2:
+            self._compact()
+        return True
+
+    def clear(self):
+        """
+        Removes all products from the store.
+        """
+        self._reset(self._MIN_CAPACITY)
+
+    def keys(self):
+        """
+        Returns a view of the stored product IDs in insertion order.
+        """
+        return self._rows.keys()
+
+    def increase_price(self, percentage):
+        """
+        Increases the price of all stored products by a percentage.
+
+        Parameters
+        ----------
+        percentage : float
+            Percentage by which to increase the price of all products.
+        """
+        prices = self._prices[:self._size]
+        prices += prices * (percentage / 100)
+
+    def stock_value(self):
+        """
+        Returns the total value of the stock, summed over price * quantity.
+
+        Returns
+        -------
+        float
+            Total stock value.
+        """
+        size = self._size
+        return float(np.dot(self._prices[:size], self._quantities[:size]))
+
+    def low_stock(self, threshold):
+        """
+        Returns the IDs of products whose quantity is below a threshold.
+
+        Parameters
+        ----------
+        threshold : int
+            Quantity below which a product counts as low on stock.
+
+        Returns
+        -------
+        list
+            Product IDs in insertion order.
+        """
+        size = self._size
+        mask = self._alive[:size] & (self._quantities[:size] < threshold)
+        return self._ids[:size][mask].tolist()
+
+    def adjust_quantities(self, deltas):
+        """
+        Adds per-product deltas to the stock quantities.
+
+        Parameters
+        ----------
+        deltas : dict
+            Mapping of product ID to the amount to add to its quantity.
+            IDs that are not stored are ignored.
+
+        Returns
+        -------
+        int
+            Number of products adjusted.
+        """
+        rows = []
+        amounts = []
+        for product_id, delta in deltas.items():
+            row = self._rows.get(product_id)
+            if row is not None:
+                rows.append(row)
+                amounts.append(delta)
+        np.add.at(self._quantities, np.asarray(rows, dtype=np.intp), np.asarray(amounts, dtype=np.int64))
+        return len(rows)
+
+    def add_quantity(self, product_id, delta):
+        """
+        Adds a delta to one product's stock quantity unless that would take
+        it below zero. Takes the arguments and returns the result of
+        ``ProductStore.add_quantity``.
+        """
+        row = self._rows.get(product_id)
+        if row is None:
+            return None
+        quantity = int(self._quantities[row]) + delta
+        if quantity < 0:
+            raise InsufficientStock(product_id, quantity - delta, delta)
+        self._quantities[row] = quantity
+        return quantity
+
+    def __contains__(self, product_id):
+        return product_id in self._rows
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __iter__(self):
+        alive = self._alive
+        for row in range(self._size):
+            if alive[row]:
+                yield self._product(row)
+
+    def __getitem__(self, index):
+        """
+        Returns the product(s) at a position in insertion order.
+
+        Positional access is kept for compatibility with the former list
+        storage and costs O(n); use ``get`` for keyed lookups.
+        """
+        if isinstance(index, slice):
+            return list(self)[index]
+        if index < 0:
+            index += len(self._rows)
+        if not 0 <= index < len(self._rows):
+            raise IndexError("store index out of range")
+        return next(islice(iter(self), index, None))
+
+    def __repr__(self):
+        return f"ColumnarProductStore(size={len(self._rows)}, capacity={self.capacity})"
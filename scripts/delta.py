@@ -0,0 +1,217 @@
+"""
+Incremental saves of an Inventory's CSV files.
+
+After a full save or load, an Inventory tracks which products and suppliers
+change. ``Inventory.save_to_csv(..., incremental=True)`` then writes only
+those records, to a delta file next to each base CSV file::
+
+    products.csv          base, written in full
+    products.csv.delta    records changed or removed since then
+
+A delta file is NDJSON: a header line ``{"base": <stamp>}`` naming the base
+file it applies to, then one record per changed ID with the base file's
+column names, or ``{"ID": ..., "Removed": true}`` for a removed one. Each
+delta holds every change since the base was written, so saving replaces it
+rather than appending. ``Inventory.load_from_csv`` applies the deltas,
+and a full save folds them back into the base files (merging) and deletes
+them. Every file is written to a temporary file and renamed into place, so
+a crash mid-save leaves the previous file intact, and a delta whose base has
+since been rewritten is ignored. To merge the deltas of a pair of files
+without an Inventory at hand::
+
+    python -m scripts.delta products.csv suppliers.csv
+"""
+import argparse
+import json
+import os
+
+# An incremental save merges the deltas into the base files instead once
+# they hold more than this fraction of the records
+MERGE_RATIO = 0.2
+
+
+def delta_path(path):
+    """
+    Returns the path of the delta file of a base file.
+    """
+    return path + '.delta'
+
+
+def file_stamp(path):
+    """
+    Returns a string identifying the current version of a file, or None if
+    it does not exist. Files are replaced by renaming a new file over them,
+    so the inode number tells versions apart even when the coarse
+    modification times of two quick saves match.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return f"{stat.st_ino}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def write_atomic(path, write, mode='w'):
+    """
+    Writes a file through a temporary file that is fsynced and renamed over
+    ``path``, so readers and crashes see either the old or the new file.
+
+    Parameters
+    ----------
+    path : str
+        File to create or replace.
+    write : callable
+        Called with the open temporary file to write the contents.
+    mode : str
+        Mode to open the temporary file in.
+    """
+    tmp_path = path + '.tmp'
+    try:
+        with open(tmp_path, mode, newline='' if 'b' not in mode else None) as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def write_delta(path, records, removed):
+    """
+    Writes the delta file of a base file.
+
+    Parameters
+    ----------
+    path : str
+        Base file the delta applies to.
+    records : iterable
+        Dicts of the changed records, keyed by the base file's columns.
+    removed : iterable
+        IDs of the removed records.
+    """
+    def write(f):
+        f.write(json.dumps({'base': file_stamp(path)}) + '\n')
+        for record in records:
+            f.write(json.dumps(record) + '\n')
+        for key in removed:
+            f.write(json.dumps({'ID': key, 'Removed': True}) + '\n')
+
+    write_atomic(delta_path(path), write)
+
+
+def read_delta(path):
+    """
+    Reads the delta file of a base file.
+
+    Parameters
+    ----------
+    path : str
+        Base file the delta applies to.
+
+    Returns
+    -------
+    tuple
+        ``(records, removed)``: the changed records, as dicts keyed by the
+        base file's columns, and the IDs of the removed ones. Both are empty
+        if there is no delta or it was written for another version of the
+        base file.
+    """
+    try:
+        with open(delta_path(path)) as f:
+            lines = f.read().splitlines()
+    except FileNotFoundError:
+        return [], []
+    if not lines or json.loads(lines[0]).get('base') != file_stamp(path):
+        return [], []
+    records = []
+    removed = []
+    for line in lines[1:]:
+        record = json.loads(line)
+        if record.get('Removed'):
+            removed.append(record['ID'])
+        else:
+            records.append(record)
+    return records, removed
+
+
+def remove_delta(path):
+    """
+    Deletes the delta file of a base file, if any.
+    """
+    try:
+        os.remove(delta_path(path))
+    except FileNotFoundError:
+        pass
+
+
+class DeltaTracker:
+    """
+    The IDs of the products and suppliers changed since a pair of CSV files
+    was last written in full.
+
+    Attributes
+    ----------
+    product_file, supplier_file : str
+        The base files.
+    products, suppliers : dict
+        IDs of the records added, changed or removed since, as keys in the
+        order they were first changed.
+    everything : bool
+        Whether a catalogue-wide change (e.g. a price increase) touched
+        every product, so only a full save makes sense.
+    """
+    def __init__(self, product_file, supplier_file):
+        self.product_file = product_file
+        self.supplier_file = supplier_file
+        self.products = {}
+        self.suppliers = {}
+        self.everything = False
+
+    def tracks(self, product_file, supplier_file):
+        """
+        Returns whether the tracker's base files are the given ones.
+        """
+        return (os.path.abspath(product_file) == os.path.abspath(self.product_file)
+                and os.path.abspath(supplier_file) == os.path.abspath(self.supplier_file))
+
+    def __len__(self):
+        return len(self.products) + len(self.suppliers)
+
+    def __repr__(self):
+        return f"DeltaTracker(products={len(self.products)}, suppliers={len(self.suppliers)})"
+
+
+def merge_csv_delta(product_file, supplier_file):
+    """
+    Folds the delta files of a pair of inventory CSV files into them.
+
+    Parameters
+    ----------
+    product_file : str
+        Name of the products CSV file.
+    supplier_file : str
+        Name of the suppliers CSV file.
+    """
+    # Imported here because inventory_man imports this module
+    from scripts.columnar import ColumnarProductStore
+    from scripts.inventory_man import Inventory
+
+    inventory = Inventory(product_store=ColumnarProductStore())
+    inventory.load_from_csv(product_file, supplier_file)
+    inventory.save_to_csv(product_file, supplier_file)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Merge the delta files of inventory CSV files into them.")
+    parser.add_argument('product_file')
+    parser.add_argument('supplier_file')
+    args = parser.parse_args(argv)
+    merge_csv_delta(args.product_file, args.supplier_file)
+
+
+if __name__ == '__main__':
+    main()
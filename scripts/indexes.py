@@ -0,0 +1,198 @@
+from bisect import bisect_left, bisect_right
+
+# Upper bound for the keys starting with a given text prefix
+_MAX_CHAR = '\U0010ffff'
+
+
+def _sort_key(field, fields):
+    value = fields[field]
+    return value.lower() if field == 'name' else value
+
+
+class ProductIndex:
+    """
+    Secondary indexes over the products of an Inventory.
+
+    Keeps one sorted list of ``(key, product_id)`` pairs per indexed field:
+    product ID, price, quantity and lower-cased name. Range filters, name
+    prefix lookups and sorted pagination are then served with binary
+    searches instead of a scan of the catalogue. The index follows the
+    inventory's changes as a listener; after ``increase_price`` the price
+    list is rebuilt lazily the next time it is used.
+
+    Attributes
+    ----------
+    FIELDS : tuple
+        Names of the indexed product fields.
+    """
+    FIELDS = ('product_id', 'price', 'quantity', 'name')
+
+    def __init__(self, products):
+        """
+        Builds the index over a product store.
+
+        Parameters
+        ----------
+        products : ProductStore
+            Store whose products are to be indexed. It is kept to rebuild
+            the price list.
+        """
+        self._products = products
+        self.rebuild()
+
+    def rebuild(self):
+        """
+        Rebuilds every sorted list from the product store.
+        """
+        # Imported here because inventory_man imports this module
+        from scripts.inventory_man import _as_list
+
+        # Columns may be NumPy arrays; their values are indexed as Python
+        # scalars, which page cursors can be encoded from
+        columns = self._products.columns()
+        ids = _as_list(columns['product_id'])
+        self._keys = {}
+        for field in self.FIELDS:
+            values = _as_list(columns[field])
+            if field == 'name':
+                values = [value.lower() for value in values]
+            self._keys[field] = sorted(zip(values, ids))
+        self._price_stale = False
+
+    @property
+    def stale(self):
+        """
+        Whether a sorted list needs rebuilding before it can be used.
+        """
+        return self._price_stale
+
+    def refresh(self):
+        """
+        Rebuilds the sorted lists that went stale.
+        """
+        if self._price_stale:
+            # Imported here because inventory_man imports this module
+            from scripts.inventory_man import _as_list
+
+            columns = self._products.columns()
+            self._keys['price'] = sorted(zip(_as_list(columns['price']), _as_list(columns['product_id'])))
+            self._price_stale = False
+
+    def _sorted(self, field):
+        if field == 'price':
+            self.refresh()
+        return self._keys[field]
+
+    def _insert(self, fields):
+        product_id = fields['product_id']
+        for field in self.FIELDS:
+            if field == 'price' and self._price_stale:
+                continue
+            entries = self._keys[field]
+            entry = (_sort_key(field, fields), product_id)
+            position = bisect_left(entries, entry)
+            # A record indexed by a concurrent rebuild may be inserted again
+            if position == len(entries) or entries[position] != entry:
+                entries.insert(position, entry)
+
+    def _delete(self, fields):
+        product_id = fields['product_id']
+        for field in self.FIELDS:
+            if field == 'price' and self._price_stale:
+                continue
+            entries = self._keys[field]
+            entry = (_sort_key(field, fields), product_id)
+            position = bisect_left(entries, entry)
+            if position < len(entries) and entries[position] == entry:
+                del entries[position]
+
+    def __call__(self, change):
+        """
+        Applies an inventory Change to the index.
+        """
+        if change.op == 'reset':
+            self.rebuild()
+        elif change.kind != 'product':
+            return
+        elif change.op == 'increase_price':
+            self._price_stale = True
+        else:
+            if change.before is not None:
+                self._delete(change.before)
+            if change.after is not None:
+                self._insert(change.after)
+
+    def range(self, field, low=None, high=None, prefix=None):
+        """
+        Returns the positions of the entries within a key range.
+
+        Parameters
+        ----------
+        field : str
+            Indexed field.
+        low : object, optional
+            Smallest key to include.
+        high : object, optional
+            Largest key to include.
+        prefix : str, optional
+            Text prefix of the keys to include (for the name field).
+
+        Returns
+        -------
+        tuple
+            ``(start, end)`` slice of the field's sorted entries.
+        """
+        entries = self._sorted(field)
+        if prefix is not None:
+            low = prefix.lower()
+            high = low + _MAX_CHAR
+        start = 0 if low is None else bisect_left(entries, (low,))
+        end = len(entries) if high is None else bisect_right(entries, (high, float('inf')))
+        return start, end
+
+    def below(self, field, limit):
+        """
+        Returns the positions of the entries whose key is below a limit.
+
+        Returns
+        -------
+        tuple
+            ``(start, end)`` slice of the field's sorted entries.
+        """
+        return 0, bisect_left(self._sorted(field), (limit,))
+
+    def scan(self, field, start, end, descending=False, after=None):
+        """
+        Iterates the product IDs of a slice of a field's sorted entries.
+
+        Parameters
+        ----------
+        field : str
+            Indexed field.
+        start, end : int
+            Slice of the sorted entries to iterate.
+        descending : bool
+            Iterate from the largest key down.
+        after : tuple, optional
+            ``(key, product_id)`` entry to resume after, in iteration order.
+
+        Yields
+        ------
+        tuple
+            ``(key, product_id)`` entries.
+        """
+        entries = self._sorted(field)
+        if after is not None:
+            if descending:
+                end = min(end, bisect_left(entries, after))
+            else:
+                start = max(start, bisect_right(entries, after))
+        if descending:
+            for position in range(end - 1, start - 1, -1):
+                yield entries[position]
+        else:
+            for position in range(start, end):
+                yield entries[position]
+
+    def __repr__(self):
+        return f"ProductIndex(size={len(self._keys['product_id'])})"
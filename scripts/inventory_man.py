@@ -1,5 +1,180 @@
+import functools
+import json
+import sys
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager, nullcontext
+from itertools import islice
+from operator import attrgetter, itemgetter, methodcaller
+
 import pandas as pd
 
+from scripts.aggregates import LOW_STOCK_THRESHOLDS, StockAggregates, compute_stats
+from scripts.delta import MERGE_RATIO, DeltaTracker, read_delta, remove_delta, write_atomic, write_delta
+from scripts.indexes import ProductIndex
+from scripts.links import LinkIndex
+from scripts.locking import RWLock, StripedLock
+from scripts.parallel_csv import load_products, write_products
+from scripts.search import SearchIndex
+from scripts.snapshot import read_snapshot, write_snapshot
+
+# Column dtypes of the CSV files written by Inventory.save_to_csv
+PRODUCT_CSV_DTYPES = {'ID': 'int64', 'Name': str, 'Description': str, 'Price': 'float64', 'Quantity': 'int64'}
+SUPPLIER_CSV_DTYPES = {'ID': 'int64', 'Name': str, 'Contact Info': str, 'Supplied Products': str}
+
+
+# A mutation of an Inventory, as passed to its listeners. ``kind`` is
+# 'product' or 'supplier' and ``key`` the product or supplier ID; ``before``
+# and ``after`` are dicts of the record's fields (None when it did not or no
+# longer exists). Catalogue-wide changes have no key: 'increase_price'
+# carries {'percentage': ...} as ``after`` and 'reset' (after a load)
+# carries nothing. Linking a product to a supplier is an 'add' or 'remove'
+# of kind 'link' keyed by (product_id, supplier_id); the links dropped when
+# a product or supplier is removed are not reported separately, but are
+# still in ``Inventory.links`` while the removal is reported.
+Change = namedtuple('Change', ['op', 'kind', 'key', 'before', 'after'])
+
+
+class InsufficientStock(ValueError):
+    """
+    Raised when a stock adjustment would take a product's quantity below
+    zero. The quantity is left unchanged.
+
+    Attributes
+    ----------
+    product_id : int
+        Product that was adjusted.
+    quantity : int
+        Quantity in stock when the adjustment was refused.
+    delta : int
+        Amount that was to be added to the quantity.
+    """
+    def __init__(self, product_id, quantity, delta):
+        super().__init__(f"Insufficient stock for product {product_id}: {quantity} in stock, {-delta} requested")
+        self.product_id = product_id
+        self.quantity = quantity
+        self.delta = delta
+
+    def __reduce__(self):
+        # Rebuilt from the fields, e.g. when raised in a shard's worker process
+        return type(self), (self.product_id, self.quantity, self.delta)
+
+
+def _locked(mode, key=None):
+    """
+    Decorates an Inventory method to run under the inventory's lock when it
+    is thread-safe.
+
+    Parameters
+    ----------
+    mode : str
+        'read' to share the lock with other readers, 'write' to hold it
+        alone, or 'key' to share it while holding the stripe lock of the
+        record the method changes.
+    key : str, optional
+        For 'key' mode, the name of the parameter holding the record's ID.
+        It must be the method's first parameter.
+    """
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            lock = self._lock
+            if lock is None:
+                return method(self, *args, **kwargs)
+            if mode == 'read':
+                with lock.read():
+                    return method(self, *args, **kwargs)
+            if mode == 'write':
+                with lock.write():
+                    return method(self, *args, **kwargs)
+            with lock.read(), self._stripes(args[0] if args else kwargs[key]):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def _journaled(method):
+    """
+    Decorates an Inventory mutation so that it is logged to the inventory's
+    journal, if one is attached.
+
+    The mutation is applied and logged under the journal lock, so the log
+    order matches the order the mutations were applied in. Calls that raise
+    or return False (e.g. removing an unknown ID) are not logged, and
+    neither are mutations made by another journaled method.
+    """
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        journal = self.journal
+        if journal is None:
+            return method(self, *args, **kwargs)
+        with journal.lock:
+            journal.depth += 1
+            try:
+                result = method(self, *args, **kwargs)
+            finally:
+                journal.depth -= 1
+            if result is not False and journal.depth == 0:
+                journal.append(name, args, kwargs)
+        return result
+    return wrapper
+
+
+def _supplier_fields(supplier):
+    if supplier is None:
+        return None
+    return supplier.to_dict()
+
+
+def _product_row(product):
+    return {
+        'ID': product.product_id,
+        'Name': product.name,
+        'Description': product.description,
+        'Price': product.price,
+        'Quantity': product.quantity
+    }
+
+
+def _supplier_row(supplier, links):
+    return {
+        'ID': supplier.supplier_id,
+        'Name': supplier.name,
+        'Contact Info': supplier.contact_info,
+        'Supplied Products': ' '.join(map(str, links.products_of(supplier.supplier_id)))
+    }
+
+
+def _as_list(column):
+    """
+    Returns a column (list, NumPy array or pandas Series) as a list of
+    Python scalars.
+    """
+    return column.tolist() if hasattr(column, 'tolist') else list(column)
+
+
+def _get_many(store, keys):
+    """
+    Retrieves several records from a store, with one call to its
+    ``get_many`` if it has one (e.g. a sharded store, which then makes one
+    round trip per shard rather than per record).
+    """
+    get_many = getattr(store, 'get_many', None)
+    return get_many(keys) if get_many is not None else [store.get(key) for key in keys]
+
+
+def _shared(value):
+    """
+    Returns the copy of a string kept in the interpreter's table of interned
+    strings (see ``sys.intern``), so that every product or supplier with the
+    same description or contact info holds one string between them. Values
+    that are not strings are returned as they are.
+    """
+    return sys.intern(value) if type(value) is str else value
+
 class Product:
     '''
     A class to represent a product in the inventory.
@@ -17,6 +192,9 @@ class Product:
     quantity : int
         Quantity of the product in stock.
     '''
+    # No per-instance __dict__: a catalogue holds millions of products
+    __slots__ = ('product_id', 'name', 'description', 'price', 'quantity')
+
     def __init__(self, product_id, name, description, price, quantity):
         """
         Constructs all the necessary attributes for the product object.
@@ -36,7 +214,7 @@ class Product:
         """
         self.product_id = product_id
         self.name = name
-        self.description = description
+        self.description = _shared(description)
         self.price = price
         self.quantity = quantity
 
@@ -81,8 +259,11 @@ class Supplier:
     contact_info : str
         Contact information of the supplier.
     supplied_products : list
-        List of products supplied by the supplier.
+        List of products supplied by the supplier, allocated when first
+        used.
     """
+    __slots__ = ('supplier_id', 'name', 'contact_info', '_supplied_products')
+
     def __init__ (self, supplier_id, name, contact_info):
         """
         Constructs all the necessary attributes for the supplier object.
@@ -98,8 +279,33 @@ class Supplier:
         """
         self.supplier_id = supplier_id
         self.name = name
-        self.contact_info = contact_info
-        self.supplied_products = []
+        self.contact_info = _shared(contact_info)
+        self._supplied_products = None
+
+    @property
+    def supplied_products(self):
+        if self._supplied_products is None:
+            self._supplied_products = []
+        return self._supplied_products
+
+    @supplied_products.setter
+    def supplied_products(self, value):
+        self._supplied_products = value
+
+    def to_dict(self):
+        """
+        Returns a dictionary representation of the supplier object.
+
+        Returns
+        -------
+        dict
+            Dictionary representation of the supplier.
+        """
+        return {
+            'supplier_id': self.supplier_id,
+            'name': self.name,
+            'contact_info': self.contact_info
+        }
 
     def __repr__(self):
         """
@@ -112,26 +318,411 @@ class Supplier:
             """
         return f"Supplier(ID={self.supplier_id}, Name={self.name}, Contact Info={self.contact_info})"
 
+class KeyedStore:
+    """
+    An insertion-ordered store of objects keyed by one of their attributes.
+
+    Lookup, update and removal by key are O(1). Iteration yields the stored
+    objects in insertion order, so the store can be used wherever the
+    inventory previously exposed a plain list.
+
+    Attributes
+    ----------
+    key_attr : str
+        Name of the attribute holding each object's unique identifier.
+    """
+    def __init__(self, key_attr):
+        """
+        Constructs an empty store.
+
+        Parameters
+        ----------
+        key_attr : str
+            Name of the attribute holding each object's unique identifier.
+        """
+        self.key_attr = key_attr
+        self._items = {}
+
+    def add(self, item):
+        """
+        Adds an object to the store.
+
+        Parameters
+        ----------
+        item : object
+            Object to be added to the store.
+
+        Raises
+        ------
+        ValueError
+            If an object with the same key is already stored.
+        """
+        key = getattr(item, self.key_attr)
+        if key in self._items:
+            raise ValueError(f"Duplicate {self.key_attr}: {key}")
+        self._items[key] = item
+
+    def get(self, key):
+        """
+        Retrieves an object by key.
+
+        Parameters
+        ----------
+        key : int
+            Key of the object to be retrieved.
+
+        Returns
+        -------
+        object
+            Stored object if found, None otherwise.
+        """
+        return self._items.get(key)
+
+    def update(self, key, **fields):
+        """
+        Sets attributes on a stored object.
+
+        Parameters
+        ----------
+        key : int
+            Key of the object to be updated.
+        **fields
+            Attribute names and their new values.
+
+        Returns
+        -------
+        bool
+            True if the object was found, False otherwise.
+        """
+        item = self._items.get(key)
+        if item is None:
+            return False
+        for name, value in fields.items():
+            setattr(item, name, value)
+        return True
+
+    def remove(self, key):
+        """
+        Removes an object by key.
+
+        Parameters
+        ----------
+        key : int
+            Key of the object to be removed.
+
+        Returns
+        -------
+        bool
+            True if the object was removed, False if it was not found.
+        """
+        return self._items.pop(key, None) is not None
+
+    def clear(self):
+        """
+        Removes all objects from the store.
+        """
+        self._items.clear()
+
+    def extend(self, items):
+        """
+        Adds several objects to the store in one pass.
+
+        Parameters
+        ----------
+        items : iterable
+            Objects to be added to the store.
+
+        Raises
+        ------
+        ValueError
+            If a key is repeated or already stored. Nothing is added then.
+        """
+        items = list(items)
+        new = dict(zip(map(attrgetter(self.key_attr), items), items))
+        if len(new) != len(items) or not self._items.keys().isdisjoint(new):
+            raise ValueError(f"Duplicate {self.key_attr} in batch")
+        self._items.update(new)
+
+    def keys(self):
+        """
+        Returns a view of the stored keys in insertion order.
+        """
+        return self._items.keys()
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items.values())
+
+    def __getitem__(self, index):
+        """
+        Returns the object(s) at a position in insertion order.
+
+        Positional access is kept for compatibility with the former list
+        storage and costs O(n); use ``get`` for keyed lookups.
+        """
+        if isinstance(index, slice):
+            return list(self._items.values())[index]
+        if index < 0:
+            index += len(self._items)
+        if not 0 <= index < len(self._items):
+            raise IndexError("store index out of range")
+        return next(islice(self._items.values(), index, None))
+
+    def __repr__(self):
+        return f"KeyedStore(key_attr={self.key_attr!r}, size={len(self._items)})"
+
+class ProductStore(KeyedStore):
+    """
+    A keyed store of Product objects with catalogue-wide bulk operations.
+
+    This is the default product store of an Inventory. Alternative stores,
+    such as the columnar store in ``scripts.columnar``, implement the same
+    methods.
+    """
+    def __init__(self):
+        """
+        Constructs an empty product store.
+        """
+        super().__init__('product_id')
+
+    def extend_columns(self, ids, names, descriptions, prices, quantities):
+        """
+        Adds products given as whole columns, e.g. from a DataFrame.
+
+        Parameters
+        ----------
+        ids, names, descriptions, prices, quantities : sequence
+            Equal-length columns of product fields.
+
+        Raises
+        ------
+        ValueError
+            If a product ID is repeated or already stored. Nothing is added
+            then.
+        """
+        self.extend(map(Product, _as_list(ids), _as_list(names), _as_list(descriptions),
+                        _as_list(prices), _as_list(quantities)))
+
+    def columns(self):
+        """
+        Returns the stored products as columns, in insertion order.
+
+        Returns
+        -------
+        dict
+            Lists of product fields keyed by field name.
+        """
+        products = self._items.values()
+        return {
+            'product_id': [p.product_id for p in products],
+            'name': [p.name for p in products],
+            'description': [p.description for p in products],
+            'price': [p.price for p in products],
+            'quantity': [p.quantity for p in products]
+        }
+
+    def increase_price(self, percentage):
+        """
+        Increases the price of all stored products by a percentage.
+
+        Parameters
+        ----------
+        percentage : float
+            Percentage by which to increase the price of all products.
+        """
+        factor = percentage / 100
+        for product in self._items.values():
+            product.price += product.price * factor
+
+    def stock_value(self):
+        """
+        Returns the total value of the stock, summed over price * quantity.
+
+        Returns
+        -------
+        float
+            Total stock value.
+        """
+        return sum(p.price * p.quantity for p in self._items.values())
+
+    def low_stock(self, threshold):
+        """
+        Returns the IDs of products whose quantity is below a threshold.
+
+        Parameters
+        ----------
+        threshold : int
+            Quantity below which a product counts as low on stock.
+
+        Returns
+        -------
+        list
+            Product IDs in insertion order.
+        """
+        return [p.product_id for p in self._items.values() if p.quantity < threshold]
+
+    def adjust_quantities(self, deltas):
+        """
+        Adds per-product deltas to the stock quantities.
+
+        Parameters
+        ----------
+        deltas : dict
+            Mapping of product ID to the amount to add to its quantity.
+            IDs that are not stored are ignored.
+
+        Returns
+        -------
+        int
+            Number of products adjusted.
+        """
+        adjusted = 0
+        for product_id, delta in deltas.items():
+            product = self._items.get(product_id)
+            if product is not None:
+                product.quantity += delta
+                adjusted += 1
+        return adjusted
+
+    def add_quantity(self, product_id, delta):
+        """
+        Adds a delta to one product's stock quantity unless that would take
+        it below zero.
+
+        Parameters
+        ----------
+        product_id : int
+            Product to adjust.
+        delta : int
+            Amount to add to the quantity; negative to take stock out.
+
+        Returns
+        -------
+        int
+            New quantity, or None if the product is not stored.
+
+        Raises
+        ------
+        InsufficientStock
+            If the quantity would fall below zero. It is left unchanged.
+        """
+        product = self._items.get(product_id)
+        if product is None:
+            return None
+        quantity = product.quantity + delta
+        if quantity < 0:
+            raise InsufficientStock(product_id, product.quantity, delta)
+        product.quantity = quantity
+        return quantity
+
 class Inventory:
     """
     A class to represent an inventory.
 
     Attributes
     ----------
-    products : list
-        List of products in the inventory.
-    suppliers : list
-        List of suppliers for the inventory.
+    products : ProductStore
+        Products in the inventory, keyed by product ID.
+    suppliers : KeyedStore
+        Suppliers for the inventory, keyed by supplier ID.
+    links : LinkIndex
+        Links between the products and the suppliers that supply them.
+    journal : Journal
+        Write-ahead log the mutations are recorded to, if attached.
+    thread_safe : bool
+        Whether the inventory synchronizes concurrent callers.
     """
-    def __init__(self):
+    def __init__(self, product_store=None, thread_safe=False, supplier_store=None, link_store=None):
         """
         Constructs all the necessary attributes for the inventory object.
+
+        Parameters
+        ----------
+        product_store : ProductStore, optional
+            Store to keep the products in, e.g. a
+            ``scripts.columnar.ColumnarProductStore``, or a
+            ``scripts.sharded.ShardedProductStore`` to partition them over
+            worker processes, or a ``scripts.lazy.LazyProductStore`` to read
+            them from disk on demand. Defaults to a new ProductStore.
+        supplier_store : KeyedStore, optional
+            Store to keep the suppliers in. Defaults to a new KeyedStore.
+            Products, suppliers and links can be kept in a database shared
+            by several processes with the stores of
+            ``scripts.sqlite_store``.
+        link_store : LinkIndex, optional
+            Store to keep the product-supplier links in. Defaults to a new
+            LinkIndex.
+        thread_safe : bool
+            Synchronize the methods so the inventory can be shared between
+            threads. Reads share a reader/writer lock and run in parallel;
+            updates of a single product or supplier share it too and only
+            contend on a per-ID stripe lock; adding, removing and
+            catalogue-wide changes hold the lock alone. Listeners are called
+            one at a time, and so are saves to CSV.
+        """
+        self.products = product_store if product_store is not None else ProductStore()
+        self.suppliers = supplier_store if supplier_store is not None else KeyedStore('supplier_id')
+        self.links = link_store if link_store is not None else LinkIndex()
+        self.journal = None
+        self.thread_safe = thread_safe
+        self._listeners = []
+        self._index = None
+        self._search = None
+        self._aggregates = None
+        self._delta = None
+        if thread_safe:
+            self._lock = RWLock()
+            self._stripes = StripedLock()
+            self._emit_lock = threading.RLock()
+            self._index_lock = RWLock()
+            self._save_lock = threading.Lock()
+        else:
+            self._lock = self._stripes = self._index_lock = None
+            self._emit_lock = self._save_lock = nullcontext()
+
+    # Change Listeners
+    def add_listener(self, listener):
+        """
+        Registers a callable to be called with a Change after each mutation.
+
+        Parameters
+        ----------
+        listener : callable
+            Called as ``listener(change)`` once the change has been applied.
+        """
+        with self._emit_lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        """
+        Unregisters a listener added with add_listener.
+
+        Parameters
+        ----------
+        listener : callable
+            Listener to be removed.
         """
-        self.products = []
-        self.suppliers = []
+        with self._emit_lock:
+            self._listeners.remove(listener)
+
+    def _emit(self, op, kind, key=None, before=None, after=None):
+        change = Change(op, kind, key, before, after)
+        with self._emit_lock:
+            for listener in self._listeners:
+                listener(change)
 
+    def _product_fields(self, product_id):
+        product = self.products.get(product_id)
+        return product.to_dict() if product is not None else None
 
     # Product Management Methods
+    @_locked('write')
+    @_journaled
     def add_product(self, product):
         """
         Adds a product to the inventory.
@@ -140,24 +731,44 @@ class Inventory:
         ----------
         product : Product
             Product object to be added to the inventory.
+
+        Raises
+        ------
+        ValueError
+            If a product with the same ID is already in the inventory.
         """
-        self.products.append(product)
+        self.products.add(product)
+        if self._delta is not None:
+            self._delta.products[product.product_id] = None
+        if self._listeners:
+            self._emit('add', 'product', product.product_id, after=product.to_dict())
 
+    @_locked('write')
+    @_journaled
     def remove_product(self, product_id):
         """
         Removes a product from the inventory.
 
+        The product is unlinked from its suppliers.
+
         Parameters
         ----------
         product_id : int
             Unique identifier of the product to be removed.
         """
-        for i, product in enumerate(self.products):
-            if product.product_id == product_id:
-                del self.products[i]
-                return True
-        return False
+        before = self._product_fields(product_id) if self._listeners else None
+        removed = self.products.remove(product_id)
+        if removed:
+            if self._listeners:
+                self._emit('remove', 'product', product_id, before=before)
+            suppliers = self.links.remove_product(product_id)
+            if self._delta is not None:
+                self._delta.products[product_id] = None
+                self._delta.suppliers.update(dict.fromkeys(suppliers))
+        return removed
 
+    @_locked('key', 'product_id')
+    @_journaled
     def update_product(self, product_id, name=None, description=None, price=None, quantity=None):
         """
         Updates the details of a product in the inventory.
@@ -175,19 +786,27 @@ class Inventory:
         quantity : int
             New quantity of the product.
         """
-        product = self.get_product(product_id)
-        if product:
-            if name:
-                product.name = name
-            if description:
-                product.description = description
-            if price:
-                product.price = price
-            if quantity:
-                product.quantity = quantity
-            return True
-        return False
+        fields = {}
+        if name is not None:
+            fields['name'] = name
+        if description is not None:
+            fields['description'] = _shared(description)
+        if price is not None:
+            fields['price'] = price
+        if quantity is not None:
+            fields['quantity'] = quantity
+        if not self._listeners:
+            updated = self.products.update(product_id, **fields)
+        else:
+            before = self._product_fields(product_id)
+            updated = self.products.update(product_id, **fields)
+            if updated:
+                self._emit('update', 'product', product_id, before, self._product_fields(product_id))
+        if updated and self._delta is not None:
+            self._delta.products[product_id] = None
+        return updated
     
+    @_locked('read')
     def get_product(self, product_id):
         """
         Retrieves a product from the inventory.
@@ -202,11 +821,9 @@ class Inventory:
         Product
             Product object if found, None otherwise.
         """
-        for product in self.products:
-            if product.product_id == product_id:
-                return product
-        return None
+        return self.products.get(product_id)
     
+    @_locked('read')
     def get_all_products(self):
         """
         Retrieves all products from the inventory.
@@ -218,6 +835,186 @@ class Inventory:
         """
         return [repr(product) for product in self.products]
     
+    @_locked('read')
+    def query_products(self, min_price=None, max_price=None, quantity_below=None, name_prefix=None,
+                       sort='product_id', descending=False, offset=0, limit=100, after=None):
+        """
+        Retrieves a filtered, sorted page of products.
+
+        Filters and sorting are served from secondary indexes (see
+        ``scripts.indexes.ProductIndex``), which are built on the first
+        query and then kept up to date as the inventory changes. A product
+        store with a ``query`` method of its own, such as the SQLite store
+        that other processes may change too, answers the query itself. Pages can
+        be walked by offset, or by passing the previous page's ``next``
+        entry as ``after``, which stays cheap however deep the page.
+
+        Parameters
+        ----------
+        min_price : float, optional
+            Smallest price to include.
+        max_price : float, optional
+            Largest price to include.
+        quantity_below : int, optional
+            Only include products whose quantity is below this threshold.
+        name_prefix : str, optional
+            Only include products whose name starts with this prefix,
+            ignoring case.
+        sort : str
+            Field to sort by: 'product_id', 'price', 'quantity' or 'name'.
+        descending : bool
+            Sort from the largest value down.
+        offset : int
+            Number of matching products to skip.
+        limit : int
+            Maximum number of products to return.
+        after : tuple, optional
+            ``next`` entry of the previous page to continue from.
+
+        Returns
+        -------
+        dict
+            The page's Product objects under 'products', and under 'next'
+            the entry to pass as ``after`` for the following page, or None
+            if this is the last page.
+        """
+        if sort not in ProductIndex.FIELDS:
+            raise ValueError(f"Cannot sort by {sort!r}")
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        if hasattr(self.products, 'query'):
+            return self.products.query(min_price, max_price, quantity_below, name_prefix,
+                                       sort, descending, offset, limit, after)
+        with self._reading_index() as index:
+            ranges = {}
+            if min_price is not None or max_price is not None:
+                ranges['price'] = index.range('price', min_price, max_price)
+            if quantity_below is not None:
+                ranges['quantity'] = index.below('quantity', quantity_below)
+            if name_prefix:
+                ranges['name'] = index.range('name', prefix=name_prefix)
+                name_prefix = name_prefix.lower()
+
+            def matches(product):
+                return ((min_price is None or product.price >= min_price)
+                        and (max_price is None or product.price <= max_price)
+                        and (quantity_below is None or product.quantity < quantity_below)
+                        and (not name_prefix or product.name.lower().startswith(name_prefix)))
+
+            def size(bounds):
+                return bounds[1] - bounds[0]
+
+            sort_range = ranges.get(sort) or index.range(sort)
+            driver = min(ranges, key=lambda field: size(ranges[field]), default=sort)
+            if driver != sort and size(ranges[driver]) * 4 < size(sort_range):
+                # Few candidates: collect them through the most selective index
+                # and sort them, rather than walk the sort index past many misses
+                entries = []
+                for _, product_id in index.scan(driver, *ranges[driver]):
+                    product = self.products.get(product_id)
+                    if matches(product):
+                        key = product.name.lower() if sort == 'name' else getattr(product, sort)
+                        entries.append(((key, product_id), product))
+                entries.sort(key=itemgetter(0), reverse=descending)
+                if after is not None:
+                    after = tuple(after)
+                    entries = [e for e in entries if (e[0] < after if descending else e[0] > after)]
+                candidates = iter(entries)
+            else:
+                def walk(after):
+                    for entry in index.scan(sort, *sort_range, descending=descending, after=after):
+                        product = self.products.get(entry[1])
+                        if matches(product):
+                            yield entry, product
+                candidates = walk(tuple(after) if after is not None else None)
+
+            page = list(islice(candidates, offset, offset + limit + 1))
+            return {
+                'products': [product for _, product in page[:limit]],
+                'next': page[limit - 1][0] if len(page) > limit else None
+            }
+
+    def _product_index(self):
+        with self._emit_lock:
+            if self._index is None:
+                self._index = ProductIndex(self.products)
+                self.add_listener(self._update_index)
+        return self._index
+
+    def _update_index(self, change):
+        if self._index_lock is None:
+            self._index(change)
+        else:
+            with self._index_lock.write():
+                self._index(change)
+
+    @contextmanager
+    def _reading_index(self):
+        """
+        Yields the product index, held for reading in thread-safe mode.
+        """
+        index = self._product_index()
+        if self._index_lock is None:
+            yield index
+            return
+        if index.stale:
+            with self._index_lock.write():
+                index.refresh()
+        with self._index_lock.read():
+            yield index
+
+    @_locked('read')
+    def search_products(self, query, limit=20, offset=0):
+        """
+        Finds products by keywords in their name and description.
+
+        Every word of the query must occur in the product; the last one may
+        also be the start of a word, so queries can be run as they are
+        typed. Results are ranked by relevance, with name matches weighing
+        more than description matches (see ``scripts.search.SearchIndex``).
+        The index is built on the first search and then kept up to date as
+        the inventory changes. A product store with a ``search`` method of
+        its own, such as the SQLite store that other processes may change
+        too, answers the search itself.
+
+        Parameters
+        ----------
+        query : str
+            Words to search for.
+        limit : int
+            Maximum number of products to return.
+        offset : int
+            Number of best matches to skip.
+
+        Returns
+        -------
+        dict
+            The matching Product objects, best first, under 'products',
+            their relevance scores under 'scores' and the total number of
+            matches under 'total'.
+        """
+        if hasattr(self.products, 'search'):
+            return self.products.search(query, limit, offset)
+        with self._emit_lock:
+            if self._search is None:
+                self._search = SearchIndex(self.products)
+                self.add_listener(self._update_search)
+        if self._index_lock is None:
+            product_ids, scores, total = self._search.search(query, limit, offset)
+        else:
+            with self._index_lock.read():
+                product_ids, scores, total = self._search.search(query, limit, offset)
+        return {'products': _get_many(self.products, product_ids), 'scores': scores, 'total': total}
+
+    def _update_search(self, change):
+        if self._index_lock is None:
+            self._search(change)
+        else:
+            with self._index_lock.write():
+                self._search(change)
+
+    @_locked('write')
+    @_journaled
     def increase_price(self, percentage):
         """
         Increases the price of all products in the inventory by a percentage.
@@ -227,10 +1024,338 @@ class Inventory:
         percentage : float
             Percentage by which to increase the price of all products.
         """
-        for product in self.products:
-            product.price += product.price * (percentage / 100)
+        self.products.increase_price(percentage)
+        if self._delta is not None:
+            self._delta.everything = True
+        if self._listeners:
+            self._emit('increase_price', 'product', after={'percentage': percentage})
+
+    @_locked('read')
+    def stock_value(self):
+        """
+        Returns the total value of the stock in the inventory.
+
+        Returns
+        -------
+        float
+            Sum of price * quantity over all products.
+        """
+        return self.products.stock_value()
+
+    @_locked('read')
+    def low_stock(self, threshold):
+        """
+        Retrieves the IDs of products whose quantity is below a threshold.
+
+        Parameters
+        ----------
+        threshold : int
+            Quantity below which a product counts as low on stock.
+
+        Returns
+        -------
+        list
+            IDs of the low-stock products.
+        """
+        return self.products.low_stock(threshold)
+
+    def stats(self, verify=False, recompute=False):
+        """
+        Returns the stock aggregates of the inventory.
+
+        The aggregates are computed on the first call and then maintained
+        as the inventory changes (see ``scripts.aggregates``), so later
+        calls cost nothing that depends on the size of the catalogue.
+
+        Parameters
+        ----------
+        verify : bool
+            Also recompute the aggregates from scratch and check that the
+            maintained ones match.
+        recompute : bool
+            Compute the aggregates from scratch instead, e.g. because other
+            processes change a shared store.
+
+        Returns
+        -------
+        dict
+            The number of products under 'products', the total quantity
+            under 'units', the total price * quantity under 'stock_value',
+            the number of products with a quantity below each of
+            ``LOW_STOCK_THRESHOLDS`` under 'low_stock', keyed by threshold,
+            and the stock value of each supplier's products under
+            'supplier_value', keyed by supplier ID.
+
+        Raises
+        ------
+        AggregateMismatch
+            If ``verify`` finds an aggregate that differs.
+        """
+        if recompute:
+            return self._compute_stats()
+        if verify or self._aggregates is None:
+            return self._build_stats(verify)
+        return self._aggregates.snapshot()
+
+    @_locked('read')
+    def _compute_stats(self):
+        return compute_stats(self.products, self.suppliers, self.links, LOW_STOCK_THRESHOLDS)
+
+    # Held alone so that no change is applied while the aggregates are
+    # computed from scratch
+    @_locked('write')
+    def _build_stats(self, verify):
+        with self._emit_lock:
+            if self._aggregates is None:
+                self._aggregates = StockAggregates(self.products, self.suppliers, self.links)
+                self.add_listener(self._aggregates)
+            elif verify:
+                self._aggregates.verify()
+        return self._aggregates.snapshot()
+
+    @_locked('write')
+    @_journaled
+    def adjust_quantities(self, deltas):
+        """
+        Adjusts the stock quantities of several products at once.
+
+        Parameters
+        ----------
+        deltas : dict
+            Mapping of product ID to the amount to add to its quantity.
+            Negative amounts decrease the stock. Unknown IDs are ignored.
+
+        Returns
+        -------
+        int
+            Number of products adjusted.
+        """
+        if self._delta is not None:
+            self._delta.products.update(
+                dict.fromkeys(product_id for product_id in deltas if product_id in self.products))
+        if not self._listeners:
+            return self.products.adjust_quantities(deltas)
+        before = {product_id: self._product_fields(product_id) for product_id in deltas}
+        adjusted = self.products.adjust_quantities(deltas)
+        for product_id, fields in before.items():
+            if fields is not None:
+                self._emit('update', 'product', product_id, fields, self._product_fields(product_id))
+        return adjusted
+
+    # Stock Counter Methods
+    def _add_quantity(self, product_id, delta):
+        if not self._listeners:
+            quantity = self.products.add_quantity(product_id, delta)
+        else:
+            before = self._product_fields(product_id)
+            quantity = self.products.add_quantity(product_id, delta)
+            if quantity is not None:
+                self._emit('update', 'product', product_id, before, dict(before, quantity=quantity))
+        if quantity is not None and self._delta is not None:
+            self._delta.products[product_id] = None
+        return quantity
+
+    @staticmethod
+    def _check_amount(amount):
+        if isinstance(amount, bool) or not isinstance(amount, int) or amount <= 0:
+            raise ValueError(f"Amount must be a positive integer, not {amount!r}")
+
+    @_locked('key', 'product_id')
+    @_journaled
+    def adjust_quantity(self, product_id, delta):
+        """
+        Adds a delta to a product's stock quantity as one atomic step.
+
+        The check and the update happen under the product's stripe lock, so
+        concurrent adjustments of the same product are applied one at a
+        time and never take its quantity below zero, while adjustments of
+        other products go ahead in parallel.
+
+        Parameters
+        ----------
+        product_id : int
+            Unique identifier of the product to be adjusted.
+        delta : int
+            Amount to add to the quantity; negative to take stock out.
+
+        Returns
+        -------
+        int
+            New quantity, or None if the product was not found.
+
+        Raises
+        ------
+        InsufficientStock
+            If the quantity would fall below zero. It is left unchanged.
+        """
+        if isinstance(delta, bool) or not isinstance(delta, int):
+            raise ValueError(f"Delta must be an integer, not {delta!r}")
+        return self._add_quantity(product_id, delta)
+
+    @_locked('key', 'product_id')
+    @_journaled
+    def reserve(self, product_id, amount):
+        """
+        Takes an amount of a product out of stock, e.g. for an order, as
+        one atomic step. Either the whole amount is reserved or nothing is.
+
+        Parameters
+        ----------
+        product_id : int
+            Unique identifier of the product to be reserved.
+        amount : int
+            Positive number of units to reserve.
+
+        Returns
+        -------
+        int
+            Quantity left in stock, or None if the product was not found.
+
+        Raises
+        ------
+        InsufficientStock
+            If fewer than ``amount`` units are in stock.
+        ValueError
+            If ``amount`` is not a positive integer.
+        """
+        self._check_amount(amount)
+        return self._add_quantity(product_id, -amount)
+
+    @_locked('key', 'product_id')
+    @_journaled
+    def release(self, product_id, amount):
+        """
+        Puts a previously reserved amount of a product back into stock as
+        one atomic step.
+
+        Parameters
+        ----------
+        product_id : int
+            Unique identifier of the product to be released.
+        amount : int
+            Positive number of units to put back.
+
+        Returns
+        -------
+        int
+            New quantity in stock, or None if the product was not found.
+
+        Raises
+        ------
+        ValueError
+            If ``amount`` is not a positive integer.
+        """
+        self._check_amount(amount)
+        return self._add_quantity(product_id, amount)
     
+    # Bulk Product Methods
+    @_locked('write')
+    @_journaled
+    def add_products(self, products, atomic=False):
+        """
+        Adds several products to the inventory.
+
+        Parameters
+        ----------
+        products : list
+            Product objects to be added to the inventory.
+        atomic : bool
+            Add no product at all unless every product can be added.
+
+        Returns
+        -------
+        list
+            One bool per product: True if it was added, False if its ID was
+            already taken (in the inventory or earlier in the batch). In
+            atomic mode nothing was added if any entry is False.
+        """
+        if atomic:
+            # Checked, then added: an iterator must be read only once
+            products = list(products)
+            seen = set()
+            results = []
+            for product in products:
+                product_id = product.product_id
+                results.append(product_id not in seen and product_id not in self.products)
+                seen.add(product_id)
+            if not all(results):
+                return results
+            for product in products:
+                self.add_product(product)
+            return results
+
+        results = []
+        for product in products:
+            try:
+                self.add_product(product)
+            except ValueError:
+                results.append(False)
+            else:
+                results.append(True)
+        return results
+
+    @_locked('write')
+    @_journaled
+    def update_products(self, updates, atomic=False):
+        """
+        Updates the details of several products in the inventory.
+
+        Parameters
+        ----------
+        updates : list
+            One dict per product with its 'product_id' and any of the
+            update_product keyword arguments.
+        atomic : bool
+            Update no product at all unless every product exists.
+
+        Returns
+        -------
+        list
+            One bool per update: True if the product was updated, False if
+            it was not found. In atomic mode nothing was updated if any
+            entry is False.
+        """
+        if atomic:
+            updates = list(updates)
+            results = [update['product_id'] in self.products for update in updates]
+            if not all(results):
+                return results
+        return [self.update_product(**update) for update in updates]
+
+    @_locked('write')
+    @_journaled
+    def remove_products(self, product_ids, atomic=False):
+        """
+        Removes several products from the inventory.
+
+        Parameters
+        ----------
+        product_ids : list
+            Unique identifiers of the products to be removed.
+        atomic : bool
+            Remove no product at all unless every product exists.
+
+        Returns
+        -------
+        list
+            One bool per ID: True if the product was removed, False if it
+            was not found (or already removed earlier in the batch). In
+            atomic mode nothing was removed if any entry is False.
+        """
+        if atomic:
+            product_ids = list(product_ids)
+            seen = set()
+            results = []
+            for product_id in product_ids:
+                results.append(product_id not in seen and product_id in self.products)
+                seen.add(product_id)
+            if not all(results):
+                return results
+        return [self.remove_product(product_id) for product_id in product_ids]
+
     # Supplier Management Methods
+    @_locked('write')
+    @_journaled
     def add_supplier(self, supplier):
         """
         Adds a supplier to the inventory.
@@ -239,24 +1364,43 @@ class Inventory:
         ----------
         supplier : Supplier
             Supplier object to be added to the inventory.
+
+        Raises
+        ------
+        ValueError
+            If a supplier with the same ID is already in the inventory.
         """
-        self.suppliers.append(supplier)
+        self.suppliers.add(supplier)
+        if self._delta is not None:
+            self._delta.suppliers[supplier.supplier_id] = None
+        if self._listeners:
+            self._emit('add', 'supplier', supplier.supplier_id, after=_supplier_fields(supplier))
     
+    @_locked('write')
+    @_journaled
     def remove_supplier(self, supplier_id):
         """
         Removes a supplier from the inventory.
 
+        The supplier is unlinked from its products.
+
         Parameters
         ----------
         supplier_id : int
             Unique identifier of the supplier to be removed.
         """
-        for i, supplier in enumerate(self.suppliers):
-            if supplier.supplier_id == supplier_id:
-                del self.suppliers[i]
-                return True
-        return False
+        before = _supplier_fields(self.suppliers.get(supplier_id)) if self._listeners else None
+        removed = self.suppliers.remove(supplier_id)
+        if removed:
+            if self._listeners:
+                self._emit('remove', 'supplier', supplier_id, before=before)
+            self.links.remove_supplier(supplier_id)
+            if self._delta is not None:
+                self._delta.suppliers[supplier_id] = None
+        return removed
     
+    @_locked('key', 'supplier_id')
+    @_journaled
     def update_supplier(self, supplier_id, name=None, contact_info=None):
         """
         Updates the details of a supplier in the inventory.
@@ -270,15 +1414,23 @@ class Inventory:
         contact_info : str
             New contact information of the supplier.
         """
-        supplier = self.get_supplier(supplier_id)
-        if supplier:
-            if name:
-                supplier.name = name
-            if contact_info:
-                supplier.contact_info = contact_info
-            return True
-        return False
+        fields = {}
+        if name is not None:
+            fields['name'] = name
+        if contact_info is not None:
+            fields['contact_info'] = _shared(contact_info)
+        if not self._listeners:
+            updated = self.suppliers.update(supplier_id, **fields)
+        else:
+            before = _supplier_fields(self.suppliers.get(supplier_id))
+            updated = self.suppliers.update(supplier_id, **fields)
+            if updated:
+                self._emit('update', 'supplier', supplier_id, before, _supplier_fields(self.suppliers.get(supplier_id)))
+        if updated and self._delta is not None:
+            self._delta.suppliers[supplier_id] = None
+        return updated
     
+    @_locked('read')
     def get_supplier(self, supplier_id):
         """
         Retrieves a supplier from the inventory.
@@ -291,60 +1443,422 @@ class Inventory:
         Returns
         -------
         Supplier
-            Supplier object if found, None otherwise.
+            A copy of the supplier if found, None otherwise. Its
+            ``supplied_products`` lists the IDs of the products it is
+            linked to; the stored supplier is left as it is, since other
+            readers share it.
         """
-        for supplier in self.suppliers:
-            if supplier.supplier_id == supplier_id:
-                return supplier
-        return None
+        supplier = self.suppliers.get(supplier_id)
+        if supplier is None:
+            return None
+        copy = Supplier(supplier.supplier_id, supplier.name, supplier.contact_info)
+        copy.supplied_products = self.links.products_of(supplier_id)
+        return copy
     
-    def get_all_suppliers(self):
+    @_locked('read')
+    def get_all_suppliers(self, as_dicts=False):
         """
         Retrieves all suppliers from the inventory.
 
+        Parameters
+        ----------
+        as_dicts : bool
+            Return each supplier's ``to_dict`` instead of its string
+            representation.
+
         Returns
         -------
         list
             List of all suppliers in the inventory.
         """
+        if as_dicts:
+            return [supplier.to_dict() for supplier in self.suppliers]
         return [repr(supplier) for supplier in self.suppliers]
-    
-    def save_to_csv(self, product_file='products.csv', supplier_file='suppliers.csv'):
+
+    # Product-Supplier Links
+    @_locked('write')
+    @_journaled
+    def add_link(self, product_id, supplier_id):
+        """
+        Records that a supplier supplies a product.
+
+        Parameters
+        ----------
+        product_id : int
+            Unique identifier of the product.
+        supplier_id : int
+            Unique identifier of the supplier.
+
+        Returns
+        -------
+        bool
+            True if the product and supplier are linked, False if either is
+            not in the inventory.
+        """
+        if product_id not in self.products or supplier_id not in self.suppliers:
+            return False
+        if self.links.add(product_id, supplier_id):
+            if self._delta is not None:
+                self._delta.suppliers[supplier_id] = None
+            if self._listeners:
+                self._emit('add', 'link', (product_id, supplier_id))
+        return True
+
+    @_locked('write')
+    @_journaled
+    def remove_link(self, product_id, supplier_id):
+        """
+        Records that a supplier no longer supplies a product.
+
+        Parameters
+        ----------
+        product_id : int
+            Unique identifier of the product.
+        supplier_id : int
+            Unique identifier of the supplier.
+
+        Returns
+        -------
+        bool
+            True if the link was removed, False if it did not exist.
+        """
+        removed = self.links.discard(product_id, supplier_id)
+        if removed:
+            if self._delta is not None:
+                self._delta.suppliers[supplier_id] = None
+            if self._listeners:
+                self._emit('remove', 'link', (product_id, supplier_id))
+        return removed
+
+    @_locked('read')
+    def get_supplier_products(self, supplier_id, after=None, limit=None):
+        """
+        Retrieves the IDs of the products a supplier supplies, in ascending
+        order, without scanning the catalogue.
+
+        Parameters
+        ----------
+        supplier_id : int
+            Unique identifier of the supplier.
+        after : int, optional
+            Only return the product IDs greater than this one, to resume
+            after the last ID of the previous page.
+        limit : int, optional
+            Maximum number of IDs to return.
+
+        Returns
+        -------
+        list
+            Product IDs, or None if the supplier is not in the inventory.
+        """
+        if supplier_id not in self.suppliers:
+            return None
+        return self.links.products_of(supplier_id, after, limit)
+
+    @_locked('read')
+    def get_product_suppliers(self, product_id, after=None, limit=None):
+        """
+        Retrieves the IDs of the suppliers of a product, in ascending order.
+        Takes the same paging arguments as ``get_supplier_products``.
+
+        Returns
+        -------
+        list
+            Supplier IDs, or None if the product is not in the inventory.
+        """
+        if product_id not in self.products:
+            return None
+        return self.links.suppliers_of(product_id, after, limit)
+
+    def iter_export(self, kind='products', format='ndjson', chunk_size=1000):
+        """
+        Streams the products or suppliers as NDJSON or as a JSON array.
+
+        Records are encoded straight from the store, ``chunk_size`` at a
+        time, so memory use does not grow with the catalogue and the first
+        chunk is ready immediately. A thread-safe inventory takes its read
+        lock per chunk rather than for the whole export; it then keeps the
+        list of IDs to export (8 bytes per record) and skips records removed
+        in the meantime.
+
+        Parameters
+        ----------
+        kind : str
+            'products' or 'suppliers'.
+        format : str
+            'ndjson' for one JSON object per line, or 'json' for a single
+            JSON array.
+        chunk_size : int
+            Number of records encoded per yielded chunk.
+
+        Yields
+        ------
+        str
+            Consecutive pieces of the export.
+        """
+        if kind == 'products':
+            store, encode = self.products, methodcaller('to_dict')
+        elif kind == 'suppliers':
+            store, encode = self.suppliers, _supplier_fields
+        else:
+            raise ValueError(f"Unknown export kind: {kind!r}")
+        records = map(encode, store if self._lock is None else self._iter_locked(store, chunk_size))
+        if format not in ('ndjson', 'json'):
+            raise ValueError(f"Unknown export format: {format!r}")
+
+        separator = '\n' if format == 'ndjson' else ','
+        if format == 'json':
+            yield '['
+        first = True
+        while True:
+            chunk = separator.join(map(json.dumps, islice(records, chunk_size)))
+            if not chunk:
+                break
+            if format == 'ndjson':
+                yield chunk + '\n'
+            else:
+                yield chunk if first else ',' + chunk
+            first = False
+        if format == 'json':
+            yield ']'
+
+    def _iter_locked(self, store, chunk_size):
+        with self._lock.read():
+            keys = list(store.keys())
+        for start in range(0, len(keys), chunk_size):
+            with self._lock.read():
+                items = _get_many(store, keys[start:start + chunk_size])
+            yield from (item for item in items if item is not None)
+
+    @_locked('read')
+    def save_to_csv(self, product_file='products.csv', supplier_file='suppliers.csv', incremental=False, workers=1):
         """
         Saves the inventory to CSV files.
 
+        A full save rewrites both files. After a full save to or a load from
+        the same files, an incremental save writes only the products and
+        suppliers changed since, to a delta file next to each of them (see
+        ``scripts.delta``), so it takes time in proportion to the changes.
+        It falls back to a full save, which folds the deltas back into the
+        files, once the changes outgrow ``scripts.delta.MERGE_RATIO`` of the
+        records or a price increase has touched every product. Each file is
+        written to a temporary file and renamed into place, so a crash
+        mid-save leaves the previous version intact.
+
         Parameters
         ----------
         product_file : str
             Name of the file to save the products.
         supplier_file : str
             Name of the file to save the suppliers.
+        incremental : bool
+            Only write the changes since the files were last written in
+            full, if possible.
+        workers : int
+            Number of processes to format the products of a full save in,
+            each taking a contiguous shard of them (see
+            ``scripts.parallel_csv``). The file written is the same for
+            any number.
+
+        Returns
+        -------
+        dict
+            'full' or 'delta' under the key 'mode', the number of product
+            and supplier records written under 'products' and 'suppliers',
+            and the elapsed time in seconds under 'seconds'.
         """
-        # Save products to CSV
-        product_data = [{
-            'ID': p.product_id,
-            'Name': p.name,
-            'Description': p.description,
-            'Price': p.price,
-            'Quantity': p.quantity
-        } for p in self.products]
-
-        df_products = pd.DataFrame(product_data)
-        df_products.to_csv(product_file, index=False)
-
-        # Save suppliers to CSV
-        supplier_data = [{
-            'ID': s.supplier_id,
-            'Name': s.name,
-            'Contact Info': s.contact_info
-        } for s in self.suppliers]
-
-        df_suppliers = pd.DataFrame(supplier_data)
-        df_suppliers.to_csv(supplier_file, index=False)
-    
-    def load_from_csv(self, product_file='products.csv', supplier_file='suppliers.csv'):
+        start = time.perf_counter()
+        # Saves share the read lock with other readers, but take turns with
+        # each other: a full save replaces the delta tracker, and both kinds
+        # write the same files
+        with self._save_lock:
+            delta = self._delta
+            if (incremental and delta is not None and not delta.everything
+                    and delta.tracks(product_file, supplier_file)
+                    and len(delta) <= MERGE_RATIO * (len(self.products) + len(self.suppliers))):
+                mode = 'delta'
+                products, suppliers = self._save_delta(delta)
+            else:
+                mode = 'full'
+                products, suppliers = self._save_full(product_file, supplier_file, workers)
+        return {'mode': mode, 'products': products, 'suppliers': suppliers, 'seconds': time.perf_counter() - start}
+
+    def _save_full(self, product_file, supplier_file, workers=1):
+        # Track the changes against the files about to be written. With the
+        # stripes held no update is halfway, so each one is either in the
+        # files or marked in the new tracker
+        previous = self._delta
+        with self._stripes.all() if self._stripes is not None else nullcontext():
+            self._delta = DeltaTracker(product_file, supplier_file)
+        try:
+            # Save products to CSV
+            product_columns = self.products.columns()
+            write_atomic(product_file, functools.partial(write_products, columns=product_columns, workers=workers))
+
+            # Save suppliers to CSV
+            supplier_data = [_supplier_row(s, self.links) for s in self.suppliers]
+            df_suppliers = pd.DataFrame(supplier_data, columns=list(SUPPLIER_CSV_DTYPES))
+            write_atomic(supplier_file, functools.partial(df_suppliers.to_csv, index=False))
+
+            # The deltas are folded in now
+            remove_delta(product_file)
+            remove_delta(supplier_file)
+        except BaseException:
+            # The files may not hold the earlier changes, so go back to the
+            # previous tracker with the changes made during the save added
+            with self._stripes.all() if self._stripes is not None else nullcontext():
+                if previous is not None:
+                    previous.products.update(self._delta.products)
+                    previous.suppliers.update(self._delta.suppliers)
+                    previous.everything = previous.everything or self._delta.everything
+                self._delta = previous
+            raise
+        return len(product_columns['product_id']), len(supplier_data)
+
+    def _save_delta(self, delta):
+        # Every change since the full save is rewritten, so updates racing
+        # this save are either written now or marked for the next one
+        product_ids = list(delta.products)
+        products = _get_many(self.products, product_ids)
+        write_delta(delta.product_file, [_product_row(p) for p in products if p is not None],
+                    [product_id for product_id, p in zip(product_ids, products) if p is None])
+
+        supplier_ids = list(delta.suppliers)
+        suppliers = _get_many(self.suppliers, supplier_ids)
+        write_delta(delta.supplier_file, [_supplier_row(s, self.links) for s in suppliers if s is not None],
+                    [supplier_id for supplier_id, s in zip(supplier_ids, suppliers) if s is None])
+        return len(product_ids), len(supplier_ids)
+
+    def _apply_delta(self, product_file, supplier_file):
+        """
+        Applies the delta files of a pair of CSV files just loaded, and
+        starts tracking the changes against them.
+        """
+        delta = DeltaTracker(product_file, supplier_file)
+        records, removed = read_delta(product_file)
+        for product_id in removed:
+            self.products.remove(product_id)
+            self.links.remove_product(product_id)
+        for record in records:
+            fields = {'name': record['Name'], 'description': record['Description'],
+                      'price': record['Price'], 'quantity': record['Quantity']}
+            if not self.products.update(record['ID'], **fields):
+                self.products.add(Product(record['ID'], **fields))
+        delta.products.update(dict.fromkeys(removed))
+        delta.products.update(dict.fromkeys(record['ID'] for record in records))
+
+        records, removed = read_delta(supplier_file)
+        for supplier_id in removed:
+            self.suppliers.remove(supplier_id)
+            self.links.remove_supplier(supplier_id)
+        for record in records:
+            supplier_id = record['ID']
+            if not self.suppliers.update(supplier_id, name=record['Name'], contact_info=record['Contact Info']):
+                self.suppliers.add(Supplier(supplier_id, record['Name'], record['Contact Info']))
+            self.links.remove_supplier(supplier_id)
+            for product_id in record['Supplied Products'].split():
+                self.links.add(int(product_id), supplier_id)
+        delta.suppliers.update(dict.fromkeys(removed))
+        delta.suppliers.update(dict.fromkeys(record['ID'] for record in records))
+        self._delta = delta
+
+    @_locked('read')
+    def save_snapshot(self, path='inventory.snap', meta=None):
+        """
+        Saves the inventory to a binary columnar snapshot.
+
+        Snapshots are much faster to write and load than CSV files and keep
+        the column dtypes. See ``scripts.snapshot`` for the format and for
+        converters between CSV files and snapshots.
+
+        Parameters
+        ----------
+        path : str
+            Snapshot directory to create or replace.
+        meta : dict, optional
+            Extra JSON-serializable metadata to store with the snapshot.
+        """
+        write_snapshot(path, self.products.columns(), self._supplier_columns(), meta, self.links.columns())
+
+    def _supplier_columns(self):
+        suppliers = list(self.suppliers)
+        return {
+            'supplier_id': [s.supplier_id for s in suppliers],
+            'name': [s.name for s in suppliers],
+            'contact_info': [s.contact_info for s in suppliers]
+        }
+
+    @_locked('write')
+    def load_snapshot(self, path='inventory.snap', mmap=True):
+        """
+        Loads the inventory from a snapshot, replacing its current contents.
+
+        Parameters
+        ----------
+        path : str
+            Snapshot directory to load.
+        mmap : bool
+            Memory-map the numeric columns instead of reading them. A
+            ColumnarProductStore then uses the mapped arrays directly; a
+            ``scripts.lazy.LazyProductStore`` always maps the product
+            columns and reads the products on demand.
+
+        Returns
+        -------
+        dict
+            Number of products and suppliers loaded, the elapsed time in
+            seconds and the metadata stored with the snapshot, under the
+            keys 'products', 'suppliers', 'seconds' and 'meta'.
+        """
+        start = time.perf_counter()
+        lazy = hasattr(self.products, 'open_snapshot')
+        products, suppliers, links, meta = read_snapshot(path, mmap=mmap, products=not lazy)
+
+        self.products.clear()
+        if lazy:
+            # A lazy store only maps the product columns and reads the
+            # records on demand
+            self.products.open_snapshot(path)
+        else:
+            self.products.extend_columns(
+                products['product_id'], products['name'], products['description'],
+                products['price'], products['quantity']
+            )
+        self.suppliers.clear()
+        self.suppliers.extend(map(
+            Supplier, _as_list(suppliers['supplier_id']), suppliers['name'], suppliers['contact_info']
+        ))
+        self.links.clear()
+        self.links.extend(_as_list(links['product_id']), _as_list(links['supplier_id']))
+        self._delta = None
+
+        if self.journal is not None:
+            self.journal.compact()
+        if self._listeners:
+            self._emit('reset', None)
+
+        return {
+            'products': len(self.products),
+            'suppliers': len(self.suppliers),
+            'seconds': time.perf_counter() - start,
+            'meta': meta
+        }
+
+    @_locked('write')
+    def load_from_csv(self, product_file='products.csv', supplier_file='suppliers.csv', chunksize=None, workers=1):
         """
-        Loads the inventory from CSV files.
+        Loads the inventory from CSV files, replacing its current contents.
+
+        The files are parsed with fixed column dtypes and the records are
+        built from whole columns rather than row by row. With ``chunksize``
+        the files are streamed in chunks of that many rows, so only one
+        chunk of parsed data is held in memory at a time. With several
+        ``workers`` the products file is instead split into byte ranges
+        parsed in parallel by that many processes (see
+        ``scripts.parallel_csv``). A ``scripts.lazy.LazyProductStore``
+        only indexes the products file and reads the products on demand.
+        Changes saved incrementally to delta files next to the files are
+        applied on top.
 
         Parameters
         ----------
@@ -352,20 +1866,112 @@ class Inventory:
             Name of the file to load the products.
         supplier_file : str
             Name of the file to load the suppliers.
+        chunksize : int, optional
+            Number of rows to parse at a time. Loads each file in one go if
+            not given.
+        workers : int
+            Number of processes to parse the products file in.
+
+        Returns
+        -------
+        dict
+            Number of products and suppliers loaded and the elapsed time in
+            seconds, under the keys 'products', 'suppliers' and 'seconds'.
+
+        Raises
+        ------
+        ValueError
+            If both ``chunksize`` and several ``workers`` are given.
+        """
+        if chunksize is not None and workers > 1:
+            raise ValueError("chunksize and workers cannot be combined")
+        start = time.perf_counter()
+
+        # Load products from CSV; a lazy store only indexes the file and
+        # reads the records on demand
+        self.products.clear()
+        if hasattr(self.products, 'open'):
+            self.products.open(product_file)
+        elif workers > 1:
+            load_products(product_file, self.products, workers)
+        else:
+            for df_products in self._read_csv(product_file, PRODUCT_CSV_DTYPES, chunksize):
+                self.products.extend_columns(
+                    df_products['ID'].to_numpy(), df_products['Name'], df_products['Description'],
+                    df_products['Price'].to_numpy(), df_products['Quantity'].to_numpy()
+                )
+
+        # Load suppliers and their links from CSV
+        self.suppliers.clear()
+        self.links.clear()
+        for df_suppliers in self._read_csv(supplier_file, SUPPLIER_CSV_DTYPES, chunksize):
+            supplier_ids = _as_list(df_suppliers['ID'])
+            self.suppliers.extend(map(
+                Supplier, supplier_ids, _as_list(df_suppliers['Name']), _as_list(df_suppliers['Contact Info'])
+            ))
+            # Files saved before links were kept have no Supplied Products
+            if 'Supplied Products' in df_suppliers:
+                link_products = []
+                link_suppliers = []
+                for supplier_id, supplied in zip(supplier_ids, df_suppliers['Supplied Products']):
+                    product_ids = [int(product_id) for product_id in supplied.split()]
+                    link_products.extend(product_ids)
+                    link_suppliers.extend([supplier_id] * len(product_ids))
+                self.links.extend(link_products, link_suppliers)
+
+        # Apply the changes saved incrementally since the files were written
+        self._apply_delta(product_file, supplier_file)
+
+        if self.journal is not None:
+            self.journal.compact()
+        if self._listeners:
+            self._emit('reset', None)
+
+        return {
+            'products': len(self.products),
+            'suppliers': len(self.suppliers),
+            'seconds': time.perf_counter() - start
+        }
+
+    @staticmethod
+    def _read_csv(path, dtypes, chunksize):
+        """
+        Yields the DataFrame(s) of a CSV file, one per chunk if chunksize is
+        given. Missing text fields are read as empty strings, and columns of
+        ``dtypes`` that the file lacks are left out.
+        """
+        reader = pd.read_csv(path, usecols=lambda column: column in dtypes, dtype=dtypes, na_filter=False,
+                             chunksize=chunksize)
+        if chunksize is None:
+            yield reader
+            return
+        with reader:
+            yield from reader
+
+    @_locked('write')
+    def attach_journal(self, journal):
+        """
+        Recovers the inventory from a journal and logs all further
+        mutations to it.
+
+        The current contents are replaced by the journal's snapshot, if it
+        has one, and the logged mutations after it are replayed. Loading
+        from CSV or a snapshot while the journal is attached compacts the
+        journal, since loads are not logged record by record.
+
+        Parameters
+        ----------
+        journal : scripts.journal.Journal
+            Journal to recover from and log to.
+
+        Returns
+        -------
+        int
+            Number of log records replayed.
         """
-        # Load products from CSV
-        df_products = pd.read_csv(product_file)
-        self.products = [
-            Product(row['ID'], row['Name'], row['Description'], row['Price'], row['Quantity'])
-            for _, row in df_products.iterrows()
-        ]
-
-        # Load suppliers from CSV
-        df_suppliers = pd.read_csv(supplier_file)
-        self.suppliers = [
-            Supplier(row['ID'], row['Name'], row['Contact Info'])
-            for _, row in df_suppliers.iterrows()
-        ]
+        replayed = journal.attach(self)
+        self.journal = journal
+        return replayed
 
     def __repr__ (self):
         """
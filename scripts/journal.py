@@ -0,0 +1,297 @@
+import json
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from scripts.inventory_man import Product, Supplier
+from scripts.snapshot import _fsync_directory, write_snapshot
+
+SNAPSHOT_NAME = 'snapshot'
+LOCK_NAME = 'lock'
+SEGMENT_PREFIX = 'journal.'
+SEGMENT_SUFFIX = '.log'
+
+
+def _encode(value):
+    if isinstance(value, Product):
+        return {'__product__': value.to_dict()}
+    if isinstance(value, Supplier):
+        return {'__supplier__': [value.supplier_id, value.name, value.contact_info]}
+    if isinstance(value, dict):
+        return {'__items__': [[_encode(k), _encode(v)] for k, v in value.items()]}
+    if isinstance(value, (list, tuple)):
+        return [_encode(v) for v in value]
+    return value
+
+
+def _decode(value):
+    if isinstance(value, list):
+        return [_decode(v) for v in value]
+    if isinstance(value, dict):
+        if '__product__' in value:
+            return Product(**value['__product__'])
+        if '__supplier__' in value:
+            return Supplier(*value['__supplier__'])
+        return {_decode(k): _decode(v) for k, v in value['__items__']}
+    return value
+
+
+class Journal:
+    """
+    An append-only write-ahead log of Inventory mutations.
+
+    Once attached to an inventory with ``Inventory.attach_journal``, every
+    mutating method call is appended to the current log segment as one JSON
+    line ``[seq, method, args, kwargs]``. Records are fsynced in groups:
+    after ``sync_every`` records, or by a background thread at most
+    ``sync_interval`` seconds after the first unsynced record. A crash can
+    therefore lose at most that window of acknowledged mutations.
+
+    Compaction folds the log into a snapshot: it captures the inventory's
+    columns, starts a new log segment, writes the snapshot (with the last
+    sequence number it contains) and then deletes the old segments.
+    Recovery loads the snapshot and replays the records after it.
+
+    A directory is attached to one journal at a time: attaching takes an
+    exclusive lock on it (where ``fcntl`` is available), so a second
+    process, e.g. another worker of a pre-fork server, cannot replay and
+    compact the same log.
+
+    Attributes
+    ----------
+    directory : str
+        Directory holding the log segments and the snapshot.
+    lock : threading.RLock
+        Held while a journaled mutation is applied and logged.
+    seq : int
+        Sequence number of the last logged record.
+    """
+    def __init__(self, directory, sync_every=64, sync_interval=0.05, compact_after=100000):
+        """
+        Constructs a journal over a directory, creating it if needed.
+
+        Parameters
+        ----------
+        directory : str
+            Directory holding the log segments and the snapshot.
+        sync_every : int
+            Number of records after which the log is fsynced inline.
+        sync_interval : float
+            Maximum seconds an unsynced record waits for the background
+            fsync.
+        compact_after : int, optional
+            Number of records in the current segment that triggers a
+            background compaction. None disables automatic compaction.
+        """
+        self.directory = directory
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.compact_after = compact_after
+        self.lock = threading.RLock()
+        self.seq = 0
+        self.depth = 0
+        self.inventory = None
+        self._file = None
+        self._segment = 0
+        self._segment_records = 0
+        self._pending = 0
+        self._compaction = None
+        self._closed = threading.Event()
+        self._flusher = None
+        self._lock_file = None
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def snapshot_path(self):
+        return os.path.join(self.directory, SNAPSHOT_NAME)
+
+    def _segments(self):
+        numbers = []
+        for name in os.listdir(self.directory):
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX):
+                numbers.append(int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]))
+        return sorted(numbers)
+
+    def _segment_path(self, number):
+        return os.path.join(self.directory, f'{SEGMENT_PREFIX}{number:08d}{SEGMENT_SUFFIX}')
+
+    def _open_segment(self, number):
+        self._segment = number
+        self._segment_records = 0
+        self._file = open(self._segment_path(number), 'ab')
+
+    def attach(self, inventory):
+        """
+        Recovers an inventory from the journal and starts logging to it.
+
+        The inventory is reset from the snapshot, if there is one, and the
+        logged records after the snapshot are replayed on top of it. A
+        truncated last record, left by a crash mid-write, is ignored.
+        Logging continues in a new segment.
+
+        Parameters
+        ----------
+        inventory : Inventory
+            Inventory to recover. It must not have a journal attached yet.
+
+        Returns
+        -------
+        int
+            Number of log records replayed.
+
+        Raises
+        ------
+        RuntimeError
+            If another journal is attached over the directory.
+        """
+        self._lock_file = open(os.path.join(self.directory, LOCK_NAME), 'a')
+        if fcntl is not None:
+            try:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                self._lock_file.close()
+                self._lock_file = None
+                raise RuntimeError(f"Journal directory {self.directory!r} is in use by another journal")
+
+        base = 0
+        for path in (self.snapshot_path, self.snapshot_path + '.old'):
+            # The previous snapshot is left under .old if a crash
+            # interrupted the swap to a new one
+            if os.path.exists(path):
+                base = inventory.load_snapshot(path)['meta']['seq']
+                break
+        self.seq = base
+
+        replayed = 0
+        segments = self._segments()
+        for number in segments:
+            with open(self._segment_path(number), 'rb') as f:
+                for line in f:
+                    try:
+                        seq, op, args, kwargs = json.loads(line)
+                    except ValueError:
+                        break
+                    if seq <= base:
+                        continue
+                    getattr(inventory, op)(*_decode(args), **{k: _decode(v) for k, v in kwargs.items()})
+                    self.seq = seq
+                    replayed += 1
+
+        self.inventory = inventory
+        self._open_segment(segments[-1] + 1 if segments else 1)
+        self._flusher = threading.Thread(target=self._flush_periodically, name='journal-flusher', daemon=True)
+        self._flusher.start()
+        return replayed
+
+    def append(self, op, args, kwargs):
+        """
+        Appends one mutation record. Called with ``lock`` held.
+
+        Parameters
+        ----------
+        op : str
+            Name of the Inventory method that was called.
+        args : tuple
+            Positional arguments of the call.
+        kwargs : dict
+            Keyword arguments of the call.
+        """
+        self.seq += 1
+        record = [self.seq, op, _encode(args), {k: _encode(v) for k, v in kwargs.items()}]
+        self._file.write(json.dumps(record, separators=(',', ':')).encode('utf-8') + b'\n')
+        self._pending += 1
+        self._segment_records += 1
+        if self._pending >= self.sync_every:
+            self.sync()
+        if self.compact_after is not None and self._segment_records >= self.compact_after:
+            self.compact(background=True)
+
+    def sync(self):
+        """
+        Flushes and fsyncs the records written so far.
+        """
+        with self.lock:
+            if self._pending:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._pending = 0
+
+    def _flush_periodically(self):
+        while not self._closed.wait(self.sync_interval):
+            if self._pending:
+                self.sync()
+
+    def compact(self, background=False):
+        """
+        Folds the log into a new snapshot of the attached inventory.
+
+        The inventory's columns are captured under the journal lock; the
+        snapshot is then written and, once it and the directory are synced
+        to disk, the old segments deleted, either inline or on a background
+        thread. Only one compaction runs at a
+        time.
+
+        Parameters
+        ----------
+        background : bool
+            Write the snapshot on a background thread.
+
+        Returns
+        -------
+        threading.Thread
+            The background thread, or None if compaction ran inline or was
+            skipped because another one is running.
+        """
+        with self.lock:
+            if self._compaction is not None and self._compaction.is_alive():
+                return None
+            self.sync()
+            seq = self.seq
+            products = self.inventory.products.columns()
+            suppliers = self.inventory._supplier_columns()
+            links = self.inventory.links.columns()
+            sealed = self._segment
+            self._file.close()
+            self._open_segment(sealed + 1)
+
+        def write():
+            # The snapshot's files are fsynced by write_snapshot; the
+            # directory is synced too, so the snapshot and the new segment
+            # are durable before the log they replace is deleted
+            write_snapshot(self.snapshot_path, products, suppliers, meta={'seq': seq}, links=links)
+            _fsync_directory(self.directory)
+            for number in self._segments():
+                if number <= sealed:
+                    os.remove(self._segment_path(number))
+
+        if not background:
+            write()
+            return None
+        self._compaction = threading.Thread(target=write, name='journal-compaction')
+        self._compaction.start()
+        return self._compaction
+
+    def close(self):
+        """
+        Stops the background threads and syncs and closes the log.
+        """
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        if self._compaction is not None:
+            self._compaction.join()
+        with self.lock:
+            if self._file is not None:
+                self.sync()
+                self._file.close()
+                self._file = None
+            if self._lock_file is not None:
+                self._lock_file.close()
+                self._lock_file = None
+
+    def __repr__(self):
+        return f"Journal(directory={self.directory!r}, seq={self.seq})"
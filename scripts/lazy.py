@@ -0,0 +1,536 @@
+"""
+A product store that reads its products from disk on demand.
+
+``LazyProductStore.open`` indexes a products CSV file, as written by
+``Inventory.save_to_csv``, and ``open_snapshot`` a snapshot directory,
+without building a single Product. The index holds each product's ID, the
+position of its record and a sort order for lookups: about 25 bytes per
+product for a CSV file and 9 for a snapshot, whose columns stay memory
+mapped. A record is parsed when its product is first looked up and kept in
+a bounded LRU cache, so startup time and resident memory follow the hot set
+rather than the catalogue size. ``Inventory.load_from_csv`` and
+``Inventory.load_snapshot`` open the file this way when the inventory has a
+lazy store::
+
+    inventory = Inventory(product_store=LazyProductStore(cache_size=10000))
+    inventory.load_from_csv('products.csv', 'suppliers.csv')
+
+Changed and added products are marked dirty in the cache. When one is
+evicted it is written back to a temporary spill file, from which it is read
+afterwards. The opened file itself is never modified; saving the inventory
+writes the merged catalogue. ``increase_price`` changes the cached products
+and records the percentage, which is applied to each record read from disk
+that was written before it.
+
+Catalogue-wide reads (``stock_value``, ``low_stock``, ``columns`` and
+iteration, and so saves, aggregates and indexes) stream through every
+record without caching it.
+"""
+import csv
+import io
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from itertools import islice
+
+import numpy as np
+
+from scripts.inventory_man import InsufficientStock, Inventory, Product, _as_list
+from scripts.parallel_csv import all_record_ends
+from scripts.snapshot import map_products
+
+# Number of records read from a CSV file at a time when streaming it
+_RECORDS_PER_READ = 1000
+
+# Columns of a products CSV file, in the order of Product's fields
+_CSV_FIELDS = ('ID', 'Name', 'Description', 'Price', 'Quantity')
+
+
+def _parse(data):
+    return next(csv.reader(io.StringIO(data.decode('utf-8'), newline='')))
+
+
+class _CSVSource:
+    """
+    The records of a products CSV file, read by position.
+    """
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        self._file_lock = threading.Lock()
+        try:
+            self._bounds = all_record_ends(self._file)
+            if not len(self._bounds):
+                raise ValueError(f"{path} has no header")
+            self._file.seek(0)
+            header = _parse(self._file.read(int(self._bounds[0])))
+            self._fields = [header.index(name) for name in _CSV_FIELDS]
+            self.ids = next(Inventory._read_csv(path, {'ID': 'int64'}, None))['ID'].to_numpy()
+            if len(self.ids) != len(self._bounds) - 1:
+                raise ValueError(f"{path} has blank or malformed records")
+        except BaseException:
+            self._file.close()
+            raise
+
+    def _record(self, fields):
+        product_id, name, description, price, quantity = (fields[i] for i in self._fields)
+        return int(product_id), name, description, float(price), int(quantity)
+
+    def _read(self, start, end):
+        start, end = int(self._bounds[start]), int(self._bounds[end])
+        with self._file_lock:
+            self._file.seek(start)
+            return self._file.read(end - start)
+
+    def record(self, row):
+        return self._record(_parse(self._read(row, row + 1)))
+
+    def records(self):
+        # Read through the file opened for the index, which stays the same
+        # even if the path is replaced
+        count = len(self.ids)
+        for start in range(0, count, _RECORDS_PER_READ):
+            data = self._read(start, min(start + _RECORDS_PER_READ, count))
+            yield from map(self._record, csv.reader(io.StringIO(data.decode('utf-8'), newline='')))
+
+    def close(self):
+        self._file.close()
+
+
+class _SnapshotSource:
+    """
+    The product records of a snapshot, read from its memory-mapped columns.
+    """
+    def __init__(self, path):
+        columns = map_products(path)
+        self.ids = columns['product_id']
+        self._names = columns['name']
+        self._descriptions = columns['description']
+        self._prices = columns['price']
+        self._quantities = columns['quantity']
+
+    @staticmethod
+    def _text(column, row):
+        data, offsets = column
+        return data[offsets[row]:offsets[row + 1]].tobytes().decode('utf-8')
+
+    def record(self, row):
+        return (int(self.ids[row]), self._text(self._names, row), self._text(self._descriptions, row),
+                float(self._prices[row]), int(self._quantities[row]))
+
+    def records(self):
+        return map(self.record, range(len(self.ids)))
+
+    def close(self):
+        pass
+
+
+class LazyProductStore:
+    """
+    A product store that indexes a products file or snapshot and reads the
+    records on demand, keeping the recently used products in an LRU cache.
+
+    Products returned by ``get`` are shared with the cache, so changes must
+    be made through ``update`` (as ``Inventory.update_product`` does) rather
+    than by mutating a returned product.
+
+    Attributes
+    ----------
+    cache_size : int
+        Maximum number of products kept in memory.
+    """
+    def __init__(self, cache_size=10000):
+        """
+        Constructs an empty lazy store.
+
+        Parameters
+        ----------
+        cache_size : int
+            Maximum number of products kept in memory.
+        """
+        self.cache_size = cache_size
+        self._lock = threading.RLock()
+        self._source = None
+        self._spill = None
+        self._reset(None)
+
+    def _reset(self, source):
+        ids = source.ids if source is not None else np.empty(0, dtype=np.int64)
+        order = np.argsort(ids, kind='stable')
+        if np.any(ids[order[1:]] == ids[order[:-1]]):
+            source.close()
+            raise ValueError("Duplicate product_id in file")
+        if self._source is not None:
+            self._source.close()
+        if self._spill is not None:
+            self._spill.close()
+        self._source = source
+        self._spill = None
+        # IDs in file order, sorted by ``_order`` for lookups
+        self._ids = ids
+        self._order = order
+        self._alive = np.ones(len(ids), dtype=bool)
+        self._count = len(ids)
+        self._cache = OrderedDict()
+        self._dirty = set()
+        # Where each product written back to the spill file is, and how many
+        # price increases it had seen
+        self._spilled = {}
+        # IDs of products added since opening, in insertion order
+        self._added = {}
+        self._increases = []
+
+    def open(self, path):
+        """
+        Replaces the stored products with those of a products CSV file,
+        indexing the file without reading the products.
+
+        Parameters
+        ----------
+        path : str
+            Products CSV file, as written by ``Inventory.save_to_csv``.
+
+        Raises
+        ------
+        ValueError
+            If the file lacks a column, holds blank records or repeats a
+            product ID.
+        """
+        with self._lock:
+            self._reset(_CSVSource(path))
+
+    def open_snapshot(self, path):
+        """
+        Replaces the stored products with those of a snapshot, mapping its
+        columns without reading the products.
+
+        Parameters
+        ----------
+        path : str
+            Snapshot directory, as written by ``Inventory.save_snapshot``.
+        """
+        with self._lock:
+            self._reset(_SnapshotSource(path))
+
+    def close(self):
+        """
+        Closes the opened file and the spill file, emptying the store.
+        """
+        with self._lock:
+            self._reset(None)
+
+    @property
+    def cached(self):
+        """
+        Number of products currently in memory.
+        """
+        return len(self._cache)
+
+    # Reading and writing back records
+    def _row(self, product_id):
+        """
+        Returns the position in the opened file of a product that is still
+        stored, or None.
+        """
+        i = int(np.searchsorted(self._ids, product_id, sorter=self._order))
+        if i == len(self._ids):
+            return None
+        row = int(self._order[i])
+        return row if self._ids[row] == product_id and self._alive[row] else None
+
+    def _read(self, product_id):
+        """
+        Builds a product from its record on disk, without caching it.
+        """
+        entry = self._spilled.get(product_id)
+        if entry is not None:
+            start, end, seen = entry
+            self._spill.seek(start)
+            fields = _parse(self._spill.read(end - start))
+            name, description, price, quantity = fields[1], fields[2], float(fields[3]), int(fields[4])
+        else:
+            row = self._row(product_id) if product_id not in self._added else None
+            if row is None:
+                return None
+            _, name, description, price, quantity = self._source.record(row)
+            seen = 0
+        return Product(product_id, name, description, self._increase(price, seen), quantity)
+
+    def _increase(self, price, seen):
+        # Applied one at a time, as ProductStore.increase_price does
+        for percentage in self._increases[seen:]:
+            price += price * (percentage / 100)
+        return price
+
+    def _fault(self, product_id):
+        """
+        Returns a product from the cache, reading it in if needed.
+        """
+        product = self._cache.get(product_id)
+        if product is not None:
+            self._cache.move_to_end(product_id)
+            return product
+        product = self._read(product_id)
+        if product is not None:
+            self._cache[product_id] = product
+        return product
+
+    def _evict(self):
+        """
+        Drops the least recently used products beyond the cache size,
+        writing back the dirty ones.
+        """
+        while len(self._cache) > self.cache_size:
+            product_id, product = self._cache.popitem(last=False)
+            if product_id in self._dirty:
+                self._dirty.discard(product_id)
+                self._write_back(product)
+
+    def _write_back(self, product):
+        if self._spill is None:
+            self._spill = tempfile.TemporaryFile()
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator='\n').writerow(
+            [product.product_id, product.name, product.description, product.price, product.quantity])
+        data = buffer.getvalue().encode('utf-8')
+        start = self._spill.seek(0, os.SEEK_END)
+        self._spill.write(data)
+        self._spilled[product.product_id] = (start, start + len(data), len(self._increases))
+
+    def _contains(self, product_id):
+        return (product_id in self._cache or product_id in self._spilled or product_id in self._added
+                or self._row(product_id) is not None)
+
+    # Keyed operations
+    def add(self, product):
+        """
+        Adds a product to the store, as a dirty entry of the cache.
+
+        Raises
+        ------
+        ValueError
+            If a product with the same ID is already stored.
+        """
+        with self._lock:
+            if self._contains(product.product_id):
+                raise ValueError(f"Duplicate product_id: {product.product_id}")
+            self._cache[product.product_id] = product
+            self._dirty.add(product.product_id)
+            self._added[product.product_id] = None
+            self._count += 1
+            self._evict()
+
+    def get(self, product_id):
+        """
+        Retrieves a product by ID, reading it from disk if it is not cached.
+
+        Returns
+        -------
+        Product
+            Stored product if found, None otherwise.
+        """
+        with self._lock:
+            product = self._fault(product_id)
+            self._evict()
+            return product
+
+    def update(self, product_id, **fields):
+        """
+        Sets fields of a stored product and marks it dirty.
+
+        Returns
+        -------
+        bool
+            True if the product was found, False otherwise.
+        """
+        with self._lock:
+            product = self._fault(product_id)
+            if product is None:
+                return False
+            for name, value in fields.items():
+                setattr(product, name, value)
+            self._dirty.add(product_id)
+            self._evict()
+            return True
+
+    def remove(self, product_id):
+        """
+        Removes a product by ID.
+
+        Returns
+        -------
+        bool
+            True if the product was removed, False if it was not found.
+        """
+        with self._lock:
+            if not self._contains(product_id):
+                return False
+            self._cache.pop(product_id, None)
+            self._dirty.discard(product_id)
+            self._spilled.pop(product_id, None)
+            if product_id in self._added:
+                del self._added[product_id]
+            else:
+                self._alive[self._row(product_id)] = False
+            self._count -= 1
+            return True
+
+    def add_quantity(self, product_id, delta):
+        """
+        Adds a delta to one product's stock quantity unless that would take
+        it below zero. Takes the arguments and returns the result of
+        ``ProductStore.add_quantity``.
+        """
+        with self._lock:
+            product = self._fault(product_id)
+            if product is None:
+                return None
+            quantity = product.quantity + delta
+            if quantity < 0:
+                self._evict()
+                raise InsufficientStock(product_id, product.quantity, delta)
+            product.quantity = quantity
+            self._dirty.add(product_id)
+            self._evict()
+            return quantity
+
+    def __contains__(self, product_id):
+        with self._lock:
+            return self._contains(product_id)
+
+    # Batched and catalogue-wide operations
+    def extend_columns(self, ids, names, descriptions, prices, quantities):
+        """
+        Adds products given as whole columns. Each becomes a dirty entry of
+        the cache, so use ``open`` to load a whole file.
+
+        Raises
+        ------
+        ValueError
+            If a product ID is repeated or already stored. Nothing is added
+            then.
+        """
+        ids = _as_list(ids)
+        with self._lock:
+            if len(set(ids)) != len(ids) or any(map(self._contains, ids)):
+                raise ValueError("Duplicate product_id in batch")
+            for product in map(Product, ids, _as_list(names), _as_list(descriptions),
+                               _as_list(prices), _as_list(quantities)):
+                self.add(product)
+
+    def adjust_quantities(self, deltas):
+        """
+        Adds per-product deltas to the stock quantities. Takes the arguments
+        and returns the result of ``ProductStore.adjust_quantities``.
+        """
+        with self._lock:
+            adjusted = 0
+            for product_id, delta in deltas.items():
+                product = self._fault(product_id)
+                if product is not None:
+                    product.quantity += delta
+                    self._dirty.add(product_id)
+                    adjusted += 1
+            self._evict()
+            return adjusted
+
+    def clear(self):
+        """
+        Removes all products from the store, closing the opened file.
+        """
+        with self._lock:
+            self._reset(None)
+
+    def increase_price(self, percentage):
+        """
+        Increases the price of all stored products by a percentage. Only
+        the cached products are changed now; the others when read.
+        """
+        with self._lock:
+            factor = percentage / 100
+            for product in self._cache.values():
+                product.price += product.price * factor
+            self._increases.append(percentage)
+
+    def stock_value(self):
+        """
+        Returns the total value of the stock, reading every product.
+        """
+        return sum(p.price * p.quantity for p in self)
+
+    def low_stock(self, threshold):
+        """
+        Returns the IDs of products whose quantity is below a threshold,
+        reading every product.
+        """
+        return [p.product_id for p in self if p.quantity < threshold]
+
+    def columns(self):
+        """
+        Returns the stored products as columns, reading every product.
+
+        Returns
+        -------
+        dict
+            Lists of product fields keyed by field name.
+        """
+        columns = {name: [] for name in ('product_id', 'name', 'description', 'price', 'quantity')}
+        for product in self:
+            for name, column in columns.items():
+                column.append(getattr(product, name))
+        return columns
+
+    def keys(self):
+        """
+        Returns a list of the stored product IDs: those of the opened file
+        in file order, then the added ones.
+        """
+        with self._lock:
+            return self._ids[self._alive].tolist() + list(self._added)
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        """
+        Yields every stored product, streaming the opened file in order and
+        then the added products, without caching them.
+        """
+        source = self._source
+        records = source.records() if source is not None else ()
+        for row, (product_id, name, description, price, quantity) in enumerate(records):
+            with self._lock:
+                if self._source is not source:
+                    raise RuntimeError("Store reopened during iteration")
+                if not self._alive[row]:
+                    continue
+                product = self._cache.get(product_id)
+                if product is None:
+                    if product_id in self._spilled:
+                        product = self._read(product_id)
+                    else:
+                        product = Product(product_id, name, description, self._increase(price, 0), quantity)
+            yield product
+        for product_id in list(self._added):
+            with self._lock:
+                product = self._cache.get(product_id) or self._read(product_id)
+            if product is not None:
+                yield product
+
+    def __getitem__(self, index):
+        """
+        Returns the product(s) at a position in the order of ``keys``.
+
+        Positional access is kept for compatibility with the former list
+        storage and costs O(n); use ``get`` for keyed lookups.
+        """
+        if isinstance(index, slice):
+            return list(self)[index]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("store index out of range")
+        return next(islice(iter(self), index, None))
+
+    def __repr__(self):
+        return f"LazyProductStore(size={self._count}, cached={len(self._cache)}, cache_size={self.cache_size})"
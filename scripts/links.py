@@ -0,0 +1,186 @@
+from bisect import bisect_left, bisect_right
+
+
+def _insert(ids, value):
+    position = bisect_left(ids, value)
+    if position < len(ids) and ids[position] == value:
+        return False
+    ids.insert(position, value)
+    return True
+
+
+def _delete(ids, value):
+    position = bisect_left(ids, value)
+    if position < len(ids) and ids[position] == value:
+        del ids[position]
+        return True
+    return False
+
+
+def _page(ids, after, limit):
+    start = 0 if after is None else bisect_right(ids, after)
+    end = len(ids) if limit is None else start + limit
+    return ids[start:end]
+
+
+class LinkIndex:
+    """
+    A many-to-many index between product and supplier IDs.
+
+    Each side maps an ID to the sorted list of the IDs it is linked to, so
+    finding the suppliers of a product or the products of a supplier is a
+    dict lookup, and both can be paged through by ID with a binary search.
+    Adding or removing a link updates both sides.
+    """
+    def __init__(self):
+        self._suppliers_of = {}
+        self._products_of = {}
+        self._size = 0
+
+    def add(self, product_id, supplier_id):
+        """
+        Links a product to a supplier.
+
+        Returns
+        -------
+        bool
+            True if the link is new, False if it already existed.
+        """
+        if not _insert(self._suppliers_of.setdefault(product_id, []), supplier_id):
+            return False
+        _insert(self._products_of.setdefault(supplier_id, []), product_id)
+        self._size += 1
+        return True
+
+    def discard(self, product_id, supplier_id):
+        """
+        Unlinks a product from a supplier.
+
+        Returns
+        -------
+        bool
+            True if the link was removed, False if it did not exist.
+        """
+        suppliers = self._suppliers_of.get(product_id)
+        if not suppliers or not _delete(suppliers, supplier_id):
+            return False
+        if not suppliers:
+            del self._suppliers_of[product_id]
+        products = self._products_of[supplier_id]
+        _delete(products, product_id)
+        if not products:
+            del self._products_of[supplier_id]
+        self._size -= 1
+        return True
+
+    def remove_product(self, product_id):
+        """
+        Removes every link of a product.
+
+        Returns
+        -------
+        list
+            IDs of the suppliers the product was linked to.
+        """
+        suppliers = self._suppliers_of.pop(product_id, [])
+        for supplier_id in suppliers:
+            products = self._products_of[supplier_id]
+            _delete(products, product_id)
+            if not products:
+                del self._products_of[supplier_id]
+        self._size -= len(suppliers)
+        return suppliers
+
+    def remove_supplier(self, supplier_id):
+        """
+        Removes every link of a supplier.
+
+        Returns
+        -------
+        list
+            IDs of the products the supplier was linked to.
+        """
+        products = self._products_of.pop(supplier_id, [])
+        for product_id in products:
+            suppliers = self._suppliers_of[product_id]
+            _delete(suppliers, supplier_id)
+            if not suppliers:
+                del self._suppliers_of[product_id]
+        self._size -= len(products)
+        return products
+
+    def products_of(self, supplier_id, after=None, limit=None):
+        """
+        Returns the IDs of the products linked to a supplier, in ascending
+        order.
+
+        Parameters
+        ----------
+        supplier_id : int
+            Supplier to look up.
+        after : int, optional
+            Only return the product IDs greater than this one.
+        limit : int, optional
+            Maximum number of IDs to return.
+        """
+        return _page(self._products_of.get(supplier_id, []), after, limit)
+
+    def suppliers_of(self, product_id, after=None, limit=None):
+        """
+        Returns the IDs of the suppliers linked to a product, in ascending
+        order. Takes the same paging arguments as ``products_of``.
+        """
+        return _page(self._suppliers_of.get(product_id, []), after, limit)
+
+    def extend(self, product_ids, supplier_ids):
+        """
+        Adds links given as two parallel sequences of IDs. Each touched list
+        is sorted once rather than on every insertion.
+        """
+        sizes = {}
+        touched = set()
+        for product_id, supplier_id in zip(product_ids, supplier_ids):
+            suppliers = self._suppliers_of.setdefault(product_id, [])
+            sizes.setdefault(product_id, len(suppliers))
+            suppliers.append(supplier_id)
+            self._products_of.setdefault(supplier_id, []).append(product_id)
+            touched.add(supplier_id)
+        for product_id, size in sizes.items():
+            suppliers = sorted(set(self._suppliers_of[product_id]))
+            self._suppliers_of[product_id] = suppliers
+            self._size += len(suppliers) - size
+        for supplier_id in touched:
+            self._products_of[supplier_id] = sorted(set(self._products_of[supplier_id]))
+
+    def columns(self):
+        """
+        Returns every link as ``product_id`` and ``supplier_id`` columns,
+        ordered by product ID, then supplier ID.
+        """
+        product_ids = []
+        supplier_ids = []
+        for product_id in sorted(self._suppliers_of):
+            suppliers = self._suppliers_of[product_id]
+            product_ids.extend([product_id] * len(suppliers))
+            supplier_ids.extend(suppliers)
+        return {'product_id': product_ids, 'supplier_id': supplier_ids}
+
+    def clear(self):
+        """
+        Removes all links.
+        """
+        self._suppliers_of.clear()
+        self._products_of.clear()
+        self._size = 0
+
+    def __contains__(self, link):
+        product_id, supplier_id = link
+        suppliers = self._suppliers_of.get(product_id, ())
+        position = bisect_left(suppliers, supplier_id)
+        return position < len(suppliers) and suppliers[position] == supplier_id
+
+    def __len__(self):
+        return self._size
+
+    def __repr__(self):
+        return f"LinkIndex(links={self._size})"
@@ -0,0 +1,127 @@
+import threading
+from contextlib import contextmanager
+
+
+class RWLock:
+    """
+    A reader/writer lock.
+
+    Any number of threads may hold the lock for reading at once; a writer
+    holds it alone. Waiting writers take precedence over new readers so
+    that a steady stream of reads cannot starve writes. Both sides are
+    reentrant, and the writing thread may also take the read side, but a
+    reader cannot upgrade to writing.
+    """
+    def __init__(self):
+        """
+        Constructs an unlocked reader/writer lock.
+        """
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = None
+        self._writer_depth = 0
+        self._waiting_writers = 0
+        self._local = threading.local()
+
+    def acquire_read(self):
+        depth = getattr(self._local, 'depth', 0)
+        if depth == 0 and self._writer != threading.get_ident():
+            with self._cond:
+                while self._writer is not None or self._waiting_writers:
+                    self._cond.wait()
+                self._readers += 1
+        self._local.depth = depth + 1
+
+    def release_read(self):
+        depth = self._local.depth - 1
+        self._local.depth = depth
+        if depth == 0 and self._writer != threading.get_ident():
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    def acquire_write(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._writer_depth += 1
+                return
+            if getattr(self._local, 'depth', 0):
+                raise RuntimeError("Cannot upgrade a read lock to a write lock")
+            self._waiting_writers += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writer = me
+            self._writer_depth = 1
+
+    def release_write(self):
+        with self._cond:
+            self._writer_depth -= 1
+            if not self._writer_depth:
+                self._writer = None
+                self._cond.notify_all()
+
+    @contextmanager
+    def read(self):
+        """
+        Holds the lock for reading within a ``with`` block.
+        """
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self):
+        """
+        Holds the lock for writing within a ``with`` block.
+        """
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+class StripedLock:
+    """
+    A fixed set of locks shared out among keys by hash.
+
+    Operations on the same key always use the same lock, while operations
+    on different keys mostly use different ones and do not contend.
+    """
+    def __init__(self, stripes=64):
+        """
+        Constructs the stripe locks.
+
+        Parameters
+        ----------
+        stripes : int
+            Number of locks to spread the keys over.
+        """
+        self._locks = [threading.RLock() for _ in range(stripes)]
+
+    def __call__(self, key):
+        """
+        Returns the lock guarding a key, to be used in a ``with`` block.
+        """
+        return self._locks[hash(key) % len(self._locks)]
+
+    @contextmanager
+    def all(self):
+        """
+        Holds every stripe lock within a ``with`` block, so that no key is
+        locked by another thread meanwhile.
+        """
+        for lock in self._locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(self._locks):
+                lock.release()
@@ -0,0 +1,237 @@
+import functools
+import inspect
+import threading
+import time
+from bisect import bisect_left
+
+# Upper bounds of the histogram buckets, in seconds and in bytes
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+                   2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000, 100000000)
+
+
+class Histogram:
+    """
+    Counts observed values in fixed buckets, as a Prometheus histogram.
+
+    Attributes
+    ----------
+    buckets : tuple
+        Ascending upper bounds of the buckets; larger values fall in a last
+        ``+Inf`` bucket.
+    counts : list
+        Number of values per bucket (not cumulative).
+    sum : float
+        Sum of the observed values.
+    """
+    __slots__ = ('buckets', 'counts', 'sum')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for value in labels.values())
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    """
+    A registry of counters, gauges and histograms, rendered in the
+    Prometheus text format.
+
+    Nothing is recorded until the registry is enabled, so instrumented code
+    only pays for checking ``enabled``. Enabling it for an Inventory also
+    times every public method of that inventory (see ``instrument``).
+
+    Attributes
+    ----------
+    enabled : bool
+        Whether measurements are recorded.
+    """
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._families = {}
+        self._values = {}
+        self._gauges = []
+        self._instrumented = {}
+
+    def describe(self, name, kind, help):
+        """
+        Declares a metric family: its kind ('counter', 'gauge' or
+        'histogram') and help text.
+        """
+        self._families[name] = (kind, help)
+
+    def inc(self, name, amount=1, **labels):
+        """
+        Adds to a counter.
+        """
+        key = (name, tuple(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        """
+        Records a value in a histogram.
+        """
+        key = (name, tuple(labels.items()))
+        with self._lock:
+            histogram = self._values.get(key)
+            if histogram is None:
+                histogram = self._values[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def gauge(self, name, help, read):
+        """
+        Registers a gauge whose value is read when the metrics are
+        rendered.
+
+        Parameters
+        ----------
+        name : str
+            Metric name.
+        help : str
+            Help text.
+        read : callable
+            Returns the current value.
+        """
+        self.describe(name, 'gauge', help)
+        self._gauges.append((name, read))
+
+    def enable(self, inventory=None):
+        """
+        Starts recording, timing the methods of an Inventory if given.
+        """
+        if inventory is not None:
+            self.instrument(inventory)
+        self.enabled = True
+
+    def disable(self):
+        """
+        Stops recording and removes the method timing. The values recorded
+        so far are kept.
+        """
+        self.enabled = False
+        for inventory, names in list(self._instrumented.values()):
+            for name in names:
+                delattr(inventory, name)
+        self._instrumented.clear()
+
+    def instrument(self, inventory):
+        """
+        Times the public methods of an Inventory, counting their calls in
+        ``inventory_method_calls_total`` and their latency in
+        ``inventory_method_duration_seconds``.
+
+        The timed methods are set on the instance, shadowing the class's,
+        so an inventory that is not instrumented runs exactly as before.
+        Generator methods are left alone.
+        """
+        if id(inventory) in self._instrumented:
+            return
+        self.describe('inventory_method_calls_total', 'counter', "Inventory method calls.")
+        self.describe('inventory_method_errors_total', 'counter', "Inventory method calls that raised.")
+        self.describe('inventory_method_duration_seconds', 'histogram', "Inventory method latency.")
+        names = []
+        for name, function in inspect.getmembers(type(inventory), inspect.isfunction):
+            if name.startswith('_') or inspect.isgeneratorfunction(inspect.unwrap(function)):
+                continue
+            setattr(inventory, name, self._timed(name, getattr(inventory, name)))
+            names.append(name)
+        self._instrumented[id(inventory)] = (inventory, names)
+
+    def _timed(self, name, method):
+        labels = (('method', name),)
+        calls_key = ('inventory_method_calls_total', labels)
+        duration_key = ('inventory_method_duration_seconds', labels)
+        values = self._values
+        clock = time.perf_counter
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            if not self.enabled:
+                return method(*args, **kwargs)
+            start = clock()
+            try:
+                return method(*args, **kwargs)
+            except Exception:
+                self.inc('inventory_method_errors_total', method=name)
+                raise
+            finally:
+                elapsed = clock() - start
+                # One lock round for both series, as this runs on every call
+                with self._lock:
+                    values[calls_key] = values.get(calls_key, 0) + 1
+                    histogram = values.get(duration_key)
+                    if histogram is None:
+                        histogram = values[duration_key] = Histogram(LATENCY_BUCKETS)
+                    histogram.observe(elapsed)
+        return wrapper
+
+    def clear(self):
+        """
+        Resets every counter and histogram.
+        """
+        with self._lock:
+            self._values.clear()
+
+    def render(self):
+        """
+        Returns all metrics in the Prometheus text exposition format.
+        """
+        with self._lock:
+            values = [
+                (name, labels, value.counts[:] if isinstance(value, Histogram) else value,
+                 value.sum if isinstance(value, Histogram) else None, getattr(value, 'buckets', None))
+                for (name, labels), value in self._values.items()
+            ]
+        values.sort(key=lambda value: (value[0], repr(value[1])))
+        lines = []
+        described = set()
+
+        def header(name):
+            if name not in described:
+                described.add(name)
+                kind, help = self._families.get(name, ('untyped', ''))
+                lines.append(f'# HELP {name} {help}')
+                lines.append(f'# TYPE {name} {kind}')
+
+        for name, read in self._gauges:
+            header(name)
+            lines.append(f'{name} {_number(read())}')
+        for name, labels, value, total, buckets in values:
+            header(name)
+            labels = dict(labels)
+            if buckets is None:
+                lines.append(f'{name}{_labels(labels)} {_number(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets + ('+Inf',), value):
+                cumulative += count
+                le = bound if bound == '+Inf' else _number(float(bound))
+                lines.append(f'{name}_bucket{_labels(dict(labels, le=le))} {cumulative}')
+            lines.append(f'{name}_sum{_labels(labels)} {_number(float(total))}')
+            lines.append(f'{name}_count{_labels(labels)} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+    def __repr__(self):
+        return f"Metrics(enabled={self.enabled}, series={len(self._values)})"
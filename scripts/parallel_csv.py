@@ -0,0 +1,291 @@
+"""
+Parallel parsing and formatting of an Inventory's products CSV file.
+
+Loading splits the file into byte ranges of whole records, one per worker
+process. A record may hold quoted newlines, so the split points are found
+by a scan that tracks whether each newline is inside quotes; the scan only
+counts bytes and runs far faster than parsing. Each worker parses its
+range with pandas and returns the columns, which are added to the product
+store in file order.
+
+Saving splits the products' columns into contiguous shards, each formatted
+as CSV text by a worker, and writes the parts in order after the header.
+The output does not depend on the number of workers. The columns reach the
+workers through the pool's initializer, so with the fork start method
+(the default on Linux) they are inherited rather than pickled.
+
+``Inventory.load_from_csv`` and ``Inventory.save_to_csv`` use this module
+when given more than one worker, and ``scripts.lazy.LazyProductStore``
+finds the records it reads on demand with ``all_record_ends``.
+"""
+import io
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Size of the blocks the record scans read at a time
+BLOCK_SIZE = 1 << 24
+
+
+def record_ends(path, offsets, block_size=BLOCK_SIZE):
+    """
+    Finds the end of the CSV record at or after each of some byte offsets.
+
+    Parameters
+    ----------
+    path : str
+        CSV file, with ``"`` as the quote character (doubled inside quoted
+        fields) and newline-terminated records.
+    offsets : iterable
+        Ascending byte offsets.
+    block_size : int
+        Number of bytes to read at a time.
+
+    Returns
+    -------
+    list
+        For each offset, the position just after the first newline at or
+        after it that ends a record, or the size of the file if there is
+        none.
+    """
+    pending = deque(offsets)
+    ends = []
+    position = 0
+    quoted = False
+    with open(path, 'rb') as f:
+        while pending:
+            block = f.read(block_size)
+            if not block:
+                break
+            i = 0
+            while pending and pending[0] < position + len(block):
+                if ends and pending[0] < ends[-1]:
+                    # In the same record as the previous offset
+                    ends.append(ends[-1])
+                    pending.popleft()
+                    continue
+                target = max(pending[0] - position, i)
+                quoted ^= block.count(b'"', i, target) & 1
+                i = target
+                while True:
+                    newline = block.find(b'\n', i)
+                    if newline < 0:
+                        # Carry on searching in the next block
+                        quoted ^= block.count(b'"', i) & 1
+                        i = len(block)
+                        pending[0] = position + len(block)
+                        break
+                    quoted ^= block.count(b'"', i, newline) & 1
+                    i = newline + 1
+                    if not quoted:
+                        ends.append(position + i)
+                        pending.popleft()
+                        break
+            quoted ^= block.count(b'"', i) & 1
+            position += len(block)
+    return ends + [position] * len(pending)
+
+
+def all_record_ends(f, block_size=BLOCK_SIZE):
+    """
+    Finds the end of every record of a CSV file, as ``record_ends`` does
+    for a few offsets. The whole file is scanned, so the quotes and
+    newlines of each block are counted with NumPy.
+
+    Parameters
+    ----------
+    f : file
+        CSV file opened in binary mode at its start, with ``"`` as the
+        quote character and newline-terminated records.
+    block_size : int
+        Number of bytes to read at a time.
+
+    Returns
+    -------
+    numpy.ndarray
+        The position just after each newline outside quotes, followed by
+        the size of the file if the last record has no newline.
+    """
+    ends = []
+    position = 0
+    quoted = 0
+    while True:
+        block = f.read(block_size)
+        if not block:
+            break
+        data = np.frombuffer(block, dtype=np.uint8)
+        quotes = data == ord('"')
+        newlines = np.flatnonzero(data == ord('\n'))
+        if len(newlines):
+            # Parity of the quotes before each newline; the uint8 running
+            # count wraps around but keeps its parity
+            parity = np.cumsum(quotes, dtype=np.uint8)[newlines] & 1
+            ends.append(newlines[(parity ^ quoted) == 0] + position + 1)
+        quoted ^= int(np.count_nonzero(quotes)) & 1
+        position += len(block)
+    ends = np.concatenate(ends).astype(np.int64) if ends else np.empty(0, dtype=np.int64)
+    if position and (not len(ends) or ends[-1] != position):
+        ends = np.append(ends, position)
+    return ends
+
+
+def split_records(path, parts, block_size=BLOCK_SIZE):
+    """
+    Splits a CSV file into byte ranges of whole records.
+
+    Parameters
+    ----------
+    path : str
+        CSV file with a header record.
+    parts : int
+        Number of ranges to split the records after the header into. Fewer
+        are returned if records are too long for that many.
+    block_size : int
+        Number of bytes the scan reads at a time.
+
+    Returns
+    -------
+    tuple
+        ``(header, ranges)``: the header record as bytes and a list of
+        ``(start, end)`` byte ranges covering the rest of the file, in
+        order.
+    """
+    size = os.path.getsize(path)
+    ends = record_ends(path, [0] + [size * i // parts for i in range(1, parts)], block_size)
+    with open(path, 'rb') as f:
+        header = f.read(ends[0])
+    bounds = sorted(set(ends)) + [size]
+    ranges = [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+    return header, ranges
+
+
+def _parse_products(path, header, start, end):
+    # Imported here because inventory_man imports this module
+    from scripts.inventory_man import PRODUCT_CSV_DTYPES, Inventory
+
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    df = next(Inventory._read_csv(io.BytesIO(header + data), PRODUCT_CSV_DTYPES, None))
+    return (df['ID'].to_numpy(), df['Name'].tolist(), df['Description'].tolist(),
+            df['Price'].to_numpy(), df['Quantity'].to_numpy())
+
+
+def load_products(path, store, workers):
+    """
+    Parses a products CSV file in parallel and adds the products to a store
+    in file order.
+
+    Parameters
+    ----------
+    path : str
+        Products CSV file, as written by ``Inventory.save_to_csv``.
+    store : ProductStore
+        Store to add the products to.
+    workers : int
+        Number of worker processes.
+
+    Returns
+    -------
+    int
+        Number of products added.
+    """
+    header, ranges = split_records(path, workers)
+    args = ([path] * len(ranges), [header] * len(ranges), [start for start, _ in ranges], [end for _, end in ranges])
+    pool = ProcessPoolExecutor(max_workers=len(ranges)) if len(ranges) > 1 else None
+    try:
+        count = 0
+        for shard in (pool.map if pool is not None else map)(_parse_products, *args):
+            store.extend_columns(*shard)
+            count += len(shard[0])
+        return count
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+
+# Columns of the products being saved, in each worker process
+_columns = None
+
+
+def _set_columns(columns):
+    global _columns
+    _columns = columns
+
+
+def format_products(columns, start=0, end=None):
+    """
+    Formats rows of product columns as CSV records, without a header.
+
+    Parameters
+    ----------
+    columns : dict
+        Product columns, as returned by a product store's ``columns``.
+    start, end : int
+        Range of rows to format; all rows by default.
+
+    Returns
+    -------
+    str
+        The CSV records.
+    """
+    # Imported here because inventory_man imports this module
+    from scripts.inventory_man import PRODUCT_CSV_DTYPES
+
+    rows = slice(start, end)
+    df = pd.DataFrame({
+        'ID': pd.array(columns['product_id'][rows], dtype='int64'),
+        'Name': columns['name'][rows],
+        'Description': columns['description'][rows],
+        'Price': pd.array(columns['price'][rows], dtype='float64'),
+        'Quantity': pd.array(columns['quantity'][rows], dtype='int64')
+    }, columns=list(PRODUCT_CSV_DTYPES))
+    return df.to_csv(index=False, header=False)
+
+
+def _format_shard(start, end):
+    return format_products(_columns, start, end)
+
+
+def products_header():
+    """
+    Returns the header record of a products CSV file.
+    """
+    # Imported here because inventory_man imports this module
+    from scripts.inventory_man import PRODUCT_CSV_DTYPES
+
+    return pd.DataFrame(columns=list(PRODUCT_CSV_DTYPES)).to_csv(index=False)
+
+
+def write_products(f, columns, workers=1):
+    """
+    Writes product columns to an open CSV file, formatting contiguous
+    shards of rows in parallel.
+
+    Parameters
+    ----------
+    f : file
+        Text file to write to.
+    columns : dict
+        Product columns, as returned by a product store's ``columns``.
+    workers : int
+        Number of worker processes; 1 formats the rows in this process.
+
+    Returns
+    -------
+    int
+        Number of products written.
+    """
+    count = len(columns['product_id'])
+    f.write(products_header())
+    if workers <= 1 or count < workers:
+        f.write(format_products(columns))
+        return count
+    bounds = [count * i // workers for i in range(workers + 1)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_set_columns, initargs=(columns,)) as pool:
+        for part in pool.map(_format_shard, bounds[:-1], bounds[1:]):
+            f.write(part)
+    return count
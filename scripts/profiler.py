@@ -0,0 +1,151 @@
+import heapq
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+
+def _collapse(frame):
+    """
+    Returns a stack as ``outermost;...;innermost`` frame names.
+    """
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class SamplingProfiler:
+    """
+    A sampling profiler for the requests of a server, keeping the stacks of
+    the slowest ones.
+
+    While running, a background thread takes the stack of every thread that
+    is inside a request (between ``begin`` and ``end``) every ``interval``
+    seconds. When a request ends, its samples are kept if it is among the
+    ``keep`` slowest requests seen since the profiler started. Requests
+    shorter than the interval may get no sample at all; the overhead is the
+    sampling thread's, not the requests'.
+
+    ``collapsed`` returns the kept stacks in the collapsed format read by
+    flamegraph.pl, speedscope and similar tools.
+
+    Attributes
+    ----------
+    interval : float
+        Seconds between samples.
+    keep : int
+        Number of slowest requests to keep.
+    """
+    def __init__(self, interval=0.005, keep=20):
+        self.interval = interval
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._active = {}
+        self._slowest = []
+        self._order = itertools.count()
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self, interval=None, keep=None):
+        """
+        Starts sampling, discarding the stacks kept so far.
+        """
+        self.stop()
+        if interval is not None:
+            self.interval = interval
+        if keep is not None:
+            self.keep = keep
+        self.clear()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops sampling. The stacks kept so far remain available.
+        """
+        thread = self._thread
+        if thread is None:
+            return
+        self._stop.set()
+        thread.join()
+        self._thread = None
+        with self._lock:
+            self._active.clear()
+
+    def clear(self):
+        """
+        Discards the stacks kept so far.
+        """
+        with self._lock:
+            self._slowest.clear()
+
+    def begin(self, label):
+        """
+        Marks the calling thread as serving a request, e.g. 'GET /products'.
+        """
+        if self._thread is None:
+            return
+        with self._lock:
+            self._active[threading.get_ident()] = (label, time.perf_counter(), Counter())
+
+    def end(self):
+        """
+        Marks the end of the calling thread's request and keeps its samples
+        if it is among the slowest.
+        """
+        with self._lock:
+            request = self._active.pop(threading.get_ident(), None)
+            if request is None:
+                return
+            label, start, samples = request
+            entry = (time.perf_counter() - start, next(self._order), label, samples)
+            if len(self._slowest) < self.keep:
+                heapq.heappush(self._slowest, entry)
+            elif entry > self._slowest[0]:
+                heapq.heapreplace(self._slowest, entry)
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            with self._lock:
+                for ident, (_, _, samples) in self._active.items():
+                    frame = frames.get(ident)
+                    if frame is not None and ident != me:
+                        samples[_collapse(frame)] += 1
+            del frames
+
+    def slowest(self):
+        """
+        Returns the kept requests, slowest first, as dicts with their
+        'label', 'seconds' and 'samples' (stack to sample count).
+        """
+        with self._lock:
+            entries = sorted(self._slowest, reverse=True)
+        return [{'label': label, 'seconds': seconds, 'samples': dict(samples)}
+                for seconds, _, label, samples in entries]
+
+    def collapsed(self):
+        """
+        Returns the samples of the kept requests in the collapsed stack
+        format, one ``request;frame;...;frame count`` line per stack, with
+        the request label as the root frame.
+        """
+        totals = Counter()
+        for request in self.slowest():
+            for stack, count in request['samples'].items():
+                totals[f"{request['label']};{stack}"] += count
+        return ''.join(f"{stack} {count}\n" for stack, count in sorted(totals.items()))
+
+    def __repr__(self):
+        return f"SamplingProfiler(running={self.running}, interval={self.interval}, keep={self.keep})"
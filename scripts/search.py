@@ -0,0 +1,372 @@
+import math
+import re
+from bisect import bisect_left, insort
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+
+_TOKEN = re.compile(r'\w+')
+# Tokens of several texts joined by NUL characters, and the separators
+_TOKEN_OR_END = re.compile(r'\w+|\0')
+
+# Upper bound for the terms starting with a given prefix
+_MAX_CHAR = '\U0010ffff'
+
+# Weight of an occurrence in the name, relative to one in the description
+NAME_WEIGHT = 3
+# Score factor of a term matched by prefix only, relative to an exact match
+PREFIX_FACTOR = 0.5
+
+
+def tokenize(text):
+    """
+    Splits a text into lower-cased word tokens.
+    """
+    return _TOKEN.findall(text.lower())
+
+
+def _term_weights(name, description, memo):
+    """
+    Returns the weight of every term of a product: its number of
+    occurrences in the description plus NAME_WEIGHT times its number of
+    occurrences in the name. Tokenized texts are memoized, since many
+    products share a description.
+    """
+    weights = {}
+    for text, weight in ((description, 1), (name, NAME_WEIGHT)):
+        tokens = memo.get(text)
+        if tokens is None:
+            tokens = memo[text] = tokenize(text)
+        for token in tokens:
+            weights[token] = weights.get(token, 0) + weight
+    return weights
+
+
+def _tokenize_column(texts):
+    """
+    Tokenizes a text column, each distinct text once.
+
+    The distinct texts are joined with NUL separators and tokenized by a
+    single regular expression scan, which is much faster than one scan per
+    text.
+
+    Returns
+    -------
+    tuple
+        ``(tokens, rows, positions)``: the tokens of the distinct texts,
+        flattened, and for every token occurrence in the column its row and
+        its position in ``tokens``.
+    """
+    codes, texts = pd.factorize(pd.Series(texts, dtype=object))
+    scanned = pd.Series(_TOKEN_OR_END.findall('\0'.join(texts).lower() + '\0'), dtype=object)
+    separators = (scanned == '\0').to_numpy()
+    ends = np.flatnonzero(separators)
+    if len(ends) != len(texts):
+        # A text holds a NUL character itself: scan the texts one by one
+        tokens = [tokenize(text) for text in texts]
+        scanned = pd.Series(list(chain.from_iterable(token + ['\0'] for token in tokens)), dtype=object)
+        separators = (scanned == '\0').to_numpy()
+        ends = np.flatnonzero(separators)
+    lengths = np.diff(ends, prepend=-1) - 1
+    row_lengths = lengths[codes]
+    rows = np.repeat(np.arange(len(codes)), row_lengths)
+    row_starts = np.cumsum(row_lengths) - row_lengths
+    within = np.arange(len(rows)) - np.repeat(row_starts, row_lengths)
+    positions = np.repeat((np.cumsum(lengths) - lengths)[codes], row_lengths) + within
+    return scanned.to_numpy()[~separators], rows, positions
+
+
+def _intersect(ids, scores, other_ids, other_scores):
+    """
+    Intersects two sorted arrays of product IDs, adding up their scores.
+    """
+    if len(ids) < len(other_ids):
+        ids, scores, other_ids, other_scores = other_ids, other_scores, ids, scores
+    if not len(other_ids):
+        return other_ids, other_scores
+    low, high = ids[0], ids[-1]
+    if high - low < 8 * len(ids):
+        # Dense IDs: look the smaller side up in a table of the larger one.
+        # Scores are positive, so a zero marks a missing ID
+        table = np.zeros(high - low + 1, dtype=scores.dtype)
+        table[ids - low] = scores
+        inside = (other_ids >= low) & (other_ids <= high)
+        other_ids, other_scores = other_ids[inside], other_scores[inside]
+        found = table[other_ids - low]
+        matched = found > 0
+        return other_ids[matched], other_scores[matched] + found[matched]
+    positions = np.searchsorted(ids, other_ids)
+    positions[positions == len(ids)] = 0
+    matched = ids[positions] == other_ids
+    return other_ids[matched], other_scores[matched] + scores[positions[matched]]
+
+
+class SearchIndex:
+    """
+    An inverted index over the names and descriptions of the products of an
+    Inventory.
+
+    The postings (product ID and term weight) of every term are kept in
+    one base segment of NumPy arrays sorted by term, then product ID, so a
+    term's postings are a contiguous slice and queries run as vectorized
+    intersections. Changes after the base was built go to a small delta:
+    the postings of added or updated products are kept in dicts, and the
+    base postings of removed or updated products are masked out. Once the
+    delta outgrows ``merge_ratio`` of the base it is merged in with a few
+    array operations, without tokenizing the catalogue again.
+
+    Queries match products holding every query token, the last one also as
+    a prefix (as typed). Results are ranked by the sum over the tokens of
+    term weight times inverse document frequency, with prefix-only matches
+    discounted by PREFIX_FACTOR; ties go to the lower product ID.
+    """
+    def __init__(self, products, merge_ratio=0.1, max_expansions=256):
+        """
+        Builds the index over a product store.
+
+        Parameters
+        ----------
+        products : ProductStore
+            Store whose products are to be indexed. It is kept to rebuild
+            the index after a reset.
+        merge_ratio : float
+            Size of the delta, as a fraction of the number of products in
+            the base, at which it is merged into the base.
+        max_expansions : int
+            Maximum number of terms a prefix is expanded to.
+        """
+        self._products = products
+        self.merge_ratio = merge_ratio
+        self.max_expansions = max_expansions
+        self.rebuild()
+
+    def rebuild(self):
+        """
+        Rebuilds the index from the product store.
+
+        The columns are tokenized and the postings sorted as whole arrays,
+        and every distinct text is tokenized only once.
+        """
+        columns = self._products.columns()
+        ids = np.asarray(columns['product_id'], dtype=np.int64)
+        count = len(ids)
+        name_tokens, name_rows, name_positions = _tokenize_column(columns['name'])
+        description_tokens, description_rows, description_positions = _tokenize_column(columns['description'])
+        codes, vocabulary = pd.factorize(np.concatenate([name_tokens, description_tokens]))
+        terms = np.concatenate([codes[name_positions], codes[len(name_tokens) + description_positions]])
+        rows = np.concatenate([name_rows, description_rows])
+        weights = np.concatenate([np.full(len(name_rows), NAME_WEIGHT, dtype=np.float32),
+                                  np.ones(len(description_rows), dtype=np.float32)])
+
+        # Sort the occurrences by term, then product ID, and sum the weights
+        # of the occurrences of a term in the same product
+        by_id = np.argsort(ids, kind='stable')
+        rank = np.empty(count, dtype=np.int64)
+        rank[by_id] = np.arange(count)
+        keys = terms.astype(np.int64) * max(count, 1) + rank[rows]
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+        starts = np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]])) if len(keys) else keys
+        weights = np.add.reduceat(weights[order], starts) if len(keys) else weights
+        keys = keys[starts]
+        self._build(vocabulary.tolist(), (keys // max(count, 1)).astype(np.int32),
+                    ids[by_id[keys % max(count, 1)]], weights, count)
+
+    def _build(self, vocabulary, terms, ids, weights, count):
+        """
+        Sets the base segment from postings sorted by term, then product ID,
+        and clears the delta.
+        """
+        self._vocabulary = vocabulary
+        self._term_ids = {term: i for i, term in enumerate(vocabulary)}
+        self._ids = ids
+        self._weights = weights
+        self._offsets = np.searchsorted(terms, np.arange(len(vocabulary) + 1))
+        self._count = self._base_count = count
+        self._delta = {}
+        self._delta_terms = {}
+        self._deleted = set()
+        self._deleted_ids = None
+        self._terms = sorted(vocabulary)
+
+    def _merge(self):
+        """
+        Folds the delta into the base segment.
+        """
+        keep = ~np.isin(self._ids, self._deleted_array()) if self._deleted else slice(None)
+        terms = np.repeat(np.arange(len(self._vocabulary), dtype=np.int32), np.diff(self._offsets))[keep]
+        vocabulary = list(self._vocabulary)
+        term_ids = dict(self._term_ids)
+        delta_terms = []
+        delta_ids = []
+        delta_weights = []
+        for term, postings in self._delta.items():
+            delta_terms.extend([term_ids.setdefault(term, len(term_ids))] * len(postings))
+            delta_ids.extend(postings)
+            delta_weights.extend(postings.values())
+        vocabulary.extend(list(term_ids)[len(vocabulary):])
+        terms = np.concatenate([terms, np.array(delta_terms, dtype=np.int32)])
+        ids = np.concatenate([self._ids[keep], np.array(delta_ids, dtype=np.int64)])
+        weights = np.concatenate([self._weights[keep], np.array(delta_weights, dtype=np.float32)])
+        order = np.lexsort((ids, terms))
+        self._build(vocabulary, terms[order], ids[order], weights[order], self._count)
+
+    def _deleted_array(self):
+        deleted = self._deleted_ids
+        if deleted is None:
+            deleted = self._deleted_ids = np.array(sorted(self._deleted), dtype=np.int64)
+        return deleted
+
+    def _insert(self, fields):
+        product_id = fields['product_id']
+        weights = _term_weights(fields['name'], fields['description'], {})
+        for term, weight in weights.items():
+            postings = self._delta.get(term)
+            if postings is None:
+                postings = self._delta[term] = {}
+                if term not in self._term_ids:
+                    insort(self._terms, term)
+            postings[product_id] = weight
+        self._delta_terms[product_id] = list(weights)
+        self._count += 1
+
+    def _delete(self, fields):
+        product_id = fields['product_id']
+        for term in self._delta_terms.pop(product_id, ()):
+            postings = self._delta[term]
+            del postings[product_id]
+            if not postings:
+                del self._delta[term]
+                if term not in self._term_ids:
+                    del self._terms[bisect_left(self._terms, term)]
+        # Any base postings of the product no longer apply
+        self._deleted.add(product_id)
+        self._deleted_ids = None
+        self._count -= 1
+
+    def __call__(self, change):
+        """
+        Applies an inventory Change to the index.
+        """
+        if change.op == 'reset':
+            self.rebuild()
+            return
+        if change.kind != 'product' or change.op == 'increase_price':
+            return
+        before, after = change.before, change.after
+        if before is not None and after is not None and (
+                before['name'] == after['name'] and before['description'] == after['description']):
+            return
+        if before is not None:
+            self._delete(before)
+        if after is not None:
+            self._insert(after)
+        if len(self._delta_terms) + len(self._deleted) > max(1000, self._base_count * self.merge_ratio):
+            self._merge()
+
+    def _expand(self, prefix):
+        start = bisect_left(self._terms, prefix)
+        end = bisect_left(self._terms, prefix + _MAX_CHAR, start)
+        return self._terms[start:min(end, start + self.max_expansions)]
+
+    def _postings(self, terms, token):
+        """
+        Returns the sorted product IDs holding any of the terms and their
+        score for the query token.
+        """
+        parts = []
+        merged = False
+        for term in terms:
+            term_id = self._term_ids.get(term)
+            delta = self._delta.get(term, {})
+            if term_id is None:
+                ids = np.empty(0, dtype=np.int64)
+                weights = np.empty(0, dtype=np.float32)
+            else:
+                start, end = self._offsets[term_id], self._offsets[term_id + 1]
+                ids = self._ids[start:end]
+                weights = self._weights[start:end]
+                if self._deleted:
+                    live = ~np.isin(ids, self._deleted_array())
+                    ids = ids[live]
+                    weights = weights[live]
+            if delta:
+                merged = True
+                ids = np.concatenate([ids, np.fromiter(delta, dtype=np.int64, count=len(delta))])
+                weights = np.concatenate([weights, np.fromiter(delta.values(), dtype=np.float32, count=len(delta))])
+            if not len(ids):
+                continue
+            factor = 1.0 if term == token else PREFIX_FACTOR
+            idf = math.log(1 + max(self._count, 1) / len(ids))
+            parts.append((ids, weights * np.float32(idf * factor)))
+
+        if not parts:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        if len(parts) == 1 and not merged:
+            # A single base slice is already sorted by ID and unique
+            return parts[0]
+        ids = np.concatenate([ids for ids, _ in parts])
+        scores = np.concatenate([scores for _, scores in parts])
+        # Sort by ID with the best score first, and keep one score per ID
+        order = np.lexsort((-scores, ids))
+        ids = ids[order]
+        scores = scores[order]
+        first = np.ones(len(ids), dtype=bool)
+        first[1:] = ids[1:] != ids[:-1]
+        return ids[first], scores[first]
+
+    def search(self, query, limit=20, offset=0):
+        """
+        Finds the products matching a query, best first.
+
+        Parameters
+        ----------
+        query : str
+            Words to search for; the last may be incomplete.
+        limit : int
+            Maximum number of results to return.
+        offset : int
+            Number of best results to skip.
+
+        Returns
+        -------
+        tuple
+            ``(product_ids, scores, total)``: the IDs and scores of the
+            requested results and the total number of matches.
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return [], [], 0
+        ids = scores = None
+        for i, token in enumerate(tokens):
+            if i == len(tokens) - 1:
+                terms = self._expand(token)
+            else:
+                terms = [token] if token in self._term_ids or token in self._delta else []
+            token_ids, token_scores = self._postings(terms, token)
+            if ids is None:
+                ids, scores = token_ids, token_scores
+            else:
+                # Intersect with the products matching the previous tokens
+                ids, scores = _intersect(ids, scores, token_ids, token_scores)
+            if not len(ids):
+                return [], [], 0
+
+        total = len(ids)
+        wanted = min(offset + limit, total)
+        if wanted <= 0:
+            return [], [], total
+        if wanted < total:
+            # Keep the best results; among equal scores at the cut, the
+            # lowest IDs, which come first as the IDs are sorted
+            cut = np.partition(scores, total - wanted)[total - wanted]
+            above = np.flatnonzero(scores > cut)
+            tied = np.flatnonzero(scores == cut)[:wanted - len(above)]
+            chosen = np.concatenate([above, tied])
+            ids, scores = ids[chosen], scores[chosen]
+        order = np.lexsort((ids, -scores))[offset:offset + limit]
+        return ids[order].tolist(), scores[order].tolist(), total
+
+    def __repr__(self):
+        return f"SearchIndex(terms={len(self._terms)}, postings={len(self._ids)})"
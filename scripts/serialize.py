@@ -0,0 +1,201 @@
+"""
+JSON encoding and compression of API responses.
+
+``get_encoder`` returns a function encoding a value as compact UTF-8 JSON
+bytes: orjson's if it is installed, the standard library's otherwise.
+``EncodedProducts`` caches each product's encoded JSON object until the
+product changes, so list responses are assembled from cached bytes instead
+of being encoded again. ``compress`` gzip- or zstd-compresses a response
+body; zstd is only among the supported ``CODINGS`` if the zstandard
+package is installed.
+"""
+import gzip
+import json
+import threading
+from itertools import islice
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Bodies smaller than this are sent uncompressed: the headers and the
+# compression cost more than the bytes saved
+COMPRESS_MIN_SIZE = 1024
+
+# Fast levels, as responses are compressed on the request path
+GZIP_LEVEL = 1
+ZSTD_LEVEL = 3
+
+# Content codings ``compress`` supports, the preferred first
+CODINGS = ('zstd', 'gzip') if zstandard is not None else ('gzip',)
+
+
+# json.dumps builds a new encoder for every call with non-default options
+_json_encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+
+def _json_dumps(value):
+    return _json_encoder.encode(value).encode('utf-8')
+
+
+def _orjson_dumps(value):
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+
+
+ENCODERS = {'json': _json_dumps}
+if orjson is not None:
+    ENCODERS['orjson'] = _orjson_dumps
+
+
+def get_encoder(name=None):
+    """
+    Returns a JSON encoder by name.
+
+    Parameters
+    ----------
+    name : str
+        'orjson' or 'json' (the standard library's), or None for the
+        fastest one installed.
+
+    Returns
+    -------
+    callable
+        Encodes a value as JSON and returns the UTF-8 bytes.
+
+    Raises
+    ------
+    ValueError
+        If the encoder is unknown or not installed.
+    """
+    if name is None:
+        name = 'orjson' if 'orjson' in ENCODERS else 'json'
+    if name not in ENCODERS:
+        raise ValueError(f"JSON encoder {name!r} is not available; choose from {sorted(ENCODERS)}")
+    return ENCODERS[name]
+
+
+class EncodedProducts:
+    """
+    A bounded cache of the JSON encoding of products, invalidated by the
+    changes of an Inventory.
+
+    Registered as a listener on the inventory, it drops a product's bytes
+    when the product is updated or removed, and all of them after a price
+    increase or a load. As with ResponseCache, bytes encoded while a change
+    was applied could be stale, so they are only stored if no invalidation
+    happened since the caller read ``generation`` before reading the
+    products. When full, the oldest entries are dropped first.
+
+    Attributes
+    ----------
+    dumps : callable
+        JSON encoder (see ``get_encoder``).
+    maxsize : int
+        Maximum number of products cached.
+    generation : int
+        Number of invalidations so far.
+    """
+    def __init__(self, dumps=None, maxsize=100000):
+        self.dumps = dumps or get_encoder()
+        self.maxsize = maxsize
+        self.generation = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def encode(self, products, generation=None):
+        """
+        Returns the encoded JSON object of each product.
+
+        Parameters
+        ----------
+        products : iterable
+            Products to encode.
+        generation : int
+            Value of ``generation`` read before the products were read, or
+            None to encode them without caching.
+
+        Returns
+        -------
+        list
+            Bytes of each product's ``to_dict`` as a JSON object.
+        """
+        products = list(products)
+        if generation is None:
+            return [self.dumps(product.to_dict()) for product in products]
+        with self._lock:
+            get = self._entries.get
+            encoded = [get(product.product_id) for product in products]
+        missing = [i for i, body in enumerate(encoded) if body is None]
+        if not missing:
+            return encoded
+        for i in missing:
+            encoded[i] = self.dumps(products[i].to_dict())
+        with self._lock:
+            if generation == self.generation:
+                entries = self._entries
+                for i in missing:
+                    entries[products[i].product_id] = encoded[i]
+                overflow = len(entries) - self.maxsize
+                if overflow > 0:
+                    for key in list(islice(entries, overflow)):
+                        del entries[key]
+        return encoded
+
+    def clear(self):
+        """
+        Drops all entries.
+        """
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def __call__(self, change):
+        """
+        Drops the entries affected by an inventory Change.
+        """
+        if change.op in ('reset', 'increase_price'):
+            self.clear()
+        elif change.kind == 'product':
+            with self._lock:
+                self.generation += 1
+                self._entries.pop(change.key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return f"EncodedProducts(size={len(self._entries)}, maxsize={self.maxsize})"
+
+
+def encode_list(encoded):
+    """
+    Returns a JSON array of already encoded values.
+    """
+    return b'[' + b','.join(encoded) + b']'
+
+
+def compress(body, encoding):
+    """
+    Compresses a response body.
+
+    Parameters
+    ----------
+    body : bytes
+        Body to compress.
+    encoding : str
+        One of ``CODINGS``.
+
+    Returns
+    -------
+    bytes
+        The compressed body.
+    """
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
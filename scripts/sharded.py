@@ -0,0 +1,481 @@
+"""
+A product store partitioned by product ID across several shards.
+
+``ShardedProductStore`` implements the product store interface, so an
+``Inventory`` (and the apps in front of it) works unchanged over it::
+
+    inventory = Inventory(product_store=ShardedProductStore(4))
+
+Each shard is an ordinary product store, by default held by its own worker
+process, so the catalogue is spread over the memory of several processes.
+The store routes keyed operations to the one shard that owns the ID and
+fans catalogue-wide ones (``increase_price``, ``stock_value``,
+``low_stock``, ``columns`` and thus exports, saves and aggregates) out to
+all shards at once: every shard is sent its request before any reply is
+awaited, so the shards work in parallel.
+
+Products are hash-partitioned (``product_id % shards``) by default, or
+range-partitioned when ``boundaries`` are given. Iteration, ``keys`` and
+``columns`` give the products shard by shard, each shard in insertion
+order.
+"""
+import bisect
+import multiprocessing
+import os
+import threading
+from contextlib import ExitStack
+from itertools import chain, islice
+
+import numpy as np
+
+from scripts.inventory_man import ProductStore, _as_list
+
+# Number of products fetched from a shard at a time when iterating
+CHUNK_SIZE = 1000
+
+# Operations a shard serves besides the methods of its store
+_OPS = {
+    'keys': lambda store: list(store.keys()),
+    'contains': lambda store, key: key in store,
+    'len': len,
+    'get_many': lambda store, keys: [store.get(key) for key in keys],
+    'remove_many': lambda store, keys: sum(map(store.remove, keys))
+}
+
+
+def _run(store, name, args, kwargs):
+    """
+    Runs an operation on a shard's store, returning ``(True, result)`` or
+    ``(False, exception)``.
+    """
+    try:
+        op = _OPS.get(name)
+        if op is not None:
+            return True, op(store, *args, **kwargs)
+        return True, getattr(store, name)(*args, **kwargs)
+    except Exception as exc:
+        return False, exc
+
+
+def _serve(conn, store_factory):
+    """
+    Serves the operations sent over a pipe on a new store, until the pipe
+    is closed or None is received.
+    """
+    store = store_factory()
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            break
+        if request is None:
+            break
+        conn.send(_run(store, *request))
+    conn.close()
+
+
+class _LocalShard:
+    """
+    A shard whose store lives in this process.
+    """
+    def __init__(self, store):
+        self.store = store
+        self.lock = threading.Lock()
+        self._reply = None
+
+    def send(self, name, args, kwargs):
+        self._reply = _run(self.store, name, args, kwargs)
+
+    def receive(self):
+        reply, self._reply = self._reply, None
+        return reply
+
+    def close(self):
+        pass
+
+
+class _ProcessShard:
+    """
+    A shard whose store lives in a worker process, reached through a pipe.
+    """
+    def __init__(self, store_factory, context):
+        self._conn, child = context.Pipe()
+        self.process = context.Process(target=_serve, args=(child, store_factory), daemon=True)
+        self.process.start()
+        child.close()
+        self.lock = threading.Lock()
+
+    def send(self, name, args, kwargs):
+        self._conn.send((name, args, kwargs))
+
+    def receive(self):
+        return self._conn.recv()
+
+    def close(self):
+        with self.lock:
+            if self.process.is_alive():
+                self._conn.send(None)
+                self.process.join()
+            self._conn.close()
+
+
+class ShardedProductStore:
+    """
+    A product store that partitions the catalogue by product ID across
+    several shard stores.
+
+    Attributes
+    ----------
+    shards : int
+        Number of shards.
+    boundaries : list
+        Product IDs at which each shard after the first begins, if the
+        products are range-partitioned; None if they are hash-partitioned.
+    processes : bool
+        Whether each shard is held by a worker process.
+    """
+    def __init__(self, shards=None, store_factory=ProductStore, processes=True, boundaries=None):
+        """
+        Constructs a store over new, empty shards.
+
+        Parameters
+        ----------
+        shards : int, optional
+            Number of shards to hash-partition the products over. Defaults
+            to the number of CPUs, or to one more than the number of
+            ``boundaries``.
+        store_factory : callable
+            Returns the store of a shard, e.g. ``ProductStore`` or
+            ``scripts.columnar.ColumnarProductStore``. With processes it is
+            called in the worker process.
+        processes : bool
+            Hold each shard in a worker process, so that the shards use the
+            memory of separate processes and work in parallel. With False
+            the shards are stores in this process, which partitions the
+            catalogue but runs fanned-out operations one shard at a time.
+        boundaries : list, optional
+            Ascending product IDs to range-partition the products at: shard
+            0 holds the IDs below the first boundary, shard i those from
+            boundary i-1 up to boundary i, and the last shard the rest.
+
+        Raises
+        ------
+        ValueError
+            If the number of shards is below 1 or does not match the
+            boundaries.
+        """
+        if boundaries is not None:
+            boundaries = list(boundaries)
+            if boundaries != sorted(boundaries):
+                raise ValueError("Shard boundaries must be ascending")
+            if shards is not None and shards != len(boundaries) + 1:
+                raise ValueError(f"{len(boundaries)} boundaries make {len(boundaries) + 1} shards, not {shards}")
+            shards = len(boundaries) + 1
+        elif shards is None:
+            shards = os.cpu_count() or 1
+        if shards < 1:
+            raise ValueError("A sharded store needs at least one shard")
+        self.shards = shards
+        self.boundaries = boundaries
+        self.processes = processes
+        if processes:
+            context = multiprocessing.get_context()
+            self._shards = [_ProcessShard(store_factory, context) for _ in range(shards)]
+        else:
+            self._shards = [_LocalShard(store_factory()) for _ in range(shards)]
+
+    def close(self):
+        """
+        Stops the worker processes, dropping the products they hold.
+        """
+        for shard in self._shards:
+            shard.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # Routing
+    def shard_of(self, product_id):
+        """
+        Returns the index of the shard that holds a product ID.
+        """
+        if self.boundaries is None:
+            return product_id % self.shards
+        return bisect.bisect_right(self.boundaries, product_id)
+
+    def _shards_of(self, ids):
+        ids = np.asarray(ids, dtype=np.int64)
+        if self.boundaries is None:
+            return ids % self.shards
+        return np.searchsorted(np.asarray(self.boundaries, dtype=np.int64), ids, side='right')
+
+    def _call(self, index, name, /, *args, **kwargs):
+        # Positional-only, so an update may set a field called name
+        shard = self._shards[index]
+        with shard.lock:
+            shard.send(name, args, kwargs)
+            ok, value = shard.receive()
+        if not ok:
+            raise value
+        return value
+
+    def _fan_out(self, name, calls=None):
+        """
+        Sends an operation to several shards before awaiting any reply.
+
+        Parameters
+        ----------
+        name : str
+            Store method or shard operation to run.
+        calls : dict, optional
+            Arguments tuple for each shard index to run the operation on;
+            all shards with no arguments by default.
+
+        Returns
+        -------
+        dict
+            ``(ok, result or exception)`` for each shard index.
+        """
+        if calls is None:
+            calls = dict.fromkeys(range(self.shards), ())
+        with ExitStack() as stack:
+            # Shards are locked in index order, so fan-outs cannot deadlock
+            for index in sorted(calls):
+                stack.enter_context(self._shards[index].lock)
+            for index, args in calls.items():
+                self._shards[index].send(name, args, {})
+            return {index: self._shards[index].receive() for index in calls}
+
+    def _gather(self, name, calls=None):
+        """
+        Fans an operation out and returns the results in shard order,
+        raising the first shard's error if any failed.
+        """
+        replies = self._fan_out(name, calls)
+        for ok, value in replies.values():
+            if not ok:
+                raise value
+        return [replies[index][1] for index in sorted(replies)]
+
+    def _group(self, ids):
+        """
+        Returns the positions of some IDs grouped by shard index.
+        """
+        groups = {}
+        for position, index in enumerate(self._shards_of(ids).tolist()):
+            groups.setdefault(index, []).append(position)
+        return groups
+
+    def _extend(self, name, calls):
+        """
+        Fans out an operation adding products to shards, and removes what
+        was added again if any shard refused its part.
+        """
+        replies = self._fan_out(name, {index: args for index, (args, _) in calls.items()})
+        failed = [value for ok, value in replies.values() if not ok]
+        if failed:
+            added = {index: (calls[index][1],) for index, (ok, _) in replies.items() if ok}
+            if added:
+                self._gather('remove_many', added)
+            raise failed[0]
+
+    # Keyed operations
+    def add(self, product):
+        """
+        Adds a product to the shard that owns its ID.
+
+        Raises
+        ------
+        ValueError
+            If a product with the same ID is already stored.
+        """
+        self._call(self.shard_of(product.product_id), 'add', product)
+
+    def get(self, product_id):
+        """
+        Retrieves a product by ID, or None if it is not stored.
+        """
+        return self._call(self.shard_of(product_id), 'get', product_id)
+
+    def get_many(self, product_ids):
+        """
+        Retrieves several products by ID, asking their shards in parallel.
+
+        Parameters
+        ----------
+        product_ids : list
+            IDs of the products to retrieve.
+
+        Returns
+        -------
+        list
+            The product stored under each ID, or None where there is none.
+        """
+        product_ids = list(product_ids)
+        groups = self._group(product_ids)
+        replies = self._gather('get_many', {
+            index: ([product_ids[position] for position in positions],) for index, positions in groups.items()
+        })
+        products = [None] * len(product_ids)
+        for positions, found in zip((groups[index] for index in sorted(groups)), replies):
+            for position, product in zip(positions, found):
+                products[position] = product
+        return products
+
+    def update(self, product_id, **fields):
+        """
+        Sets fields of a stored product. Returns True if it was found.
+        """
+        return self._call(self.shard_of(product_id), 'update', product_id, **fields)
+
+    def remove(self, product_id):
+        """
+        Removes a product by ID. Returns True if it was found.
+        """
+        return self._call(self.shard_of(product_id), 'remove', product_id)
+
+    def add_quantity(self, product_id, delta):
+        """
+        Adds a delta to one product's stock quantity unless that would take
+        it below zero. Takes the arguments and returns the result of
+        ``ProductStore.add_quantity``.
+        """
+        return self._call(self.shard_of(product_id), 'add_quantity', product_id, delta)
+
+    def __contains__(self, product_id):
+        return self._call(self.shard_of(product_id), 'contains', product_id)
+
+    # Batched and catalogue-wide operations
+    def extend(self, products):
+        """
+        Adds several products, each shard adding its own in parallel.
+
+        Raises
+        ------
+        ValueError
+            If a product ID is repeated or already stored. Nothing is added
+            then.
+        """
+        products = list(products)
+        self.extend_columns([p.product_id for p in products], [p.name for p in products],
+                            [p.description for p in products], [p.price for p in products],
+                            [p.quantity for p in products])
+
+    def extend_columns(self, ids, names, descriptions, prices, quantities):
+        """
+        Adds products given as whole columns, each shard adding its own in
+        parallel.
+
+        Raises
+        ------
+        ValueError
+            If a product ID is repeated or already stored. Nothing is added
+            then.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        if len(np.unique(ids)) != len(ids):
+            raise ValueError("Duplicate product_id in batch")
+        names = _as_list(names)
+        descriptions = _as_list(descriptions)
+        prices = np.asarray(prices, dtype=np.float64)
+        quantities = np.asarray(quantities, dtype=np.int64)
+        calls = {}
+        for index, positions in self._group(ids).items():
+            rows = np.asarray(positions, dtype=np.intp)
+            calls[index] = ((ids[rows], [names[row] for row in positions], [descriptions[row] for row in positions],
+                             prices[rows], quantities[rows]), ids[rows].tolist())
+        self._extend('extend_columns', calls)
+
+    def adjust_quantities(self, deltas):
+        """
+        Adds per-product deltas to the stock quantities, each shard
+        adjusting its own in parallel. Takes the arguments and returns the
+        result of ``ProductStore.adjust_quantities``.
+        """
+        calls = {}
+        for product_id, delta in deltas.items():
+            calls.setdefault(self.shard_of(product_id), ({},))[0][product_id] = delta
+        return sum(self._gather('adjust_quantities', calls)) if calls else 0
+
+    def clear(self):
+        """
+        Removes all products from every shard.
+        """
+        self._gather('clear')
+
+    def increase_price(self, percentage):
+        """
+        Increases the price of all stored products by a percentage, on all
+        shards in parallel.
+        """
+        self._gather('increase_price', dict.fromkeys(range(self.shards), (percentage,)))
+
+    def stock_value(self):
+        """
+        Returns the total value of the stock, summed over the shards.
+        """
+        return sum(self._gather('stock_value'))
+
+    def low_stock(self, threshold):
+        """
+        Returns the IDs of products whose quantity is below a threshold,
+        shard by shard.
+        """
+        return list(chain.from_iterable(self._gather('low_stock', dict.fromkeys(range(self.shards), (threshold,)))))
+
+    def columns(self):
+        """
+        Returns the stored products as columns, shard by shard. The shards
+        build their columns in parallel.
+
+        Returns
+        -------
+        dict
+            Arrays (numeric fields) and lists (text fields) keyed by field
+            name.
+        """
+        parts = self._gather('columns')
+        return {
+            'product_id': np.concatenate([np.asarray(part['product_id'], dtype=np.int64) for part in parts]),
+            'name': list(chain.from_iterable(part['name'] for part in parts)),
+            'description': list(chain.from_iterable(part['description'] for part in parts)),
+            'price': np.concatenate([np.asarray(part['price'], dtype=np.float64) for part in parts]),
+            'quantity': np.concatenate([np.asarray(part['quantity'], dtype=np.int64) for part in parts])
+        }
+
+    def keys(self):
+        """
+        Returns a list of the stored product IDs, shard by shard.
+        """
+        return list(chain.from_iterable(self._gather('keys')))
+
+    def __len__(self):
+        return sum(self._gather('len'))
+
+    def __iter__(self):
+        for index, keys in enumerate(self._gather('keys')):
+            for start in range(0, len(keys), CHUNK_SIZE):
+                products = self._call(index, 'get_many', keys[start:start + CHUNK_SIZE])
+                yield from (product for product in products if product is not None)
+
+    def __getitem__(self, index):
+        """
+        Returns the product(s) at a position in shard order.
+
+        Positional access is kept for compatibility with the former list
+        storage and costs O(n); use ``get`` for keyed lookups.
+        """
+        if isinstance(index, slice):
+            return list(self)[index]
+        size = len(self)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("store index out of range")
+        return next(islice(iter(self), index, None))
+
+    def __repr__(self):
+        return f"ShardedProductStore(shards={self.shards}, processes={self.processes})"
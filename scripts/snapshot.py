@@ -0,0 +1,289 @@
+"""
+Binary columnar snapshots of an Inventory.
+
+A snapshot is a directory holding one ``.npy`` file per column plus a small
+``meta.json``. Numeric columns are stored as-is; text columns are stored as
+one UTF-8 byte buffer plus an offsets array, so every file can be memory
+mapped. Use ``Inventory.save_snapshot`` / ``Inventory.load_snapshot``, or
+run this module to convert between the CSV and snapshot formats::
+
+    python -m scripts.snapshot to-snapshot products.csv suppliers.csv inventory.snap
+    python -m scripts.snapshot to-csv inventory.snap products.csv suppliers.csv
+
+Product-supplier links are stored as a third table of ID pairs; snapshots
+written without it load with no links.
+"""
+import argparse
+import json
+import os
+import shutil
+
+import numpy as np
+
+FORMAT_VERSION = 1
+
+PRODUCT_COLUMNS = {
+    'product_id': np.int64,
+    'name': str,
+    'description': str,
+    'price': np.float64,
+    'quantity': np.int64,
+}
+SUPPLIER_COLUMNS = {
+    'supplier_id': np.int64,
+    'name': str,
+    'contact_info': str,
+}
+LINK_COLUMNS = {
+    'product_id': np.int64,
+    'supplier_id': np.int64,
+}
+
+
+def _save(path, array):
+    # Each column is fsynced, so a snapshot whose metadata survived a crash
+    # has every column in full
+    with open(path, 'wb') as f:
+        np.save(f, array)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _fsync_directory(path):
+    # Makes the entries created or renamed in a directory durable
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _write_text(path, values):
+    encoded = [value.encode('utf-8') for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)), out=offsets[1:])
+    _save(path + '.npy', np.frombuffer(b''.join(encoded), dtype=np.uint8))
+    _save(path + '.offsets.npy', offsets)
+
+
+def _read_text(path, mmap_mode):
+    data = np.load(path + '.npy', mmap_mode=mmap_mode).tobytes()
+    offsets = np.load(path + '.offsets.npy', mmap_mode=mmap_mode).tolist()
+    text = data.decode('utf-8')
+    if len(text) == len(data):
+        # Pure ASCII: byte offsets are character offsets
+        return [text[start:end] for start, end in zip(offsets, offsets[1:])]
+    return [data[start:end].decode('utf-8') for start, end in zip(offsets, offsets[1:])]
+
+
+def _write_table(path, prefix, schema, columns):
+    for name, dtype in schema.items():
+        column_path = os.path.join(path, f'{prefix}.{name}')
+        if dtype is str:
+            _write_text(column_path, columns[name])
+        else:
+            _save(column_path + '.npy', np.asarray(columns[name], dtype=dtype))
+
+
+def _read_table(path, prefix, schema, mmap_mode):
+    columns = {}
+    for name, dtype in schema.items():
+        column_path = os.path.join(path, f'{prefix}.{name}')
+        if dtype is str:
+            columns[name] = _read_text(column_path, mmap_mode)
+        else:
+            columns[name] = np.load(column_path + '.npy', mmap_mode=mmap_mode)
+    return columns
+
+
+def write_snapshot(path, products, suppliers, meta=None, links=None):
+    """
+    Writes a snapshot directory.
+
+    The snapshot is written next to ``path`` and moved into place once
+    complete and fsynced, so a crash mid-write leaves the previous snapshot
+    intact, and once this returns the new one survives a power loss.
+
+    Parameters
+    ----------
+    path : str
+        Snapshot directory to create or replace.
+    products : dict
+        Product columns keyed by the names in PRODUCT_COLUMNS.
+    suppliers : dict
+        Supplier columns keyed by the names in SUPPLIER_COLUMNS.
+    meta : dict, optional
+        Extra JSON-serializable metadata to store with the snapshot.
+    links : dict, optional
+        Product-supplier link columns keyed by the names in LINK_COLUMNS.
+    """
+    if links is None:
+        links = {name: [] for name in LINK_COLUMNS}
+    path = os.path.normpath(path)
+    tmp_path = path + '.tmp'
+    old_path = path + '.old'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    _write_table(tmp_path, 'products', PRODUCT_COLUMNS, products)
+    _write_table(tmp_path, 'suppliers', SUPPLIER_COLUMNS, suppliers)
+    _write_table(tmp_path, 'links', LINK_COLUMNS, links)
+    info = {
+        'version': FORMAT_VERSION,
+        'products': len(products['product_id']),
+        'suppliers': len(suppliers['supplier_id']),
+        'links': len(links['product_id']),
+        'meta': meta or {},
+    }
+    with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+        json.dump(info, f)
+        f.flush()
+        os.fsync(f.fileno())
+    parent = os.path.dirname(os.path.abspath(path))
+    _fsync_directory(tmp_path)
+    _fsync_directory(parent)
+
+    shutil.rmtree(old_path, ignore_errors=True)
+    if os.path.exists(path):
+        os.rename(path, old_path)
+    os.rename(tmp_path, path)
+    _fsync_directory(parent)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+
+def _read_info(path):
+    with open(os.path.join(path, 'meta.json')) as f:
+        info = json.load(f)
+    if info['version'] != FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot version: {info['version']}")
+    return info
+
+
+def read_snapshot(path, mmap=True, products=True):
+    """
+    Reads a snapshot directory.
+
+    Parameters
+    ----------
+    path : str
+        Snapshot directory to read.
+    mmap : bool
+        Memory-map the numeric columns copy-on-write instead of reading
+        them into memory. The arrays stay writable; changes are private to
+        the process.
+    products : bool
+        Read the product columns. With False, None is returned for them.
+
+    Returns
+    -------
+    tuple
+        ``(products, suppliers, links, meta)``: the product, supplier and
+        link columns as dicts and the metadata stored with the snapshot.
+    """
+    info = _read_info(path)
+    mmap_mode = 'c' if mmap else None
+    products = _read_table(path, 'products', PRODUCT_COLUMNS, mmap_mode) if products else None
+    suppliers = _read_table(path, 'suppliers', SUPPLIER_COLUMNS, mmap_mode)
+    if 'links' in info:
+        links = _read_table(path, 'links', LINK_COLUMNS, mmap_mode)
+    else:
+        links = {name: np.empty(0, dtype=dtype) for name, dtype in LINK_COLUMNS.items()}
+    return products, suppliers, links, info['meta']
+
+
+def map_products(path):
+    """
+    Memory-maps the product columns of a snapshot read-only, without
+    decoding the text columns.
+
+    Parameters
+    ----------
+    path : str
+        Snapshot directory to read.
+
+    Returns
+    -------
+    dict
+        The numeric columns as arrays and the text columns as
+        ``(data, offsets)`` pairs: the UTF-8 bytes of all values and the
+        offset of each value in them, plus the end of the last.
+    """
+    _read_info(path)
+    columns = {}
+    for name, dtype in PRODUCT_COLUMNS.items():
+        column_path = os.path.join(path, f'products.{name}')
+        if dtype is str:
+            columns[name] = (np.load(column_path + '.npy', mmap_mode='r'),
+                             np.load(column_path + '.offsets.npy', mmap_mode='r'))
+        else:
+            columns[name] = np.load(column_path + '.npy', mmap_mode='r')
+    return columns
+
+
+def csv_to_snapshot(product_file, supplier_file, path, chunksize=None):
+    """
+    Converts a pair of inventory CSV files into a snapshot.
+
+    Parameters
+    ----------
+    product_file : str
+        Name of the products CSV file.
+    supplier_file : str
+        Name of the suppliers CSV file.
+    path : str
+        Snapshot directory to write.
+    chunksize : int, optional
+        Number of CSV rows to parse at a time.
+    """
+    # Imported here because inventory_man imports this module
+    from scripts.columnar import ColumnarProductStore
+    from scripts.inventory_man import Inventory
+
+    inventory = Inventory(product_store=ColumnarProductStore())
+    inventory.load_from_csv(product_file, supplier_file, chunksize=chunksize)
+    inventory.save_snapshot(path)
+
+
+def snapshot_to_csv(path, product_file, supplier_file):
+    """
+    Converts a snapshot into a pair of inventory CSV files.
+
+    Parameters
+    ----------
+    path : str
+        Snapshot directory to read.
+    product_file : str
+        Name of the products CSV file to write.
+    supplier_file : str
+        Name of the suppliers CSV file to write.
+    """
+    from scripts.columnar import ColumnarProductStore
+    from scripts.inventory_man import Inventory
+
+    inventory = Inventory(product_store=ColumnarProductStore())
+    inventory.load_snapshot(path)
+    inventory.save_to_csv(product_file, supplier_file)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert inventory data between CSV and snapshot formats.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    to_snapshot = commands.add_parser('to-snapshot', help="convert CSV files to a snapshot")
+    to_snapshot.add_argument('product_file')
+    to_snapshot.add_argument('supplier_file')
+    to_snapshot.add_argument('snapshot')
+    to_snapshot.add_argument('--chunksize', type=int)
+    to_csv = commands.add_parser('to-csv', help="convert a snapshot to CSV files")
+    to_csv.add_argument('snapshot')
+    to_csv.add_argument('product_file')
+    to_csv.add_argument('supplier_file')
+    args = parser.parse_args(argv)
+
+    if args.command == 'to-snapshot':
+        csv_to_snapshot(args.product_file, args.supplier_file, args.snapshot, chunksize=args.chunksize)
+    else:
+        snapshot_to_csv(args.snapshot, args.product_file, args.supplier_file)
+
+
+if __name__ == '__main__':
+    main()
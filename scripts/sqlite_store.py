@@ -0,0 +1,569 @@
+import os
+import sqlite3
+import threading
+
+from scripts.inventory_man import InsufficientStock, Product, Supplier, _as_list
+from scripts.search import NAME_WEIGHT, tokenize
+
+
+class _SQLiteDatabase:
+    """
+    Opens the connections of a store kept in an SQLite database in WAL mode.
+    """
+    def __init__(self, path, timeout=30.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    @property
+    def _db(self):
+        # Connections are not shared across threads, nor inherited by forked
+        # worker processes
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    def _transaction(self):
+        return _Transaction(self._db)
+
+    def __repr__(self):
+        return f"{type(self).__name__}(path={self.path!r})"
+
+
+class SQLiteStore(_SQLiteDatabase):
+    """
+    A keyed store kept in an SQLite database in WAL mode.
+
+    The database file can be shared by several processes, e.g. the workers
+    of a pre-fork WSGI server: each process (and thread) opens its own
+    connection, WAL mode lets readers run alongside the single writer, and
+    every store method is one statement or one transaction, so changes made
+    by one worker are immediately visible to the others. Iteration follows
+    insertion order.
+
+    This base class is not used directly; see SQLiteProductStore and
+    SQLiteSupplierStore.
+    """
+    table = None
+    key = None
+    fields = ()
+    factory = None
+
+    def __init__(self, path, timeout=30.0):
+        """
+        Opens the store, creating the database and table if needed.
+
+        Parameters
+        ----------
+        path : str
+            Database file.
+        timeout : float
+            Seconds to wait for another process's write to finish.
+        """
+        super().__init__(path, timeout)
+        columns = ', '.join(f'{name} {kind}' for name, kind in self.fields)
+        with self._transaction() as db:
+            db.execute(
+                f'CREATE TABLE IF NOT EXISTS {self.table} ('
+                f'seq INTEGER PRIMARY KEY AUTOINCREMENT, {self.key} INTEGER NOT NULL UNIQUE, {columns})'
+            )
+            self._create_indexes(db)
+        self._select = f'SELECT {self.key}, {", ".join(name for name, _ in self.fields)} FROM {self.table}'
+
+    def _create_indexes(self, db):
+        pass
+
+    def _item(self, row):
+        return self.factory(*row)
+
+    def _values(self, item):
+        return [getattr(item, self.key)] + [getattr(item, name) for name, _ in self.fields]
+
+    def add(self, item):
+        """
+        Adds an object to the store.
+
+        Raises
+        ------
+        ValueError
+            If an object with the same key is already stored.
+        """
+        self.extend([item])
+
+    def extend(self, items):
+        """
+        Adds several objects to the store in one transaction.
+
+        Raises
+        ------
+        ValueError
+            If a key is repeated or already stored. Nothing is added then.
+        """
+        names = [self.key] + [name for name, _ in self.fields]
+        statement = f'INSERT INTO {self.table} ({", ".join(names)}) VALUES ({", ".join("?" * len(names))})'
+        try:
+            with self._transaction() as db:
+                db.executemany(statement, map(self._values, items))
+        except sqlite3.IntegrityError:
+            raise ValueError(f"Duplicate {self.key}")
+
+    def get(self, key):
+        """
+        Retrieves an object by key, or None if it is not stored.
+        """
+        row = self._db.execute(f'{self._select} WHERE {self.key} = ?', (key,)).fetchone()
+        return self._item(row) if row is not None else None
+
+    def update(self, key, **fields):
+        """
+        Sets fields of a stored object.
+
+        Returns
+        -------
+        bool
+            True if the object was found, False otherwise.
+        """
+        if not fields:
+            return key in self
+        known = {name for name, _ in self.fields}
+        for name in fields:
+            if name not in known:
+                raise AttributeError(f"{self.factory.__name__} has no field {name!r}")
+        assignments = ', '.join(f'{name} = ?' for name in fields)
+        cursor = self._db.execute(
+            f'UPDATE {self.table} SET {assignments} WHERE {self.key} = ?', [*fields.values(), key]
+        )
+        return cursor.rowcount > 0
+
+    def remove(self, key):
+        """
+        Removes an object by key.
+
+        Returns
+        -------
+        bool
+            True if the object was removed, False if it was not found.
+        """
+        return self._db.execute(f'DELETE FROM {self.table} WHERE {self.key} = ?', (key,)).rowcount > 0
+
+    def clear(self):
+        """
+        Removes all objects from the store.
+        """
+        self._db.execute(f'DELETE FROM {self.table}')
+
+    def keys(self):
+        """
+        Returns the stored keys in insertion order.
+        """
+        return [row[0] for row in self._db.execute(f'SELECT {self.key} FROM {self.table} ORDER BY seq')]
+
+    def __contains__(self, key):
+        return self._db.execute(f'SELECT 1 FROM {self.table} WHERE {self.key} = ?', (key,)).fetchone() is not None
+
+    def __len__(self):
+        return self._db.execute(f'SELECT COUNT(*) FROM {self.table}').fetchone()[0]
+
+    def __iter__(self):
+        cursor = self._db.execute(f'{self._select} ORDER BY seq')
+        while True:
+            rows = cursor.fetchmany(1000)
+            if not rows:
+                return
+            yield from map(self._item, rows)
+
+    def __getitem__(self, index):
+        """
+        Returns the object(s) at a position in insertion order.
+
+        Positional access is kept for compatibility with the former list
+        storage; use ``get`` for keyed lookups.
+        """
+        if isinstance(index, slice):
+            return list(self)[index]
+        if index < 0:
+            index += len(self)
+        row = None
+        if index >= 0:
+            row = self._db.execute(f'{self._select} ORDER BY seq LIMIT 1 OFFSET ?', (index,)).fetchone()
+        if row is None:
+            raise IndexError("store index out of range")
+        return self._item(row)
+
+
+class _Transaction:
+    """
+    Runs the statements of a ``with`` block in one write transaction.
+    """
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        self.db.execute('BEGIN IMMEDIATE')
+        return self.db
+
+    def __exit__(self, exc_type, exc, tb):
+        self.db.execute('COMMIT' if exc_type is None else 'ROLLBACK')
+
+
+class SQLiteProductStore(SQLiteStore):
+    """
+    A product store kept in an SQLite database that several processes can
+    share.
+
+    Catalogue-wide operations run as single SQL statements, and filtered,
+    sorted queries and keyword searches are answered through the database's
+    indexes (see ``query`` and ``search``), so every process sees the same
+    results.
+    """
+    table = 'products'
+    key = 'product_id'
+    fields = (('name', 'TEXT'), ('description', 'TEXT'), ('price', 'REAL'), ('quantity', 'INTEGER'),
+              ('name_key', 'TEXT'))
+    factory = Product
+
+    # Sort expressions of the fields query() can sort by
+    SORT_KEYS = {'product_id': 'product_id', 'price': 'price', 'quantity': 'quantity', 'name': 'name_key'}
+
+    def _create_indexes(self, db):
+        for column in ('price', 'quantity', 'name_key'):
+            db.execute(f'CREATE INDEX IF NOT EXISTS products_{column} ON products ({column}, product_id)')
+
+        # Full-text index of the names and descriptions, kept in step with
+        # the products by triggers, so it holds the changes of every process
+        created = db.execute("SELECT 1 FROM sqlite_master WHERE name = 'products_fts'").fetchone() is None
+        db.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(name, description, content='products', "
+            "content_rowid='seq', tokenize=\"unicode61 tokenchars '_'\")"
+        )
+        db.execute(
+            'CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN '
+            'INSERT INTO products_fts (rowid, name, description) VALUES (new.seq, new.name, new.description); END'
+        )
+        db.execute(
+            'CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN '
+            "INSERT INTO products_fts (products_fts, rowid, name, description) "
+            "VALUES ('delete', old.seq, old.name, old.description); END"
+        )
+        db.execute(
+            'CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE OF name, description ON products BEGIN '
+            "INSERT INTO products_fts (products_fts, rowid, name, description) "
+            "VALUES ('delete', old.seq, old.name, old.description); "
+            'INSERT INTO products_fts (rowid, name, description) VALUES (new.seq, new.name, new.description); END'
+        )
+        if created:
+            # Index the products of a database created without it
+            db.execute("INSERT INTO products_fts (products_fts) VALUES ('rebuild')")
+
+    def _item(self, row):
+        return Product(*row[:5])
+
+    def _values(self, product):
+        return [product.product_id, product.name, product.description, product.price, product.quantity,
+                product.name.lower()]
+
+    def update(self, key, **fields):
+        if 'name' in fields:
+            fields['name_key'] = fields['name'].lower()
+        return super().update(key, **fields)
+
+    def extend_columns(self, ids, names, descriptions, prices, quantities):
+        """
+        Adds products given as whole columns, e.g. from a DataFrame.
+
+        Raises
+        ------
+        ValueError
+            If a product ID is repeated or already stored. Nothing is added
+            then.
+        """
+        self.extend(map(Product, _as_list(ids), _as_list(names), _as_list(descriptions),
+                        _as_list(prices), _as_list(quantities)))
+
+    def columns(self):
+        """
+        Returns the stored products as columns, in insertion order.
+        """
+        rows = self._db.execute(f'{self._select} ORDER BY seq').fetchall()
+        names = ('product_id', 'name', 'description', 'price', 'quantity')
+        if not rows:
+            return {name: [] for name in names}
+        return dict(zip(names, map(list, zip(*rows))))
+
+    def increase_price(self, percentage):
+        """
+        Increases the price of all stored products by a percentage.
+        """
+        self._db.execute('UPDATE products SET price = price + price * ?', (percentage / 100,))
+
+    def stock_value(self):
+        """
+        Returns the total value of the stock, summed over price * quantity.
+        """
+        return self._db.execute('SELECT TOTAL(price * quantity) FROM products').fetchone()[0]
+
+    def low_stock(self, threshold):
+        """
+        Returns the IDs of products whose quantity is below a threshold, in
+        insertion order.
+        """
+        rows = self._db.execute('SELECT product_id FROM products WHERE quantity < ? ORDER BY seq', (threshold,))
+        return [row[0] for row in rows]
+
+    def adjust_quantities(self, deltas):
+        """
+        Adds per-product deltas to the stock quantities in one transaction.
+
+        Returns
+        -------
+        int
+            Number of products adjusted.
+        """
+        adjusted = 0
+        with self._transaction() as db:
+            for product_id, delta in deltas.items():
+                adjusted += db.execute(
+                    'UPDATE products SET quantity = quantity + ? WHERE product_id = ?', (delta, product_id)
+                ).rowcount
+        return adjusted
+
+    def add_quantity(self, product_id, delta):
+        """
+        Adds a delta to one product's stock quantity unless that would take
+        it below zero. Takes the arguments and returns the result of
+        ``ProductStore.add_quantity``.
+
+        The check and the update are one conditional UPDATE, so the
+        quantity never goes negative even when several processes adjust
+        the same product at once.
+        """
+        rows = self._db.execute(
+            'UPDATE products SET quantity = quantity + ? WHERE product_id = ? AND quantity + ? >= 0 '
+            'RETURNING quantity', (delta, product_id, delta)
+        ).fetchall()
+        if rows:
+            return rows[0][0]
+        row = self._db.execute('SELECT quantity FROM products WHERE product_id = ?', (product_id,)).fetchone()
+        if row is None:
+            return None
+        raise InsufficientStock(product_id, row[0], delta)
+
+    def query(self, min_price=None, max_price=None, quantity_below=None, name_prefix=None,
+              sort='product_id', descending=False, offset=0, limit=100, after=None):
+        """
+        Retrieves a filtered, sorted page of products with one indexed SQL
+        query. Takes the arguments and returns the result of
+        ``Inventory.query_products``.
+        """
+        conditions = []
+        params = []
+        if min_price is not None:
+            conditions.append('price >= ?')
+            params.append(min_price)
+        if max_price is not None:
+            conditions.append('price <= ?')
+            params.append(max_price)
+        if quantity_below is not None:
+            conditions.append('quantity < ?')
+            params.append(quantity_below)
+        if name_prefix:
+            conditions.append('name_key >= ? AND name_key < ?')
+            params += [name_prefix.lower(), name_prefix.lower() + '\U0010ffff']
+        key = self.SORT_KEYS[sort]
+        if after is not None:
+            conditions.append(f'({key}, product_id) {"<" if descending else ">"} (?, ?)')
+            params += list(after)
+        where = f'WHERE {" AND ".join(conditions)}' if conditions else ''
+        order = 'DESC' if descending else 'ASC'
+        rows = self._db.execute(
+            f'{self._select} {where} ORDER BY {key} {order}, product_id {order} LIMIT ? OFFSET ?',
+            params + [limit + 1, offset]
+        ).fetchall()
+
+        products = [self._item(row) for row in rows[:limit]]
+        last = rows[limit - 1] if len(rows) > limit else None
+        if last is None:
+            return {'products': products, 'next': None}
+        sort_value = last[5] if sort == 'name' else getattr(products[-1], sort)
+        return {'products': products, 'next': (sort_value, last[0])}
+
+    def search(self, query, limit=20, offset=0):
+        """
+        Finds products by keywords in their name and description with the
+        database's full-text index. Takes the arguments and returns the
+        result of ``Inventory.search_products``.
+
+        Matching follows ``scripts.search.SearchIndex``: every word must
+        occur and the last one may be the start of a word. Results are
+        ranked by the index's BM25 score, with name matches weighing
+        NAME_WEIGHT times more; ties go to the lower product ID.
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return {'products': [], 'scores': [], 'total': 0}
+        match = ' '.join(f'"{token}"' for token in tokens) + '*'
+        total = self._db.execute(
+            'SELECT COUNT(*) FROM products_fts WHERE products_fts MATCH ?', (match,)
+        ).fetchone()[0]
+        rows = self._db.execute(
+            'SELECT p.product_id, p.name, p.description, p.price, p.quantity, '
+            '-bm25(products_fts, ?, 1.0) AS score FROM products_fts JOIN products p ON p.seq = products_fts.rowid '
+            'WHERE products_fts MATCH ? ORDER BY score DESC, p.product_id LIMIT ? OFFSET ?',
+            (float(NAME_WEIGHT), match, limit, offset)
+        ).fetchall()
+        return {'products': [self._item(row) for row in rows], 'scores': [row[5] for row in rows], 'total': total}
+
+
+class SQLiteSupplierStore(SQLiteStore):
+    """
+    A supplier store kept in an SQLite database that several processes can
+    share.
+    """
+    table = 'suppliers'
+    key = 'supplier_id'
+    fields = (('name', 'TEXT'), ('contact_info', 'TEXT'))
+    factory = Supplier
+
+
+class SQLiteLinkStore(_SQLiteDatabase):
+    """
+    The links between products and suppliers, kept in an SQLite database
+    that several processes can share. Takes the same methods as
+    ``scripts.links.LinkIndex``.
+
+    Each link is a row keyed by (product_id, supplier_id), with an index on
+    (supplier_id, product_id), so both sides are looked up and paged
+    through by ID with an index range scan.
+    """
+    def __init__(self, path, timeout=30.0):
+        """
+        Opens the store, creating the database and table if needed.
+
+        Parameters
+        ----------
+        path : str
+            Database file.
+        timeout : float
+            Seconds to wait for another process's write to finish.
+        """
+        super().__init__(path, timeout)
+        with self._transaction() as db:
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS links (product_id INTEGER NOT NULL, supplier_id INTEGER NOT NULL, '
+                'PRIMARY KEY (product_id, supplier_id)) WITHOUT ROWID'
+            )
+            db.execute('CREATE INDEX IF NOT EXISTS links_supplier_id ON links (supplier_id, product_id)')
+
+    def add(self, product_id, supplier_id):
+        """
+        Links a product to a supplier.
+
+        Returns
+        -------
+        bool
+            True if the link is new, False if it already existed.
+        """
+        return self._db.execute(
+            'INSERT OR IGNORE INTO links (product_id, supplier_id) VALUES (?, ?)', (product_id, supplier_id)
+        ).rowcount > 0
+
+    def discard(self, product_id, supplier_id):
+        """
+        Unlinks a product from a supplier.
+
+        Returns
+        -------
+        bool
+            True if the link was removed, False if it did not exist.
+        """
+        return self._db.execute(
+            'DELETE FROM links WHERE product_id = ? AND supplier_id = ?', (product_id, supplier_id)
+        ).rowcount > 0
+
+    def remove_product(self, product_id):
+        """
+        Removes every link of a product.
+
+        Returns
+        -------
+        list
+            IDs of the suppliers the product was linked to.
+        """
+        rows = self._db.execute('DELETE FROM links WHERE product_id = ? RETURNING supplier_id', (product_id,))
+        return sorted(row[0] for row in rows.fetchall())
+
+    def remove_supplier(self, supplier_id):
+        """
+        Removes every link of a supplier.
+
+        Returns
+        -------
+        list
+            IDs of the products the supplier was linked to.
+        """
+        rows = self._db.execute('DELETE FROM links WHERE supplier_id = ? RETURNING product_id', (supplier_id,))
+        return sorted(row[0] for row in rows.fetchall())
+
+    def _page(self, column, other, key, after, limit):
+        condition = f'{other} = ?' if after is None else f'{other} = ? AND {column} > ?'
+        params = [key] if after is None else [key, after]
+        rows = self._db.execute(f'SELECT {column} FROM links WHERE {condition} ORDER BY {column} LIMIT ?',
+                                params + [limit if limit is not None else -1])
+        return [row[0] for row in rows]
+
+    def products_of(self, supplier_id, after=None, limit=None):
+        """
+        Returns the IDs of the products linked to a supplier, in ascending
+        order. Takes the same paging arguments as
+        ``LinkIndex.products_of``.
+        """
+        return self._page('product_id', 'supplier_id', supplier_id, after, limit)
+
+    def suppliers_of(self, product_id, after=None, limit=None):
+        """
+        Returns the IDs of the suppliers linked to a product, in ascending
+        order. Takes the same paging arguments as
+        ``LinkIndex.products_of``.
+        """
+        return self._page('supplier_id', 'product_id', product_id, after, limit)
+
+    def extend(self, product_ids, supplier_ids):
+        """
+        Adds links given as two parallel sequences of IDs in one
+        transaction.
+        """
+        with self._transaction() as db:
+            db.executemany('INSERT OR IGNORE INTO links (product_id, supplier_id) VALUES (?, ?)',
+                           zip(product_ids, supplier_ids))
+
+    def columns(self):
+        """
+        Returns every link as ``product_id`` and ``supplier_id`` columns,
+        ordered by product ID, then supplier ID.
+        """
+        rows = self._db.execute('SELECT product_id, supplier_id FROM links ORDER BY product_id, supplier_id')
+        columns = {'product_id': [], 'supplier_id': []}
+        for product_id, supplier_id in rows:
+            columns['product_id'].append(product_id)
+            columns['supplier_id'].append(supplier_id)
+        return columns
+
+    def clear(self):
+        """
+        Removes all links.
+        """
+        self._db.execute('DELETE FROM links')
+
+    def __contains__(self, link):
+        product_id, supplier_id = link
+        return self._db.execute(
+            'SELECT 1 FROM links WHERE product_id = ? AND supplier_id = ?', (product_id, supplier_id)
+        ).fetchone() is not None
+
+    def __len__(self):
+        return self._db.execute('SELECT COUNT(*) FROM links').fetchone()[0]
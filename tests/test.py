@@ -1,11 +1,12 @@
 import sys
 import os
+import json
 import unittest
 
 # Add the path to the scripts folder
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 
-from scripts.inventory_man import Product, Supplier, Inventory
+from scripts.inventory_man import InsufficientStock, Product, Supplier, Inventory
 
 class TestInventory(unittest.TestCase):
 
@@ -71,6 +72,205 @@ class TestInventory(unittest.TestCase):
         os.remove('test_products.csv')
         os.remove('test_suppliers.csv')
 
+    def test_keyed_lookup_update_and_remove(self):
+        inventory = Inventory()
+        for i in range(1, 6):
+            inventory.add_product(Product(i, f"Item {i}", "An item", 1.0 * i, i))
+
+        # Lookups, updates and removals go through the product ID
+        self.assertEqual(inventory.get_product(3).name, "Item 3")
+        self.assertTrue(inventory.update_product(3, name="Renamed", price=9.5))
+        self.assertEqual(inventory.get_product(3).name, "Renamed")
+        self.assertEqual(inventory.get_product(3).price, 9.5)
+        self.assertTrue(inventory.remove_product(3))
+        self.assertIsNone(inventory.get_product(3))
+        self.assertFalse(inventory.remove_product(3))
+        self.assertFalse(inventory.update_product(3, name="Missing"))
+
+        # Insertion order is preserved for iteration and positional access
+        self.assertEqual([p.product_id for p in inventory.products], [1, 2, 4, 5])
+        self.assertEqual(inventory.products[2].product_id, 4)
+        self.assertEqual(inventory.products[-1].product_id, 5)
+        self.assertEqual(len(inventory.get_all_products()), 4)
+
+    def test_duplicate_ids_are_rejected(self):
+        inventory = Inventory()
+        inventory.add_product(Product(1, "Widget", "A simple widget", 10.0, 100))
+        inventory.add_supplier(Supplier(1, "SupplierCo", "supplier@example.com"))
+
+        with self.assertRaises(ValueError):
+            inventory.add_product(Product(1, "Other", "Another widget", 5.0, 1))
+        with self.assertRaises(ValueError):
+            inventory.add_supplier(Supplier(1, "OtherCo", "other@example.com"))
+
+        self.assertEqual(inventory.get_product(1).name, "Widget")
+        self.assertEqual(repr(inventory), "Inventory(Products=1, Suppliers=1)")
+
+    def test_supplier_update_and_remove(self):
+        inventory = Inventory()
+        inventory.add_supplier(Supplier(1, "SupplierCo", "supplier@example.com"))
+        inventory.add_supplier(Supplier(2, "PartsCo", "parts@example.com"))
+
+        self.assertTrue(inventory.update_supplier(2, contact_info="sales@parts.com"))
+        self.assertEqual(inventory.get_supplier(2).contact_info, "sales@parts.com")
+        # Only None leaves a field unchanged; an empty string clears it
+        self.assertTrue(inventory.update_supplier(1, contact_info=""))
+        self.assertEqual((inventory.get_supplier(1).name, inventory.get_supplier(1).contact_info), ("SupplierCo", ""))
+        self.assertTrue(inventory.remove_supplier(1))
+        self.assertIsNone(inventory.get_supplier(1))
+        self.assertEqual(inventory.get_all_suppliers(), ["Supplier(ID=2, Name=PartsCo, Contact Info=sales@parts.com)"])
+
+    def test_chunked_load_reports_rows_and_time(self):
+        inventory = Inventory()
+        for i in range(1, 11):
+            inventory.add_product(Product(i, f"Item {i}", "" if i == 4 else f"Item number {i}", 1.5 * i, i))
+        inventory.add_supplier(Supplier(1, "SupplierCo", "supplier@example.com"))
+        inventory.save_to_csv('test_products.csv', 'test_suppliers.csv')
+
+        try:
+            new_inventory = Inventory()
+            new_inventory.add_product(Product(99, "Stale", "Replaced by the load", 1.0, 1))
+            report = new_inventory.load_from_csv('test_products.csv', 'test_suppliers.csv', chunksize=3)
+        finally:
+            os.remove('test_products.csv')
+            os.remove('test_suppliers.csv')
+
+        self.assertEqual(report['products'], 10)
+        self.assertEqual(report['suppliers'], 1)
+        self.assertGreaterEqual(report['seconds'], 0)
+        self.assertIsNone(new_inventory.get_product(99))
+        self.assertEqual([p.product_id for p in new_inventory.products], list(range(1, 11)))
+        self.assertEqual(new_inventory.get_all_products(), inventory.get_all_products())
+        # Loaded values are plain Python scalars and missing text is empty
+        self.assertIs(type(new_inventory.get_product(2).product_id), int)
+        self.assertEqual(new_inventory.get_product(4).description, "")
+
+    def test_bulk_methods(self):
+        inventory = Inventory()
+        inventory.add_product(Product(1, "Widget", "A simple widget", 10.0, 100))
+        batch = [Product(2, "Gadget", "An advanced gadget", 20.0, 50), Product(1, "Clash", "Same ID", 1.0, 1)]
+
+        # Atomic batches are all-or-nothing, others apply what they can
+        self.assertEqual(inventory.add_products(batch, atomic=True), [True, False])
+        self.assertIsNone(inventory.get_product(2))
+        self.assertEqual(inventory.add_products(batch), [True, False])
+        self.assertEqual(inventory.get_product(2).name, "Gadget")
+
+        updates = [{'product_id': 1, 'quantity': 7}, {'product_id': 3, 'quantity': 1}]
+        self.assertEqual(inventory.update_products(updates, atomic=True), [True, False])
+        self.assertEqual(inventory.get_product(1).quantity, 100)
+        self.assertEqual(inventory.update_products(updates), [True, False])
+        self.assertEqual(inventory.get_product(1).quantity, 7)
+
+        self.assertEqual(inventory.remove_products([2, 2], atomic=True), [True, False])
+        self.assertEqual(len(inventory.products), 2)
+        self.assertEqual(inventory.remove_products([2, 2]), [True, False])
+        self.assertEqual([p.product_id for p in inventory.products], [1])
+
+        # Atomic batches may be given as iterators
+        self.assertEqual(inventory.add_products(iter(batch[:1]), atomic=True), [True])
+        self.assertEqual(inventory.get_product(2).name, "Gadget")
+        self.assertEqual(inventory.update_products(iter(updates[:1]), atomic=True), [True])
+        self.assertEqual(inventory.remove_products(iter([2]), atomic=True), [True])
+        self.assertEqual([p.product_id for p in inventory.products], [1])
+
+    def test_stock_counters(self):
+        inventory = Inventory()
+        inventory.add_product(Product(1, "Widget", "A simple widget", 10.0, 5))
+        changes = []
+        inventory.add_listener(changes.append)
+
+        self.assertEqual(inventory.reserve(1, 3), 2)
+        self.assertEqual(inventory.release(1, 1), 3)
+        self.assertEqual(inventory.adjust_quantity(1, -3), 0)
+        self.assertEqual(inventory.adjust_quantity(1, 4), 4)
+        self.assertEqual([(c.before['quantity'], c.after['quantity']) for c in changes],
+                         [(5, 2), (2, 3), (3, 0), (0, 4)])
+
+        # Nothing is taken when there is not enough stock
+        with self.assertRaises(InsufficientStock) as raised:
+            inventory.reserve(1, 5)
+        self.assertEqual(raised.exception.quantity, 4)
+        with self.assertRaises(InsufficientStock):
+            inventory.adjust_quantity(1, -5)
+        self.assertEqual(inventory.get_product(1).quantity, 4)
+        self.assertEqual(len(changes), 4)
+
+        self.assertIsNone(inventory.reserve(2, 1))
+        for amount in (0, -1, 1.5, True, None):
+            with self.assertRaises(ValueError):
+                inventory.reserve(1, amount)
+
+        # Falsy values are updates too
+        self.assertTrue(inventory.update_product(1, quantity=0, price=0.0))
+        self.assertEqual(inventory.get_product(1).quantity, 0)
+        self.assertEqual(inventory.get_product(1).price, 0.0)
+
+    def test_listeners_receive_changes(self):
+        inventory = Inventory()
+        changes = []
+        inventory.add_listener(changes.append)
+
+        inventory.add_product(Product(1, "Widget", "A simple widget", 10.0, 100))
+        inventory.update_product(1, price=12.0)
+        inventory.update_product(2, price=12.0)
+        inventory.increase_price(10)
+        inventory.remove_product(1)
+        inventory.add_supplier(Supplier(1, "SupplierCo", "supplier@example.com"))
+
+        self.assertEqual([(c.op, c.kind, c.key) for c in changes], [
+            ('add', 'product', 1), ('update', 'product', 1), ('increase_price', 'product', None),
+            ('remove', 'product', 1), ('add', 'supplier', 1)
+        ])
+        self.assertEqual(changes[1].before['price'], 10.0)
+        self.assertEqual(changes[1].after['price'], 12.0)
+        self.assertEqual(changes[2].after, {'percentage': 10})
+        self.assertIsNone(changes[3].after)
+
+        inventory.remove_listener(changes.append)
+        inventory.add_product(Product(2, "Gadget", "An advanced gadget", 20.0, 50))
+        self.assertEqual(len(changes), 5)
+
+    def test_iter_export(self):
+        inventory = Inventory()
+        for i in range(1, 6):
+            inventory.add_product(Product(i, f"Item {i}", "An item", 1.0 * i, i))
+        inventory.add_supplier(Supplier(1, "SupplierCo", "supplier@example.com"))
+
+        chunks = list(inventory.iter_export('products', 'ndjson', chunk_size=2))
+        self.assertEqual(len(chunks), 3)
+        records = [json.loads(line) for line in ''.join(chunks).splitlines()]
+        self.assertEqual(records, [p.to_dict() for p in inventory.products])
+
+        exported = json.loads(''.join(inventory.iter_export('products', 'json', chunk_size=2)))
+        self.assertEqual(exported, records)
+        self.assertEqual(json.loads(''.join(inventory.iter_export('suppliers', 'json'))),
+                         [{'supplier_id': 1, 'name': 'SupplierCo', 'contact_info': 'supplier@example.com'}])
+        self.assertEqual(''.join(Inventory().iter_export('products', 'json')), '[]')
+
+    def test_compact_records(self):
+        # Fields are slots and repeated strings are shared
+        description = "".join(["A simple ", "widget"])
+        product1 = Product(1, "Widget", "A simple widget", 10.0, 100)
+        product2 = Product(2, "Gadget", description, 20.0, 50)
+        self.assertFalse(hasattr(product1, '__dict__'))
+        self.assertIs(product1.description, product2.description)
+        with self.assertRaises(AttributeError):
+            product1.colour = "red"
+
+        inventory = Inventory()
+        inventory.add_products([product1, product2])
+        inventory.update_product(2, description="".join(["A simple ", "gadget"]))
+        inventory.add_product(Product(3, "Gizmo", "A simple gadget", 5.0, 1))
+        self.assertIs(inventory.get_product(2).description, inventory.get_product(3).description)
+
+        supplier = Supplier(1, "SupplierCo", "supplier@example.com")
+        self.assertIsNone(supplier._supplied_products)
+        self.assertEqual(supplier.supplied_products, [])
+        supplier.supplied_products.append(1)
+        self.assertEqual(supplier.supplied_products, [1])
+        self.assertEqual(repr(supplier), "Supplier(ID=1, Name=SupplierCo, Contact Info=supplier@example.com)")
+
         
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,90 @@
+import sys
+import os
+import random
+import unittest
+
+# Add the path to the scripts folder
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from scripts.inventory_man import InsufficientStock, Product, Supplier, Inventory
+from scripts.aggregates import AggregateMismatch
+from scripts.columnar import ColumnarProductStore
+
+class TestStockAggregates(unittest.TestCase):
+
+    def make_inventory(self, store=None):
+        inventory = Inventory(product_store=store)
+        inventory.add_products([Product(i, f"Item {i}", "An item", 2.0, i) for i in range(1, 21)])
+        inventory.add_supplier(Supplier(1, "SupplierCo", "supplier@example.com"))
+        inventory.add_supplier(Supplier(2, "OtherCo", "other@example.com"))
+        inventory.add_link(1, 1)
+        inventory.add_link(2, 1)
+        inventory.add_link(2, 2)
+        return inventory
+
+    def test_stats_follow_changes(self):
+        inventory = self.make_inventory()
+        self.assertEqual(inventory.stats(), {
+            'products': 20, 'units': 210, 'stock_value': 420.0, 'low_stock': {1: 0, 10: 9},
+            'supplier_value': {1: 6.0, 2: 4.0}
+        })
+        inventory.update_product(1, price=5.0, quantity=0)
+        inventory.reserve(2, 2)
+        inventory.remove_product(20)
+        inventory.increase_price(50)
+        inventory.add_product(Product(30, "New", "Added later", 1.0, 3))
+        inventory.add_link(30, 2)
+        stats = inventory.stats(verify=True)
+        self.assertEqual((stats['products'], stats['units'], stats['low_stock']), (20, 190, {1: 2, 10: 10}))
+        self.assertAlmostEqual(stats['stock_value'], (189 - 2) * 3.0 + 3.0)
+        self.assertEqual(stats['supplier_value'], {1: 0.0, 2: 3.0})
+
+        # Removing a product or supplier drops its links from the values
+        inventory.remove_product(30)
+        inventory.remove_supplier(1)
+        self.assertEqual(inventory.stats(verify=True)['supplier_value'], {2: 0.0})
+
+    def test_random_changes_verify(self):
+        for store in (None, ColumnarProductStore()):
+            inventory = self.make_inventory(store)
+            inventory.stats()
+            rng = random.Random(7)
+            next_id = 100
+            for _ in range(500):
+                product_id = rng.randrange(1, next_id)
+                operation = rng.randrange(7)
+                if operation == 0:
+                    inventory.add_product(Product(next_id, "Added", "Random", rng.uniform(0, 50), rng.randrange(20)))
+                    next_id += 1
+                elif operation == 1:
+                    inventory.remove_product(product_id)
+                elif operation == 2:
+                    inventory.update_product(product_id, price=rng.uniform(0, 50), quantity=rng.randrange(20))
+                elif operation == 3:
+                    try:
+                        inventory.adjust_quantity(product_id, rng.randrange(-5, 5))
+                    except InsufficientStock:
+                        pass
+                elif operation == 4:
+                    inventory.add_link(product_id, rng.choice([1, 2]))
+                elif operation == 5:
+                    inventory.remove_link(product_id, rng.choice([1, 2]))
+                else:
+                    inventory.adjust_quantities({product_id: 1, product_id + 1: 2})
+                if rng.random() < 0.02:
+                    inventory.increase_price(rng.uniform(-10, 10))
+            self.assertEqual(inventory.stats(verify=True), inventory.stats())
+            self.assertEqual(inventory.stats(recompute=True)['units'], inventory.stats()['units'])
+
+    def test_verify_detects_drift(self):
+        inventory = self.make_inventory()
+        inventory.stats()
+        # A change made behind the inventory's back is not seen
+        inventory.products.get(3).quantity = 100
+        with self.assertRaises(AggregateMismatch) as raised:
+            inventory.stats(verify=True)
+        self.assertEqual(raised.exception.field, 'units')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,5 @@
 import unittest
+import gzip
 import json
 import scripts.app as app
 
@@ -84,6 +85,336 @@ class InventoryAPITestCase(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIn('Price increased successfully', response.get_data(as_text=True))
     
+    def test_add_duplicate_product(self):
+        payload = json.dumps({
+            'product_id': 6,
+            'name': 'Test Product 6',
+            'description': 'This is a test product added twice',
+            'price': 5.99,
+            'quantity': 5
+        })
+        self.app.post('/products', data=payload, content_type='application/json')
+        # Test adding a product with an ID that is already taken
+        response = self.app.post('/products', data=payload, content_type='application/json')
+        self.assertEqual(response.status_code, 409)
+        self.assertIn('Product already exists', response.get_data(as_text=True))
+
+    def test_batch_products(self):
+        # Test creating, updating and deleting products in bulk
+        response = self.app.post('/products/batch', data=json.dumps([
+            {'product_id': 100 + i, 'name': f'Batch Product {i}', 'description': 'Added in bulk',
+             'price': 1.5, 'quantity': 10}
+            for i in range(3)
+        ]), content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.get_json()['applied'], 3)
+
+        ndjson = '\n'.join(json.dumps({'product_id': 100 + i, 'quantity': 20}) for i in range(4))
+        response = self.app.patch('/products/batch', data=ndjson, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([r['status'] for r in response.get_json()['results']], [200, 200, 200, 404])
+
+        response = self.app.delete('/products/batch?atomic=true', data=json.dumps([100, 101, 999]),
+                                   content_type='application/json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual([r['status'] for r in response.get_json()['results']], [424, 424, 404])
+        self.assertEqual(self.app.get('/products/100').status_code, 200)
+
+        # Malformed lines and IDs are rejected rather than failing the server
+        response = self.app.patch('/products/batch', data='{"product_id": 100}\n{oops',
+                                  content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('line 2', response.get_data(as_text=True))
+        response = self.app.delete('/products/batch?atomic=true', data=json.dumps([100, [101], {'product_id': 'x'}]),
+                                   content_type='application/json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual([r['status'] for r in response.get_json()['results']], [424, 400, 400])
+        self.assertEqual(self.app.get('/products/100').status_code, 200)
+
+        response = self.app.delete('/products/batch', data=json.dumps([100, 101, 102]),
+                                   content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.app.get('/products/100').status_code, 404)
+
+    def test_list_products_paginated(self):
+        # Add products with a name prefix no other test uses
+        self.app.post('/products/batch', data=json.dumps([
+            {'product_id': 200 + i, 'name': f'Paged Product {i}', 'description': 'Listed in pages',
+             'price': 100.0 + i, 'quantity': i}
+            for i in range(5)
+        ]), content_type='application/json')
+
+        # Test walking the filtered, sorted list page by page
+        names = []
+        url = '/products?name_prefix=paged&sort=price&order=desc&limit=2'
+        while url:
+            response = self.app.get(url)
+            self.assertEqual(response.status_code, 200)
+            data = response.get_json()
+            names.extend(product['name'] for product in data['products'])
+            cursor = data['next_cursor']
+            url = f'/products?name_prefix=paged&sort=price&order=desc&limit=2&cursor={cursor}' if cursor else None
+        self.assertEqual(names, [f'Paged Product {i}' for i in range(4, -1, -1)])
+
+        response = self.app.get('/products?name_prefix=paged&quantity_below=2&sort=quantity')
+        self.assertEqual([p['product_id'] for p in response.get_json()['products']], [200, 201])
+        self.assertEqual(self.app.get('/products?sort=description').status_code, 400)
+
+        # Cursors that decode but have the wrong shape are rejected
+        for value in ({}, 1, [1], ['a', 1], [1.5, '2'], 'x'):
+            cursor = app._encode_cursor(value)
+            response = self.app.get(f'/products?sort=price&cursor={cursor}')
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('Invalid cursor', response.get_data(as_text=True))
+        self.assertEqual(self.app.get('/products?cursor=not-base64!').status_code, 400)
+
+    def test_export_products(self):
+        self.app.post('/products', data=json.dumps({
+            'product_id': 300,
+            'name': 'Exported Product',
+            'description': 'This is a test product to export',
+            'price': 3.5,
+            'quantity': 30
+        }), content_type='application/json')
+        # Test streaming the catalogue as NDJSON and as a JSON array
+        response = self.app.get('/products?stream=ndjson')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertIn({'product_id': 300, 'name': 'Exported Product', 'description': 'This is a test product to export',
+                       'price': 3.5, 'quantity': 30}, records)
+
+        response = self.app.get('/export/products?format=json')
+        self.assertEqual(json.loads(response.get_data(as_text=True)), records)
+        self.assertEqual(self.app.get('/export/products?format=xml').status_code, 400)
+
+    def test_cached_reads(self):
+        self.app.post('/products', data=json.dumps({
+            'product_id': 500,
+            'name': 'Cached Product',
+            'description': 'This is a test product to cache',
+            'price': 5.0,
+            'quantity': 50
+        }), content_type='application/json')
+        # Test serving a repeated read from the cache, and a 304 by ETag
+        first = self.app.get('/products/500')
+        second = self.app.get('/products/500')
+        self.assertEqual(second.headers['X-Cache'], 'HIT')
+        self.assertEqual(second.get_data(), first.get_data())
+        response = self.app.get('/products/500', headers={'If-None-Match': first.headers['ETag']})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.get_data(), b'')
+
+        # Test that an update invalidates the cached response
+        self.app.put('/products/500', data=json.dumps({'quantity': 7}), content_type='application/json')
+        response = self.app.get('/products/500', headers={'If-None-Match': first.headers['ETag']})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['X-Cache'], 'MISS')
+        self.assertEqual(response.get_json()['quantity'], 7)
+
+        stats = self.app.get('/cache/stats').get_json()
+        self.assertTrue(stats['enabled'])
+        self.assertGreaterEqual(stats['hits'], 2)
+
+    def test_supplier_products(self):
+        self.app.post('/suppliers', data=json.dumps({
+            'supplier_id': 60,
+            'name': 'Linked Supplier',
+            'contact_info': 'linked@supplier.com'
+        }), content_type='application/json')
+        for i in range(3):
+            self.app.post('/products', data=json.dumps({
+                'product_id': 600 + i,
+                'name': f'Linked Product {i}',
+                'description': 'Supplied by a supplier',
+                'price': 6.0,
+                'quantity': 60
+            }), content_type='application/json')
+            response = self.app.post('/suppliers/60/products', data=json.dumps({'product_id': 600 + i}),
+                                     content_type='application/json')
+            self.assertEqual(response.status_code, 201)
+        response = self.app.post('/suppliers/60/products', data=json.dumps({'product_id': 699}),
+                                 content_type='application/json')
+        self.assertEqual(response.status_code, 404)
+
+        # Test paging through a supplier's products
+        product_ids = []
+        url = '/suppliers/60/products?limit=2'
+        while url:
+            data = self.app.get(url).get_json()
+            product_ids.extend(product['product_id'] for product in data['products'])
+            url = f"/suppliers/60/products?limit=2&cursor={data['next_cursor']}" if data['next_cursor'] else None
+        self.assertEqual(product_ids, [600, 601, 602])
+        for value in ([600, 1], '600', True):
+            cursor = app._encode_cursor(value)
+            self.assertEqual(self.app.get(f'/suppliers/60/products?cursor={cursor}').status_code, 400)
+            self.assertEqual(self.app.get(f'/products/600/suppliers?cursor={cursor}').status_code, 400)
+
+        self.assertEqual(self.app.delete('/suppliers/60/products/601').status_code, 200)
+        self.assertEqual(self.app.delete('/suppliers/60/products/601').status_code, 404)
+        data = self.app.get('/products/600/suppliers').get_json()
+        self.assertEqual([supplier['supplier_id'] for supplier in data['suppliers']], [60])
+        self.app.delete('/products/600')
+        data = self.app.get('/suppliers/60/products').get_json()
+        self.assertEqual([product['product_id'] for product in data['products']], [602])
+        self.assertEqual(self.app.get('/suppliers/69/products').status_code, 404)
+
+    def test_search_products(self):
+        for i, (name, description) in enumerate([('Searchable lamp', 'A desk lamp'),
+                                                 ('Desk', 'Holds a searchable lamp')]):
+            self.app.post('/products', data=json.dumps({
+                'product_id': 700 + i,
+                'name': name,
+                'description': description,
+                'price': 7.0,
+                'quantity': 70
+            }), content_type='application/json')
+        # Test ranked keyword search, with the last word as a prefix
+        data = self.app.get('/products/search?q=searchable%20la').get_json()
+        self.assertEqual([product['product_id'] for product in data['products']], [700, 701])
+        self.assertEqual(data['total'], 2)
+        self.assertGreater(data['products'][0]['score'], data['products'][1]['score'])
+        self.app.put('/products/700', data=json.dumps({'name': 'Lamp'}), content_type='application/json')
+        data = self.app.get('/products/search?q=searchable').get_json()
+        self.assertEqual([product['product_id'] for product in data['products']], [701])
+        self.assertEqual(self.app.get('/products/search?q=').status_code, 400)
+
+    def test_reserve_and_release(self):
+        self.app.post('/products', data=json.dumps({
+            'product_id': 800, 'name': 'Reserved Product', 'description': 'Held for orders',
+            'price': 5.0, 'quantity': 10
+        }), content_type='application/json')
+
+        def post(action, body, product_id=800):
+            response = self.app.post(f'/products/{product_id}/{action}', data=json.dumps(body),
+                                     content_type='application/json')
+            return response.status_code, response.get_json()
+
+        self.assertEqual(post('reserve', {'amount': 4}), (200, {'message': 'Stock updated successfully', 'quantity': 6}))
+        self.assertEqual(post('reserve', {'amount': 7}), (409, {'message': 'Insufficient stock', 'quantity': 6}))
+        self.assertEqual(post('release', {'amount': 2})[1]['quantity'], 8)
+        self.assertEqual(post('adjust', {'delta': -8})[1]['quantity'], 0)
+        self.assertEqual(post('adjust', {'delta': -1})[0], 409)
+        self.assertEqual(post('adjust', {'delta': 5})[1]['quantity'], 5)
+        self.assertEqual(post('reserve', {'amount': 0})[0], 400)
+        self.assertEqual(post('reserve', {'amount': '2'})[0], 400)
+        self.assertEqual(post('release', {})[0], 400)
+        self.assertEqual(post('reserve', {'amount': 1}, product_id=899)[0], 404)
+
+        # A quantity of zero is a real update
+        self.app.put('/products/800', data=json.dumps({'quantity': 0}), content_type='application/json')
+        self.assertEqual(post('reserve', {'amount': 1})[1], {'message': 'Insufficient stock', 'quantity': 0})
+
+    def test_change_feed(self):
+        since = app.feed.last_seq
+        self.app.post('/products', data=json.dumps({
+            'product_id': 900, 'name': 'Fed Product', 'description': 'Watched', 'price': 1.0, 'quantity': 3
+        }), content_type='application/json')
+        self.app.put('/products/900', data=json.dumps({'price': 2.0}), content_type='application/json')
+
+        response = self.app.get(f'/changes?since={since}')
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        changes = [c for c in data['changes'] if c['key'] == 900]
+        self.assertEqual([c['op'] for c in changes], ['add', 'update'])
+        self.assertEqual(changes[1]['after']['price'], 2.0)
+        self.assertEqual(data['last_seq'], app.feed.last_seq)
+        self.assertEqual(self.app.get(f"/changes?since={data['last_seq']}").get_json()['changes'], [])
+        self.assertEqual(self.app.get('/changes?since=-1').status_code, 400)
+
+        # A consumer the feed cannot catch up must resync
+        response = self.app.get(f'/changes?since={app.feed.last_seq + 100}')
+        self.assertEqual(response.status_code, 410)
+        self.assertEqual(response.get_json()['last_seq'], app.feed.last_seq)
+
+        # Server-Sent Events resume from the Last-Event-ID
+        response = self.app.get('/changes', buffered=False, headers={
+            'Accept': 'text/event-stream', 'Last-Event-ID': str(changes[0]['seq'])
+        })
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        event = next(response.response).decode()
+        response.close()
+        self.assertTrue(event.startswith(f"id: {changes[0]['seq'] + 1}\nevent: change\ndata: "))
+        self.assertEqual(json.loads(event.split('data: ', 1)[1])['key'], 900)
+
+    def test_metrics(self):
+        self.assertEqual(self.app.get('/metrics').status_code, 404)
+        app.metrics.enable(app.inventory)
+        try:
+            self.app.post('/products', data=json.dumps({
+                'product_id': 1000, 'name': 'Measured Product', 'description': 'Counted', 'price': 1.0, 'quantity': 1
+            }), content_type='application/json')
+            self.app.get('/products/1000')
+            self.app.get('/products/1099')
+            response = self.app.get('/metrics')
+        finally:
+            app.metrics.disable()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain'))
+        text = response.get_data(as_text=True)
+        self.assertIn('inventory_http_requests_total{status="200",method="GET",route="/products/<int:product_id>"} 1', text)
+        self.assertIn('inventory_http_requests_total{status="404",method="GET",route="/products/<int:product_id>"} 1', text)
+        self.assertIn('inventory_http_request_size_bytes_count{method="POST",route="/products"} 1', text)
+        self.assertIn('inventory_method_calls_total{method="add_product"} 1', text)
+        self.assertIn('# TYPE inventory_products gauge', text)
+
+        response = self.app.post('/metrics/profiler', data=json.dumps({'enabled': True, 'interval': 0.001}),
+                                 content_type='application/json')
+        self.assertEqual(response.get_json()['running'], True)
+        self.app.get('/products?limit=5')
+        self.assertEqual(self.app.post('/metrics/profiler', data=json.dumps({'enabled': False}),
+                                       content_type='application/json').get_json()['running'], False)
+        requests = self.app.get('/metrics/profiler?format=json').get_json()['requests']
+        self.assertIn('GET /products', [request['label'] for request in requests])
+        self.assertEqual(self.app.get('/metrics/profiler').mimetype, 'text/plain')
+        self.assertEqual(self.app.post('/metrics/profiler', data=json.dumps({'enabled': True, 'interval': 5}),
+                                       content_type='application/json').status_code, 400)
+
+    def test_compressed_lists(self):
+        self.app.post('/products/batch', data=json.dumps([
+            {'product_id': 1100 + i, 'name': f'Compressed Product {i}', 'description': 'Sent gzipped',
+             'price': 1.0, 'quantity': i}
+            for i in range(40)
+        ]), content_type='application/json')
+
+        # Test that a large list is gzipped for a client that accepts it
+        url = '/products?name_prefix=compressed&limit=1000'
+        plain = self.app.get(url)
+        self.assertNotIn('Content-Encoding', plain.headers)
+        for _ in range(2):
+            response = self.app.get(url, headers={'Accept-Encoding': 'br, gzip;q=0.8'})
+            self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+            self.assertIn('Accept-Encoding', response.headers['Vary'])
+            self.assertEqual(gzip.decompress(response.get_data()), plain.get_data())
+        self.assertEqual(response.headers['X-Cache'], 'HIT')
+        self.assertNotEqual(response.headers['ETag'], plain.headers['ETag'])
+        self.assertEqual(len(json.loads(plain.get_data())['products']), 40)
+
+        # Small responses and refused codings are sent as they are
+        response = self.app.get('/products/1100', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(response.get_json()['name'], 'Compressed Product 0')
+        response = self.app.get(url, headers={'Accept-Encoding': 'gzip;q=0'})
+        self.assertNotIn('Content-Encoding', response.headers)
+
+    def test_stats(self):
+        before = self.app.get('/stats').get_json()
+        self.app.post('/products', data=json.dumps({
+            'product_id': 1200,
+            'name': 'Counted Product',
+            'description': 'This is a test product to count',
+            'price': 2.5,
+            'quantity': 4
+        }), content_type='application/json')
+        # Test that the aggregates follow the change and verify against a recount
+        response = self.app.get('/stats?verify=true')
+        self.assertEqual(response.status_code, 200)
+        after = response.get_json()
+        self.assertEqual(after['products'], before['products'] + 1)
+        self.assertEqual(after['units'], before['units'] + 4)
+        self.assertAlmostEqual(after['stock_value'], before['stock_value'] + 10.0)
+        self.assertEqual(after['low_stock']['10'], before['low_stock']['10'] + 1)
+
     def test_add_supplier(self):
         # Test adding a supplier
         response = self.app.post('/suppliers', data=json.dumps({
@@ -0,0 +1,105 @@
+import asyncio
+import threading
+import unittest
+import json
+from unittest import mock
+import scripts.asgi_app as asgi
+
+
+def call(method, path, body=None, query=''):
+    """
+    Sends one request to the ASGI application and returns the status,
+    headers and body of its response.
+    """
+    messages = []
+    request = [{'type': 'http.request', 'body': json.dumps(body).encode() if body is not None else b''}]
+
+    async def receive():
+        return request.pop(0) if request else {'type': 'http.disconnect'}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query.encode(), 'headers': []}
+    asyncio.run(asgi.app(scope, receive, send))
+    start = messages[0]
+    body = b''.join(message.get('body', b'') for message in messages[1:])
+    return start['status'], dict(start['headers']), body
+
+
+class InventoryASGITestCase(unittest.TestCase):
+
+    def test_product_routes(self):
+        product = {'product_id': 400, 'name': 'Async Product', 'description': 'Served over ASGI',
+                   'price': 10.0, 'quantity': 5}
+        status, _, body = call('POST', '/products', product)
+        self.assertEqual(status, 201)
+        self.assertEqual(call('POST', '/products', product)[0], 409)
+
+        status, headers, body = call('GET', '/products/400')
+        self.assertEqual(status, 200)
+        self.assertEqual(headers[b'content-type'], b'application/json')
+        self.assertEqual(json.loads(body), {'product_id': 400, 'name': 'Async Product', 'description': 'Served over ASGI',
+                                            'price': 10.0, 'quantity': 5})
+
+        self.assertEqual(call('PUT', '/products/400', {'quantity': 7})[0], 200)
+        self.assertEqual(call('PUT', '/products/499', {'quantity': 7})[0], 404)
+        self.assertEqual(call('POST', '/products/increase_price', {'percentage': 10})[0], 200)
+        self.assertAlmostEqual(asgi.inventory.get_product(400).price, 11.0)
+        self.assertEqual(asgi.inventory.get_product(400).quantity, 7)
+
+        self.assertEqual(call('DELETE', '/products/400')[0], 200)
+        self.assertEqual(call('GET', '/products/400')[0], 404)
+        self.assertEqual(call('GET', '/nowhere')[0], 404)
+        self.assertEqual(call('PATCH', '/products/400')[0], 405)
+
+    def test_list_and_export_products(self):
+        for i in range(5):
+            call('POST', '/products', {'product_id': 410 + i, 'name': f'Async Paged {i}', 'description': 'Listed',
+                                       'price': 1.0 + i, 'quantity': i})
+
+        seen = []
+        query = 'name_prefix=async%20paged&sort=price&order=desc&limit=2'
+        while True:
+            status, _, body = call('GET', '/products', query=query)
+            self.assertEqual(status, 200)
+            page = json.loads(body)
+            seen.extend(product['product_id'] for product in page['products'])
+            if page['next_cursor'] is None:
+                break
+            query = f"name_prefix=async%20paged&sort=price&order=desc&limit=2&cursor={page['next_cursor']}"
+        self.assertEqual(seen, [414, 413, 412, 411, 410])
+        self.assertEqual(call('GET', '/products', query='limit=0')[0], 400)
+
+        status, headers, body = call('GET', '/export/products')
+        self.assertEqual(status, 200)
+        self.assertEqual(headers[b'content-type'], b'application/x-ndjson')
+        exported = [json.loads(line)['product_id'] for line in body.decode().splitlines()]
+        self.assertEqual([i for i in exported if 410 <= i < 415], [410, 411, 412, 413, 414])
+
+    def test_supplier_routes(self):
+        supplier = {'supplier_id': 40, 'name': 'Async Supplier', 'contact_info': 'async@example.com'}
+        self.assertEqual(call('POST', '/suppliers', supplier)[0], 201)
+        self.assertEqual(call('POST', '/suppliers', supplier)[0], 409)
+        status, _, body = call('GET', '/suppliers')
+        self.assertIn(supplier, json.loads(body))
+        self.assertEqual(call('DELETE', '/suppliers/40')[0], 200)
+        self.assertEqual(call('DELETE', '/suppliers/40')[0], 404)
+
+    def test_reads_leave_the_event_loop(self):
+        # Reads may wait for the inventory's lock, so they run on the pool
+        threads = []
+        get_product = asgi.inventory.get_product
+
+        def record(product_id):
+            threads.append(threading.current_thread().name)
+            return get_product(product_id)
+
+        with mock.patch.object(asgi.inventory, 'get_product', record):
+            self.assertEqual(call('GET', '/products/499')[0], 404)
+        self.assertEqual(len(threads), 1)
+        self.assertTrue(threads[0].startswith('inventory-io'))
+
+
+if __name__ == "__main__":
+    unittest.main()
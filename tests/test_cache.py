@@ -0,0 +1,62 @@
+import sys
+import os
+import unittest
+
+# Add the path to the scripts folder
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from scripts.inventory_man import Product, Supplier, Inventory
+from scripts.cache import ResponseCache
+
+class TestResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.inventory = Inventory()
+        self.cache = ResponseCache(maxsize=3)
+        self.inventory.add_listener(self.cache)
+        for i in range(3):
+            self.inventory.add_product(Product(i, f"Item {i}", "Cached", 1.0, 1))
+        self.inventory.add_supplier(Supplier(1, "SupplierCo", "supplier@example.com"))
+
+    def fill(self):
+        generation = self.cache.generation
+        self.cache.put(('product', 0), b'0', [('product', 0), 'price'], generation)
+        self.cache.put(('products', ()), b'[0, 1]', ['product-list', 'price', ('product', 0), ('product', 1)], generation)
+        self.cache.put(('suppliers',), b'[1]', ['suppliers'], generation)
+
+    def test_lru_and_counters(self):
+        self.fill()
+        self.assertEqual(self.cache.get(('product', 0)).body, b'0')
+        self.assertIsNone(self.cache.get(('product', 9)))
+        # The least recently used entry is evicted
+        self.cache.put(('product', 2), b'2', [('product', 2)], self.cache.generation)
+        self.assertIsNone(self.cache.get(('products', ())))
+        self.assertEqual(self.cache.stats(), {'hits': 1, 'misses': 2, 'size': 3, 'maxsize': 3})
+
+        # A response built before an invalidation is not stored
+        generation = self.cache.generation
+        self.inventory.update_product(1, description="Changed")
+        self.cache.put(('product', 1), b'stale', [('product', 1)], generation)
+        self.assertIsNone(self.cache.get(('product', 1)))
+
+    def test_precise_invalidation(self):
+        self.fill()
+        self.inventory.update_product(2, description="Not shown anywhere")
+        self.assertEqual(len(self.cache), 3)
+        self.inventory.update_product(1, description="Shown on the list page")
+        self.assertIsNone(self.cache.get(('products', ())))
+        self.assertIsNotNone(self.cache.get(('product', 0)))
+
+        self.fill()
+        self.inventory.update_product(2, price=5.0)
+        self.assertIsNone(self.cache.get(('products', ())))
+        self.assertIsNotNone(self.cache.get(('product', 0)))
+        self.inventory.increase_price(10)
+        self.assertIsNone(self.cache.get(('product', 0)))
+        self.assertIsNotNone(self.cache.get(('suppliers',)))
+        self.inventory.update_supplier(1, name="Renamed")
+        self.assertEqual(len(self.cache), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import sys
+import os
+import threading
+import time
+import unittest
+
+# Add the path to the scripts folder
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from scripts.inventory_man import Product, Supplier, Inventory
+from scripts.changes import ChangeFeed
+
+class TestChangeFeed(unittest.TestCase):
+
+    def setUp(self):
+        self.inventory = Inventory(thread_safe=True)
+        self.feed = ChangeFeed(maxsize=4)
+        self.inventory.add_listener(self.feed)
+
+    def test_sequenced_changes(self):
+        self.inventory.add_product(Product(1, "Widget", "A simple widget", 10.0, 5))
+        self.inventory.reserve(1, 2)
+        self.inventory.add_supplier(Supplier(1, "SupplierCo", "supplier@example.com"))
+        self.inventory.add_link(1, 1)
+
+        changes, resync = self.feed.read(0)
+        self.assertFalse(resync)
+        self.assertEqual([(c['seq'], c['op'], c['kind'], c['key']) for c in changes], [
+            (1, 'add', 'product', 1), (2, 'update', 'product', 1), (3, 'add', 'supplier', 1), (4, 'add', 'link', (1, 1))
+        ])
+        self.assertEqual(changes[1]['after']['quantity'], 3)
+        self.assertEqual([c['seq'] for c in self.feed.read(1, limit=2)[0]], [2, 3])
+        self.assertEqual(self.feed.read(4), ([], False))
+
+        # Once the ring wraps, consumers behind it must resync
+        self.inventory.remove_product(1)
+        self.assertEqual(self.feed.first_seq, 2)
+        self.assertEqual(len(self.feed), 4)
+        self.assertEqual(self.feed.read(0), ([], True))
+        self.assertEqual([c['seq'] for c in self.feed.read(1)[0]], [2, 3, 4, 5])
+        # So must consumers ahead of it, e.g. after a restart
+        self.assertEqual(self.feed.read(9), ([], True))
+
+    def test_read_waits_for_a_change(self):
+        self.assertEqual(self.feed.read(0, timeout=0.01), ([], False))
+        timer = threading.Timer(0.05, self.inventory.add_product, [Product(1, "Widget", "Late", 1.0, 1)])
+        timer.start()
+        start = time.monotonic()
+        changes, _ = self.feed.read(0, timeout=5)
+        timer.join()
+        self.assertEqual([c['key'] for c in changes], [1])
+        self.assertLess(time.monotonic() - start, 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import sys
+import os
+import json
+import unittest
+
+# Add the path to the scripts folder
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from scripts.inventory_man import Product, Inventory
+from scripts.columnar import ColumnarProductStore
+
+class TestColumnarInventory(unittest.TestCase):
+
+    def setUp(self):
+        self.inventory = Inventory(product_store=ColumnarProductStore(capacity=2))
+        self.inventory.add_product(Product(1, "Widget", "A simple widget", 10.0, 100))
+        self.inventory.add_product(Product(2, "Gadget", "An advanced gadget", 20.0, 5))
+        self.inventory.add_product(Product(3, "Gizmo", "A tiny gizmo", 2.5, 0))
+
+    def test_products_are_built_on_demand(self):
+        product = self.inventory.get_product(2)
+        self.assertEqual(repr(product), "Product(ID=2, Name=Gadget, Description=An advanced gadget, Price=20.0, Quantity=5)")
+        self.assertIsNone(self.inventory.get_product(4))
+
+        # Updates are written back to the columns
+        self.assertTrue(self.inventory.update_product(2, name="Gadget Pro", quantity=7))
+        self.assertEqual(self.inventory.get_product(2).name, "Gadget Pro")
+        self.assertEqual(self.inventory.get_product(2).quantity, 7)
+
+        with self.assertRaises(ValueError):
+            self.inventory.add_product(Product(1, "Duplicate", "Same ID", 1.0, 1))
+
+    def test_vectorized_bulk_operations(self):
+        self.inventory.increase_price(10)
+        self.assertAlmostEqual(self.inventory.get_product(1).price, 11.0)
+        self.assertAlmostEqual(self.inventory.stock_value(), 11.0 * 100 + 22.0 * 5)
+        self.assertEqual(self.inventory.low_stock(10), [2, 3])
+
+        self.assertEqual(self.inventory.adjust_quantities({1: -40, 3: 12, 99: 1}), 2)
+        self.assertEqual(self.inventory.get_product(1).quantity, 60)
+        self.assertEqual(self.inventory.low_stock(10), [2])
+
+    def test_query_pages_by_plain_values(self):
+        # The next entry becomes a JSON page cursor, so it holds Python
+        # scalars rather than NumPy ones
+        for sort in ('product_id', 'price', 'quantity', 'name'):
+            page = self.inventory.query_products(sort=sort, limit=1)
+            self.assertEqual(json.loads(json.dumps(page['next'])), list(page['next']))
+            self.assertIs(type(page['next'][1]), int)
+
+    def test_remove_keeps_insertion_order(self):
+        store = self.inventory.products
+        for i in range(4, 3000):
+            self.inventory.add_product(Product(i, f"Item {i}", "Filler", 1.0, 1))
+        for i in range(3, 3000, 2):
+            self.assertTrue(self.inventory.remove_product(i))
+        self.assertFalse(self.inventory.remove_product(3))
+
+        ids = [p.product_id for p in store]
+        self.assertEqual(ids, [1, 2] + list(range(4, 3000, 2)))
+        self.assertEqual(list(store.keys()), ids)
+        self.assertEqual(store[2].product_id, 4)
+        self.assertEqual(len(self.inventory.get_all_products()), len(ids))
+        self.assertEqual(self.inventory.get_product(2998).name, "Item 2998")
+        self.assertAlmostEqual(self.inventory.stock_value(), 10.0 * 100 + 20.0 * 5 + len(ids) - 2)
+
+    def test_load_from_csv(self):
+        self.inventory.save_to_csv('test_columnar_products.csv', 'test_columnar_suppliers.csv')
+        try:
+            loaded = Inventory(product_store=ColumnarProductStore())
+            report = loaded.load_from_csv('test_columnar_products.csv', 'test_columnar_suppliers.csv', chunksize=2)
+        finally:
+            os.remove('test_columnar_products.csv')
+            os.remove('test_columnar_suppliers.csv')
+
+        self.assertEqual(report['products'], 3)
+        self.assertEqual(loaded.get_all_products(), self.inventory.get_all_products())
+        self.assertAlmostEqual(loaded.stock_value(), self.inventory.stock_value())
+
+        with self.assertRaises(ValueError):
+            loaded.products.extend_columns([4, 1], ["A", "B"], ["", ""], [1.0, 1.0], [1, 1])
+        self.assertEqual(len(loaded.products), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
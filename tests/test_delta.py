@@ -0,0 +1,180 @@
+import sys
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+# Add the path to the scripts folder
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from scripts.inventory_man import Product, Supplier, Inventory
+from scripts.columnar import ColumnarProductStore
+from scripts.delta import delta_path, merge_csv_delta, write_atomic
+
+class TestDeltaSaves(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.product_file = os.path.join(self.directory, 'products.csv')
+        self.supplier_file = os.path.join(self.directory, 'suppliers.csv')
+        self.inventory = Inventory()
+        self.inventory.add_products([Product(i, f"Item {i}", "An item", 1.0, 10) for i in range(1, 101)])
+        self.inventory.add_supplier(Supplier(1, "SupplierCo", "supplier@example.com"))
+        self.inventory.add_supplier(Supplier(2, "OtherCo", "other@example.com"))
+        self.inventory.add_link(1, 1)
+        self.inventory.add_link(2, 1)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def save(self, incremental=True):
+        return self.inventory.save_to_csv(self.product_file, self.supplier_file, incremental=incremental)
+
+    def assertLoadsBack(self):
+        for store in (None, ColumnarProductStore()):
+            loaded = Inventory(product_store=store)
+            loaded.load_from_csv(self.product_file, self.supplier_file)
+            self.assertEqual([p.to_dict() for p in loaded.products], [p.to_dict() for p in self.inventory.products])
+            self.assertEqual(loaded.get_all_suppliers(), self.inventory.get_all_suppliers())
+            self.assertEqual(loaded.links.columns(), self.inventory.links.columns())
+
+    def test_incremental_save_writes_only_changes(self):
+        self.assertEqual(self.save()['mode'], 'full')
+        self.assertFalse(os.path.exists(delta_path(self.product_file)))
+        base = open(self.product_file).read()
+
+        self.inventory.update_product(3, name="Renamed")
+        self.inventory.reserve(4, 5)
+        self.inventory.remove_product(1)
+        self.inventory.add_product(Product(200, "New", "Added later", 2.0, 1))
+        self.inventory.add_product(Product(150, "Newer", "Added last", 3.0, 1))
+        self.inventory.update_supplier(2, contact_info="sales@example.com")
+        report = self.save()
+        self.assertEqual((report['mode'], report['products'], report['suppliers']), ('delta', 5, 2))
+        self.assertEqual(open(self.product_file).read(), base)
+        self.assertLoadsBack()
+
+        # Deltas are cumulative and carry on from a load
+        loaded = Inventory()
+        loaded.load_from_csv(self.product_file, self.supplier_file)
+        loaded.remove_link(2, 1)
+        self.assertEqual(loaded.save_to_csv(self.product_file, self.supplier_file, incremental=True)['mode'], 'delta')
+        self.inventory = loaded
+        self.assertLoadsBack()
+
+    def test_large_changes_are_merged(self):
+        self.save()
+        self.inventory.update_product(3, name="Renamed")
+        self.save()
+        self.inventory.increase_price(10)
+        self.assertEqual(self.save()['mode'], 'full')
+        self.assertFalse(os.path.exists(delta_path(self.product_file)))
+        self.assertLoadsBack()
+
+        self.inventory.update_products([{'product_id': i, 'quantity': 0} for i in range(1, 50)])
+        self.assertEqual(self.save()['mode'], 'full')
+        # Saving elsewhere rewrites the files in full too
+        self.inventory.update_product(3, name="Again")
+        other = os.path.join(self.directory, 'other.csv')
+        self.assertEqual(self.inventory.save_to_csv(other, self.supplier_file, incremental=True)['mode'], 'full')
+
+    def test_merge_step_and_stale_deltas(self):
+        self.save()
+        self.inventory.update_product(3, name="Renamed")
+        self.save()
+        merge_csv_delta(self.product_file, self.supplier_file)
+        self.assertFalse(os.path.exists(delta_path(self.product_file)))
+        self.assertIn("Renamed", open(self.product_file).read())
+        self.assertLoadsBack()
+
+        # A delta left behind by a crash after its base was rewritten is
+        # ignored rather than applied over newer records
+        self.inventory.update_product(3, name="Old")
+        self.save()
+        stale = open(delta_path(self.product_file)).read()
+        self.inventory.update_product(3, name="New")
+        self.save(incremental=False)
+        with open(delta_path(self.product_file), 'w') as f:
+            f.write(stale)
+        self.assertLoadsBack()
+
+    def test_atomic_write_keeps_the_old_file(self):
+        self.save()
+        before = open(self.product_file).read()
+
+        def fail(f):
+            f.write("ID,Name\n1,Trunc")
+            raise OSError("disk full")
+
+        with self.assertRaises(OSError):
+            write_atomic(self.product_file, fail)
+        self.assertEqual(open(self.product_file).read(), before)
+        self.assertEqual(sorted(os.listdir(self.directory)), ['products.csv', 'suppliers.csv'])
+
+    def test_failed_full_save_keeps_changes(self):
+        self.save()
+        self.inventory.update_product(3, name="Renamed")
+        self.inventory.update_supplier(2, contact_info="sales@example.com")
+        self.save()
+        self.inventory.update_product(4, name="Pending")
+
+        # The products are rewritten but the suppliers cannot be
+        def write(path, *args, **kwargs):
+            if path == self.supplier_file:
+                raise OSError("disk full")
+            return write_atomic(path, *args, **kwargs)
+
+        with mock.patch('scripts.inventory_man.write_atomic', write), self.assertRaises(OSError):
+            self.save(incremental=False)
+        report = self.save()
+        self.assertEqual((report['mode'], report['products'], report['suppliers']), ('delta', 2, 1))
+        self.assertLoadsBack()
+
+    def test_concurrent_saves_take_turns(self):
+        self.inventory = Inventory(thread_safe=True)
+        self.inventory.add_products([Product(i, f"Item {i}", "An item", 1.0, 10) for i in range(1, 101)])
+        self.inventory.add_supplier(Supplier(1, "SupplierCo", "supplier@example.com"))
+        self.save()
+        self.inventory.update_product(3, name="Pending")
+
+        writes = []
+        blocked = threading.Event()
+        release = threading.Event()
+
+        def write(path, *args, **kwargs):
+            writes.append(threading.current_thread().name)
+            if threading.current_thread().name == 'first':
+                blocked.set()
+                release.wait(10)
+                raise OSError("disk full")
+            return write_atomic(path, *args, **kwargs)
+
+        def save():
+            try:
+                self.save(incremental=False)
+            except OSError:
+                pass
+
+        with mock.patch('scripts.inventory_man.write_atomic', write):
+            first = threading.Thread(target=save, name='first')
+            first.start()
+            self.assertTrue(blocked.wait(10))
+            second = threading.Thread(target=save, name='second')
+            second.start()
+            # The second save waits for the first to finish
+            second.join(0.2)
+            self.assertEqual(writes, ['first'])
+            release.set()
+            first.join()
+            second.join()
+        self.assertEqual(writes, ['first', 'second', 'second'])
+        self.inventory.update_product(4, name="Later")
+        report = self.save()
+        self.assertEqual((report['mode'], report['products']), ('delta', 1))
+        self.assertLoadsBack()
+
+
+if __name__ == "__main__":
+    unittest.main()
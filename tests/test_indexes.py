@@ -0,0 +1,82 @@
+import sys
+import os
+import random
+import unittest
+
+# Add the path to the scripts folder
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from scripts.inventory_man import Product, Inventory
+from scripts.columnar import ColumnarProductStore
+
+NAMES = ["Widget", "Gadget", "Gizmo", "widget mini", "Sprocket", "Gear"]
+
+class TestProductIndex(unittest.TestCase):
+
+    def build(self, product_store=None):
+        rng = random.Random(7)
+        inventory = Inventory(product_store=product_store)
+        for i in range(300):
+            inventory.add_product(Product(i, f"{rng.choice(NAMES)} {i}", "Indexed", float(rng.randint(1, 50)), rng.randint(0, 20)))
+        return inventory, rng
+
+    def expected(self, inventory, sort, descending, **filters):
+        products = [p for p in inventory.products
+                    if p.price >= filters.get('min_price', float('-inf'))
+                    and p.price <= filters.get('max_price', float('inf'))
+                    and p.quantity < filters.get('quantity_below', float('inf'))
+                    and p.name.lower().startswith(filters.get('name_prefix', '').lower())]
+        key = (lambda p: (p.name.lower(), p.product_id)) if sort == 'name' else (lambda p: (getattr(p, sort), p.product_id))
+        return [p.product_id for p in sorted(products, key=key, reverse=descending)]
+
+    def paginate(self, inventory, limit, **query):
+        ids = []
+        after = None
+        while True:
+            page = inventory.query_products(limit=limit, after=after, **query)
+            ids.extend(p.product_id for p in page['products'])
+            after = page['next']
+            if after is None:
+                return ids
+
+    def check_queries(self, inventory):
+        queries = [
+            {},
+            {'min_price': 10, 'max_price': 20},
+            {'quantity_below': 3},
+            {'name_prefix': 'wid'},
+            {'name_prefix': 'g', 'max_price': 5},
+            {'min_price': 45, 'quantity_below': 10},
+        ]
+        for filters in queries:
+            for sort in ('product_id', 'price', 'quantity', 'name'):
+                for descending in (False, True):
+                    expected = self.expected(inventory, sort, descending, **filters)
+                    self.assertEqual(self.paginate(inventory, 7, sort=sort, descending=descending, **filters), expected)
+                    page = inventory.query_products(sort=sort, descending=descending, offset=5, limit=10, **filters)
+                    self.assertEqual([p.product_id for p in page['products']], expected[5:15])
+
+    def test_queries_follow_mutations(self):
+        for store in (None, ColumnarProductStore()):
+            inventory, rng = self.build(store)
+            self.check_queries(inventory)
+
+            for i in range(0, 300, 3):
+                inventory.remove_product(i)
+            for i in range(1, 300, 3):
+                inventory.update_product(i, name=f"{rng.choice(NAMES)} renamed", price=float(rng.randint(1, 50)))
+            inventory.adjust_quantities({i: 5 for i in range(2, 300, 9)})
+            inventory.increase_price(10)
+            inventory.add_products([Product(1000 + i, f"Gear {i}", "Late", 15.5, i) for i in range(20)])
+            self.check_queries(inventory)
+
+    def test_invalid_queries(self):
+        inventory, _ = self.build()
+        with self.assertRaises(ValueError):
+            inventory.query_products(sort='description')
+        with self.assertRaises(ValueError):
+            inventory.query_products(limit=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
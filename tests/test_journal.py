@@ -0,0 +1,138 @@
+import sys
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from unittest import mock
+
+# Add the path to the scripts folder
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from scripts.inventory_man import Product, Supplier, Inventory
+from scripts.columnar import ColumnarProductStore
+from scripts.journal import Journal
+
+class TestJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def open_inventory(self, product_store=None, **options):
+        inventory = Inventory(product_store=product_store)
+        journal = Journal(self.directory, **options)
+        replayed = inventory.attach_journal(journal)
+        self.addCleanup(journal.close)
+        return inventory, replayed
+
+    def mutate(self, inventory):
+        inventory.add_product(Product(1, "Widget", "A simple widget", 10.0, 100))
+        inventory.add_product(Product(2, "Gadget", "An advanced gadget", 20.0, 50))
+        inventory.add_product(Product(3, "Gizmo", "A tiny gizmo", 5.0, 5))
+        inventory.update_product(2, name="Gadget Pro", quantity=40)
+        inventory.remove_product(3)
+        inventory.increase_price(10)
+        inventory.adjust_quantities({1: -10, 2: 5})
+        inventory.add_supplier(Supplier(1, "SupplierCo", "supplier@example.com"))
+        inventory.add_supplier(Supplier(2, "PartsCo", "parts@example.com"))
+        inventory.update_supplier(1, contact_info="sales@supplier.com")
+        inventory.remove_supplier(2)
+        inventory.add_products([Product(5, "Sprocket", "Added in bulk", 3.0, 3), Product(1, "Clash", "Same ID", 1.0, 1)])
+        inventory.update_products([{'product_id': 5, 'price': 4.0}])
+
+    def test_recover_from_log(self):
+        inventory, replayed = self.open_inventory(sync_every=1000)
+        self.assertEqual(replayed, 0)
+        self.mutate(inventory)
+        # Failed mutations are not logged
+        self.assertFalse(inventory.remove_product(42))
+        with self.assertRaises(ValueError):
+            inventory.add_product(Product(1, "Duplicate", "Same ID", 1.0, 1))
+        inventory.journal.close()
+
+        recovered, replayed = self.open_inventory()
+        self.assertEqual(replayed, 13)
+        self.assertEqual(recovered.get_all_products(), inventory.get_all_products())
+        self.assertEqual(recovered.get_all_suppliers(), inventory.get_all_suppliers())
+
+    def test_recover_from_snapshot_and_log_tail(self):
+        inventory, _ = self.open_inventory(product_store=ColumnarProductStore())
+        self.mutate(inventory)
+        inventory.journal.compact()
+        inventory.add_product(Product(4, "Doohickey", "Added after compaction", 1.0, 1))
+        inventory.increase_price(50)
+        inventory.journal.close()
+
+        segments = [name for name in os.listdir(self.directory) if name.endswith('.log')]
+        self.assertEqual(len(segments), 1)
+
+        recovered, replayed = self.open_inventory(product_store=ColumnarProductStore())
+        self.assertEqual(replayed, 2)
+        self.assertEqual(recovered.get_all_products(), inventory.get_all_products())
+        self.assertEqual(recovered.get_all_suppliers(), inventory.get_all_suppliers())
+
+    def test_directory_is_attached_once(self):
+        inventory, _ = self.open_inventory()
+        self.mutate(inventory)
+        with self.assertRaises(RuntimeError):
+            Inventory().attach_journal(Journal(self.directory))
+        inventory.journal.close()
+        self.assertEqual(self.open_inventory()[1], 13)
+
+        # Nor does the app replay one journal into a database its workers share
+        root = os.path.join(os.path.dirname(__file__), "..")
+        env = dict(os.environ, INVENTORY_JOURNAL=self.directory, PYTHONPATH=os.path.abspath(root),
+                   INVENTORY_DB=os.path.join(self.directory, 'inventory.db'))
+        result = subprocess.run([sys.executable, '-c', 'import scripts.app'], env=env, capture_output=True,
+                                text=True, timeout=120)
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn("INVENTORY_JOURNAL cannot be used with INVENTORY_DB", result.stderr)
+
+    def test_compaction_deletes_the_log_once_synced(self):
+        inventory, _ = self.open_inventory()
+        self.mutate(inventory)
+        events = []
+        fsync, remove = os.fsync, os.remove
+
+        def record_fsync(fd):
+            events.append(('fsync', os.fstat(fd).st_ino))
+            fsync(fd)
+
+        def record_remove(path):
+            events.append(('remove', path))
+            remove(path)
+
+        # A snapshot that fails to be written leaves the log in place
+        with mock.patch('scripts.journal.write_snapshot', side_effect=OSError("disk full")), \
+                mock.patch('os.remove', record_remove), self.assertRaises(OSError):
+            inventory.journal.compact()
+        self.assertEqual(events, [])
+
+        with mock.patch('os.fsync', record_fsync), mock.patch('os.remove', record_remove):
+            inventory.journal.compact()
+        removed = [i for i, (kind, _) in enumerate(events) if kind == 'remove']
+        self.assertEqual(len(removed), 2)
+        self.assertIn(('fsync', os.stat(self.directory).st_ino), events[:removed[0]])
+        self.assertIn(('fsync', os.stat(inventory.journal.snapshot_path).st_ino), events[:removed[0]])
+
+    def test_background_compaction_and_torn_record(self):
+        inventory, _ = self.open_inventory(compact_after=25)
+        for i in range(100):
+            inventory.add_product(Product(i, f"Item {i}", "Filler", 1.0, i))
+        inventory.journal.close()
+
+        # Simulate a crash in the middle of writing a record
+        segments = sorted(name for name in os.listdir(self.directory) if name.endswith('.log'))
+        with open(os.path.join(self.directory, segments[-1]), 'ab') as f:
+            f.write(b'[101,"remove_product",[5')
+
+        recovered, _ = self.open_inventory()
+        self.assertEqual(len(recovered.products), 100)
+        self.assertEqual(recovered.get_product(99).name, "Item 99")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+
+# Add the path to the scripts folder
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from scripts.inventory_man import InsufficientStock, Product, Supplier, Inventory
+from scripts.lazy import LazyProductStore
+
+class TestLazyProductStore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.product_file = os.path.join(self.directory, 'products.csv')
+        self.supplier_file = os.path.join(self.directory, 'suppliers.csv')
+        self.snapshot = os.path.join(self.directory, 'inventory.snap')
+        self.inventory = Inventory()
+        # Quoted descriptions that span several lines, and prices that only
+        # round-trip through their exact repr
+        self.inventory.add_products([
+            Product(i, f"Item {i}", f'A "quoted",\nmulti-line item' if i % 4 == 0 else "Plain", i / 3, i % 7)
+            for i in range(50, 0, -1)
+        ])
+        self.inventory.add_supplier(Supplier(1, "SupplierCo", "supplier@example.com"))
+        self.inventory.add_link(8, 1)
+        self.inventory.save_to_csv(self.product_file, self.supplier_file)
+        self.inventory.save_snapshot(self.snapshot)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def check_same(self, lazy, plain):
+        self.assertEqual([p.to_dict() for p in lazy.products], [p.to_dict() for p in plain.products])
+
+    def test_faults_in_on_demand(self):
+        for load in ('csv', 'snapshot'):
+            store = LazyProductStore(cache_size=5)
+            lazy = Inventory(product_store=store)
+            if load == 'csv':
+                lazy.load_from_csv(self.product_file, self.supplier_file)
+            else:
+                lazy.load_snapshot(self.snapshot)
+            # Nothing is read until looked up
+            self.assertEqual((len(store), store.cached), (50, 0))
+            self.assertEqual(lazy.get_product(8).to_dict(), self.inventory.get_product(8).to_dict())
+            self.assertEqual(store.cached, 1)
+            self.assertIsNone(lazy.get_product(99))
+            self.assertIn(12, store)
+            self.assertNotIn(99, store)
+            self.assertEqual(lazy.get_supplier_products(1), [8])
+            for product_id in range(1, 51):
+                lazy.get_product(product_id)
+            self.assertEqual(store.cached, 5)
+            self.check_same(lazy, self.inventory)
+            self.assertEqual(store.cached, 5)
+            self.assertEqual(lazy.stock_value(), self.inventory.stock_value())
+
+    def test_dirty_write_back(self):
+        plain = self.inventory
+        lazy = Inventory(product_store=LazyProductStore(cache_size=3), thread_safe=True)
+        lazy.load_from_csv(self.product_file, self.supplier_file)
+        for inventory in (plain, lazy):
+            # More changed products than the cache holds, across price increases
+            for product_id in range(1, 21):
+                inventory.update_product(product_id, name=f"Changed {product_id}", quantity=product_id)
+                if product_id % 6 == 0:
+                    inventory.increase_price(7.5)
+            inventory.remove_product(30)
+            inventory.add_product(Product(30, "Back again", "Re-added", 1.25, 4))
+            inventory.add_product(Product(70, "New", "Added", 2.5, 1))
+            inventory.reserve(31, 3)
+            inventory.adjust_quantities({32: 5, 33: -1})
+            inventory.increase_price(-3)
+            with self.assertRaises(InsufficientStock):
+                inventory.reserve(35, 100)
+        self.assertEqual(lazy.get_product(5).to_dict(), plain.get_product(5).to_dict())
+        self.assertEqual(sorted(lazy.products.keys()), sorted(plain.products.keys()))
+        self.assertEqual(sorted((p.to_dict() for p in lazy.products), key=lambda d: d['product_id']),
+                         sorted((p.to_dict() for p in plain.products), key=lambda d: d['product_id']))
+        self.assertEqual(lazy.stats(verify=True)['low_stock'], plain.stats()['low_stock'])
+        with self.assertRaises(ValueError):
+            lazy.add_product(Product(70, "Taken", "", 1.0, 1))
+
+        # Saving writes the merged catalogue, even over the opened file
+        lazy.save_to_csv(self.product_file, self.supplier_file)
+        reloaded = Inventory(product_store=LazyProductStore())
+        reloaded.load_from_csv(self.product_file, self.supplier_file)
+        self.check_same(reloaded, lazy)
+        lazy.save_snapshot(self.snapshot)
+        lazy.load_snapshot(self.snapshot)
+        self.check_same(lazy, reloaded)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+
+# Add the path to the scripts folder
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from scripts.inventory_man import Product, Supplier, Inventory
+from scripts.columnar import ColumnarProductStore
+from scripts.journal import Journal
+
+class TestProductSupplierLinks(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.inventory = Inventory()
+        for i in range(1, 6):
+            self.inventory.add_product(Product(i, f"Item {i}", "Linked", 1.0, 1))
+        for i in range(1, 4):
+            self.inventory.add_supplier(Supplier(i, f"Supplier {i}", f"s{i}@example.com"))
+        for product_id, supplier_id in [(5, 1), (1, 1), (3, 1), (1, 2), (2, 2)]:
+            self.assertTrue(self.inventory.add_link(product_id, supplier_id))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def assertLinksEqual(self, inventory, expected):
+        self.assertEqual(inventory.links.columns(), expected.links.columns())
+        for supplier_id in (1, 2, 3):
+            self.assertEqual(inventory.get_supplier_products(supplier_id), expected.get_supplier_products(supplier_id))
+
+    def test_lookups_and_paging(self):
+        inventory = self.inventory
+        self.assertEqual(inventory.get_supplier_products(1), [1, 3, 5])
+        self.assertEqual(inventory.get_supplier_products(1, after=1, limit=1), [3])
+        self.assertEqual(inventory.get_product_suppliers(1), [1, 2])
+        self.assertEqual(inventory.get_supplier_products(3), [])
+        self.assertIsNone(inventory.get_supplier_products(9))
+        self.assertEqual(inventory.get_supplier(1).supplied_products, [1, 3, 5])
+        # The stored supplier keeps no list of its own
+        self.assertIsNone(inventory.suppliers.get(1)._supplied_products)
+
+        # Linking again is idempotent; unknown records cannot be linked
+        self.assertTrue(inventory.add_link(1, 1))
+        self.assertFalse(inventory.add_link(9, 1))
+        self.assertFalse(inventory.add_link(1, 9))
+        self.assertEqual(len(inventory.links), 5)
+        self.assertTrue(inventory.remove_link(3, 1))
+        self.assertFalse(inventory.remove_link(3, 1))
+        self.assertEqual(inventory.get_supplier_products(1), [1, 5])
+
+    def test_removal_cascades(self):
+        inventory = self.inventory
+        inventory.remove_product(1)
+        self.assertEqual(inventory.get_supplier_products(1), [3, 5])
+        self.assertEqual(inventory.get_supplier_products(2), [2])
+        inventory.remove_supplier(2)
+        self.assertEqual(inventory.get_product_suppliers(2), [])
+        self.assertEqual(len(inventory.links), 2)
+        # A product re-added under a removed ID starts without links
+        inventory.add_product(Product(1, "Item 1", "Re-added", 1.0, 1))
+        self.assertEqual(inventory.get_product_suppliers(1), [])
+
+    def test_links_persist(self):
+        product_file = os.path.join(self.directory, 'products.csv')
+        supplier_file = os.path.join(self.directory, 'suppliers.csv')
+        self.inventory.save_to_csv(product_file, supplier_file)
+        path = os.path.join(self.directory, 'inventory.snap')
+        self.inventory.save_snapshot(path)
+
+        for store in (None, ColumnarProductStore()):
+            loaded = Inventory(product_store=store)
+            loaded.load_from_csv(product_file, supplier_file, chunksize=2)
+            self.assertLinksEqual(loaded, self.inventory)
+            loaded = Inventory(product_store=store)
+            loaded.load_snapshot(path)
+            self.assertLinksEqual(loaded, self.inventory)
+
+    def test_links_are_journaled(self):
+        inventory = Inventory()
+        journal = Journal(self.directory)
+        inventory.attach_journal(journal)
+        inventory.add_products([Product(i, f"Item {i}", "Linked", 1.0, 1) for i in range(1, 4)])
+        inventory.add_supplier(Supplier(1, "Supplier 1", "s1@example.com"))
+        inventory.add_link(1, 1)
+        inventory.add_link(2, 1)
+        inventory.remove_link(1, 1)
+        journal.compact()
+        inventory.add_link(3, 1)
+        inventory.remove_product(2)
+        journal.close()
+
+        recovered = Inventory()
+        journal = Journal(self.directory)
+        recovered.attach_journal(journal)
+        self.addCleanup(journal.close)
+        self.assertEqual(recovered.get_supplier_products(1), [3])
+
+
+if __name__ == "__main__":
+    unittest.main()
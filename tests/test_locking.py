@@ -0,0 +1,117 @@
+import sys
+import os
+import itertools
+import threading
+import time
+import unittest
+
+# Add the path to the scripts folder
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from scripts.inventory_man import InsufficientStock, Product, Inventory
+from scripts.columnar import ColumnarProductStore
+from scripts.locking import RWLock
+
+class TestRWLock(unittest.TestCase):
+
+    def test_readers_share_and_writers_exclude(self):
+        lock = RWLock()
+        inside = []
+        peak = []
+        barrier = threading.Barrier(3)
+
+        def reader():
+            with lock.read():
+                inside.append(1)
+                barrier.wait(timeout=5)
+                peak.append(len(inside))
+                time.sleep(0.01)
+                inside.pop()
+
+        threads = [threading.Thread(target=reader) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(peak, [3, 3, 3])
+
+        # The writer may re-enter and read; a reader cannot upgrade
+        with lock.write():
+            with lock.write(), lock.read():
+                pass
+        with lock.read():
+            with self.assertRaises(RuntimeError):
+                lock.acquire_write()
+
+class TestThreadSafeInventory(unittest.TestCase):
+
+    def test_concurrent_mutations(self):
+        for store in (None, ColumnarProductStore()):
+            inventory = Inventory(product_store=store, thread_safe=True)
+            inventory.add_products([Product(i, f"Item {i}", "Shared", 1.0, 0) for i in range(200)])
+            inventory.query_products(limit=1)
+            errors = []
+
+            def worker(n):
+                try:
+                    for i in range(200):
+                        product_id = (i * 7 + n) % 200
+                        # Concurrent read-modify-write of the same SKUs
+                        inventory.adjust_quantities({product_id: 1})
+                        inventory.get_product(product_id)
+                        inventory.add_product(Product(10000 + n * 1000 + i, "Temp", "Churn", 2.0, 1))
+                        inventory.remove_product(10000 + n * 1000 + i)
+                        inventory.update_product(product_id, description=f"Touched by {n}")
+                        if i % 50 == 0:
+                            inventory.increase_price(1)
+                            inventory.query_products(sort='price', limit=5)
+                            ''.join(inventory.iter_export(chunk_size=16))
+                except Exception as e:
+                    errors.append(e)
+
+            threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            self.assertEqual(errors, [])
+            self.assertEqual(len(inventory.products), 200)
+            self.assertEqual(sum(p.quantity for p in inventory.products), 8 * 200)
+            page = inventory.query_products(sort='quantity', limit=200)
+            self.assertEqual(len(page['products']), 200)
+
+
+    def test_hot_sku_reservations(self):
+        for store in (None, ColumnarProductStore()):
+            inventory = Inventory(product_store=store, thread_safe=True)
+            inventory.add_product(Product(1, "Hot Item", "Contended", 1.0, 1000))
+            reserved = []
+
+            def worker():
+                units = 0
+                for i in itertools.count():
+                    try:
+                        inventory.reserve(1, 3)
+                    except InsufficientStock:
+                        break
+                    units += 3
+                    # Hand some back now and then, racing the reservations
+                    if i % 10 == 0:
+                        inventory.release(1, 1)
+                        units -= 1
+                reserved.append(units)
+
+            threads = [threading.Thread(target=worker) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            quantity = inventory.get_product(1).quantity
+            self.assertTrue(0 <= quantity < 3)
+            self.assertEqual(sum(reserved) + quantity, 1000)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import sys
+import os
+import time
+import unittest
+
+# Add the path to the scripts folder
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from scripts.inventory_man import InsufficientStock, Product, Inventory
+from scripts.metrics import Metrics
+from scripts.profiler import SamplingProfiler
+
+class TestMetrics(unittest.TestCase):
+
+    def test_prometheus_rendering(self):
+        metrics = Metrics()
+        metrics.describe('requests_total', 'counter', "Requests.")
+        metrics.describe('latency_seconds', 'histogram', "Latency.")
+        metrics.gauge('items', "Items.", lambda: 3)
+        metrics.inc('requests_total', route='/a "quoted"')
+        metrics.inc('requests_total', 2, route='/a "quoted"')
+        for value in (0.0001, 0.003, 20):
+            metrics.observe('latency_seconds', value, route='/a')
+
+        lines = metrics.render().splitlines()
+        self.assertEqual(lines[:3], ['# HELP items Items.', '# TYPE items gauge', 'items 3'])
+        self.assertIn('# TYPE requests_total counter', lines)
+        self.assertIn('requests_total{route="/a \\"quoted\\""} 3', lines)
+        self.assertIn('latency_seconds_bucket{route="/a",le="0.0001"} 1', lines)
+        self.assertIn('latency_seconds_bucket{route="/a",le="0.005"} 2', lines)
+        self.assertIn('latency_seconds_bucket{route="/a",le="+Inf"} 3', lines)
+        self.assertIn('latency_seconds_count{route="/a"} 3', lines)
+
+    def test_inventory_instrumentation(self):
+        inventory = Inventory()
+        metrics = Metrics()
+        metrics.enable(inventory)
+        inventory.add_products([Product(1, "Widget", "A simple widget", 10.0, 1)])
+        inventory.get_product(1)
+        with self.assertRaises(InsufficientStock):
+            inventory.reserve(1, 2)
+        rendered = metrics.render()
+        self.assertIn('inventory_method_calls_total{method="add_products"} 1', rendered)
+        # Nested calls are counted too
+        self.assertIn('inventory_method_calls_total{method="add_product"} 1', rendered)
+        self.assertIn('inventory_method_errors_total{method="reserve"} 1', rendered)
+        self.assertIn('inventory_method_duration_seconds_count{method="get_product"} 1', rendered)
+
+        # Disabled, the inventory runs its own methods again
+        metrics.disable()
+        self.assertNotIn('get_product', vars(inventory))
+        inventory.get_product(1)
+        self.assertIn('inventory_method_calls_total{method="get_product"} 1', metrics.render())
+
+
+class TestSamplingProfiler(unittest.TestCase):
+
+    def test_keeps_the_slowest_requests(self):
+        profiler = SamplingProfiler(interval=0.001, keep=2)
+        profiler.begin("ignored")
+        profiler.start()
+        try:
+            for label, seconds in (("GET /fast", 0.01), ("GET /slow", 0.08), ("GET /medium", 0.04)):
+                profiler.begin(label)
+                deadline = time.perf_counter() + seconds
+                while time.perf_counter() < deadline:
+                    pass
+                profiler.end()
+        finally:
+            profiler.stop()
+
+        self.assertEqual([request['label'] for request in profiler.slowest()], ["GET /slow", "GET /medium"])
+        lines = profiler.collapsed().splitlines()
+        self.assertTrue(lines)
+        for line in lines:
+            stack, count = line.rsplit(' ', 1)
+            self.assertTrue(stack.startswith(("GET /slow;", "GET /medium;")))
+            self.assertIn('test_metrics.py:test_keeps_the_slowest_requests', stack)
+            self.assertGreater(int(count), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
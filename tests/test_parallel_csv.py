@@ -0,0 +1,77 @@
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+
+# Add the path to the scripts folder
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from scripts.inventory_man import Product, Supplier, Inventory
+from scripts.columnar import ColumnarProductStore
+from scripts.parallel_csv import all_record_ends, record_ends, split_records
+
+class TestParallelCSV(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.product_file = os.path.join(self.directory, 'products.csv')
+        self.supplier_file = os.path.join(self.directory, 'suppliers.csv')
+        self.inventory = Inventory()
+        # Descriptions with quotes, commas and newlines make quoted records
+        # that span several lines
+        self.inventory.add_products([
+            Product(i, f"Item {i}", f'A "quoted",\nmulti-line\nitem {i}' if i % 3 == 0 else "Plain", i * 1.5, i)
+            for i in range(1, 101)
+        ])
+        self.inventory.add_supplier(Supplier(1, "SupplierCo", "supplier@example.com"))
+        self.inventory.add_link(3, 1)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_split_at_record_boundaries(self):
+        self.inventory.save_to_csv(self.product_file, self.supplier_file)
+        data = open(self.product_file, 'rb').read()
+        # Record ends are the newlines outside quotes
+        boundaries = [i + 1 for i in range(len(data)) if data[i:i + 1] == b'\n' and data[:i].count(b'"') % 2 == 0]
+        offsets = list(range(0, len(data), 37))
+        for block_size in (5, 64, 1 << 20):
+            expected = [min((b for b in boundaries if b > offset), default=len(data)) for offset in offsets]
+            self.assertEqual(record_ends(self.product_file, offsets, block_size), expected)
+            with open(self.product_file, 'rb') as f:
+                self.assertEqual(all_record_ends(f, block_size).tolist(), boundaries)
+
+            header, ranges = split_records(self.product_file, 7, block_size)
+            self.assertEqual(header, data[:boundaries[0]])
+            self.assertEqual(b''.join(data[start:end] for start, end in ranges), data[len(header):])
+            self.assertTrue(all(end in boundaries for _, end in ranges))
+            self.assertEqual(len(ranges), 7)
+
+    def test_parallel_save_and_load(self):
+        self.inventory.save_to_csv(self.product_file, self.supplier_file)
+        single = open(self.product_file, 'rb').read()
+        report = self.inventory.save_to_csv(self.product_file, self.supplier_file, workers=3)
+        self.assertEqual(report['products'], 100)
+        self.assertEqual(open(self.product_file, 'rb').read(), single)
+
+        for store in (None, ColumnarProductStore()):
+            loaded = Inventory(product_store=store)
+            report = loaded.load_from_csv(self.product_file, self.supplier_file, workers=3)
+            self.assertEqual(report['products'], 100)
+            self.assertEqual([p.to_dict() for p in loaded.products], [p.to_dict() for p in self.inventory.products])
+            self.assertEqual(loaded.get_supplier_products(1), [3])
+
+        # More workers than records, and an empty catalogue
+        loaded = Inventory()
+        loaded.load_from_csv(self.product_file, self.supplier_file, workers=500)
+        self.assertEqual(len(loaded.products), 100)
+        Inventory().save_to_csv(self.product_file, self.supplier_file, workers=3)
+        self.assertEqual(Inventory().load_from_csv(self.product_file, self.supplier_file, workers=3)['products'], 0)
+
+        with self.assertRaises(ValueError):
+            Inventory().load_from_csv(self.product_file, self.supplier_file, chunksize=10, workers=2)
+
+
+if __name__ == "__main__":
+    unittest.main()
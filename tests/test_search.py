@@ -0,0 +1,82 @@
+import sys
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+# Add the path to the scripts folder
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from scripts.inventory_man import Product, Inventory
+from scripts.columnar import ColumnarProductStore
+from scripts.search import tokenize
+
+WORDS = ["steel", "stainless", "bolt", "bracket", "hinge", "copper", "wire", "washer", "nut", "screw", "Schraube"]
+
+class TestSearchIndex(unittest.TestCase):
+
+    def expected(self, inventory, query):
+        tokens = list(dict.fromkeys(tokenize(query)))
+        matches = []
+        for product in inventory.products:
+            words = set(tokenize(product.name)) | set(tokenize(product.description))
+            if all(token in words for token in tokens[:-1]) and any(word.startswith(tokens[-1]) for word in words):
+                matches.append(product.product_id)
+        return sorted(matches)
+
+    def test_ranking_and_prefixes(self):
+        inventory = Inventory()
+        inventory.add_product(Product(1, "Steel bolt", "A bolt", 1.0, 1))
+        inventory.add_product(Product(2, "Bracket", "Holds a steel bolt in place", 1.0, 1))
+        inventory.add_product(Product(3, "Steel bracket", "Stainless", 1.0, 1))
+        inventory.add_product(Product(4, "Copper wire", "", 1.0, 1))
+
+        result = inventory.search_products("steel bolt")
+        # Name matches rank above description matches
+        self.assertEqual([p.product_id for p in result['products']], [1, 2])
+        self.assertEqual(result['total'], 2)
+        self.assertGreater(result['scores'][0], result['scores'][1])
+        self.assertEqual([p.product_id for p in inventory.search_products("ST")['products']], [1, 3, 2])
+        self.assertEqual([p.product_id for p in inventory.search_products("steel brack", limit=1, offset=1)['products']], [2])
+        self.assertEqual(inventory.search_products("bolts")['total'], 0)
+        self.assertEqual(inventory.search_products("  ")['products'], [])
+
+    def test_incremental_updates_match_a_scan(self):
+        for store in (None, ColumnarProductStore()):
+            rng = random.Random(3)
+            inventory = Inventory(product_store=store, thread_safe=True)
+            for i in range(300):
+                inventory.add_product(Product(i, " ".join(rng.sample(WORDS, 2)), " ".join(rng.sample(WORDS, 3)), 1.0, 1))
+            inventory.search_products("steel")
+            # Enough changes to merge the delta into the base at least once
+            for i in range(2500):
+                product_id = rng.randrange(400)
+                action = rng.random()
+                if action < 0.5:
+                    inventory.update_product(product_id, name=" ".join(rng.sample(WORDS, 2)))
+                elif action < 0.7:
+                    inventory.update_product(product_id, description=f"{rng.choice(WORDS)} part {i}")
+                elif action < 0.85:
+                    inventory.remove_product(product_id)
+                elif product_id not in inventory.products:
+                    inventory.add_product(Product(product_id, rng.choice(WORDS), "Re-added", 1.0, 1))
+                if i % 500 == 0:
+                    inventory.increase_price(1)
+            for query in ("steel", "st", "bolt wa", "copper wire", "schraube", "part 12", "s"):
+                found = inventory.search_products(query, limit=1000)
+                self.assertEqual(sorted(p.product_id for p in found['products']), self.expected(inventory, query))
+                self.assertEqual(found['total'], len(found['products']))
+
+            # A reload rebuilds the index
+            directory = tempfile.mkdtemp()
+            self.addCleanup(shutil.rmtree, directory)
+            inventory.save_snapshot(os.path.join(directory, 'inventory.snap'))
+            inventory.remove_product(next(iter(inventory.products.keys())))
+            inventory.load_snapshot(os.path.join(directory, 'inventory.snap'))
+            self.assertEqual(sorted(p.product_id for p in inventory.search_products("bolt", limit=1000)['products']),
+                             self.expected(inventory, "bolt"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import sys
+import os
+import gzip
+import json
+import unittest
+
+# Add the path to the scripts folder
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from scripts.inventory_man import Product, Supplier, Inventory
+from scripts.serialize import ENCODERS, EncodedProducts, compress, encode_list, get_encoder
+
+class TestEncodedProducts(unittest.TestCase):
+
+    def setUp(self):
+        self.inventory = Inventory()
+        self.encoded = EncodedProducts(get_encoder('json'), maxsize=3)
+        self.inventory.add_listener(self.encoded)
+        for i in range(4):
+            self.inventory.add_product(Product(i, f"Item {i}", "Encoded", 1.0, 1))
+
+    def encode(self, *ids):
+        generation = self.encoded.generation
+        return self.encoded.encode([self.inventory.get_product(i) for i in ids], generation)
+
+    def test_bytes_are_reused_until_the_product_changes(self):
+        first = self.encode(0, 1)
+        self.assertEqual([json.loads(body) for body in first],
+                         [self.inventory.get_product(i).to_dict() for i in (0, 1)])
+        self.assertIs(self.encode(0)[0], first[0])
+
+        self.inventory.update_product(0, quantity=5)
+        self.assertEqual(json.loads(self.encode(0)[0])['quantity'], 5)
+        self.assertIs(self.encode(1)[0], first[1])
+        self.inventory.increase_price(10)
+        self.assertEqual(len(self.encoded), 0)
+        self.assertEqual(json.loads(self.encode(1)[0])['price'], 1.1)
+
+        # Bytes encoded before an invalidation are not stored
+        generation = self.encoded.generation
+        product = self.inventory.get_product(2)
+        self.inventory.update_product(2, name="Renamed")
+        self.encoded.encode([product], generation)
+        self.assertEqual(json.loads(self.encode(2)[0])['name'], "Renamed")
+
+        # The oldest entries are dropped first
+        self.encode(0, 1, 2, 3)
+        self.assertEqual(list(self.encoded._entries), [2, 0, 3])
+
+    def test_encoders_and_compression(self):
+        value = {'products': [Product(1, "Café", "Ünïcode", 2.5, 3).to_dict()], 'next_cursor': None,
+                 'suppliers': [Supplier(1, "SupplierCo", "supplier@example.com").to_dict()]}
+        for name in ENCODERS:
+            self.assertEqual(json.loads(get_encoder(name)(value)), value)
+        self.assertEqual(json.loads(encode_list([get_encoder()(1), get_encoder()('a')])), [1, 'a'])
+        with self.assertRaises(ValueError):
+            get_encoder('pickle')
+
+        body = get_encoder()(value) * 100
+        self.assertEqual(gzip.decompress(compress(body, 'gzip')), body)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,148 @@
+import sys
+import os
+import json
+import shutil
+import subprocess
+import tempfile
+import textwrap
+import unittest
+from unittest import mock
+
+# Add the path to the scripts folder
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from scripts.inventory_man import InsufficientStock, Product, ProductStore, Supplier, Inventory
+from scripts.columnar import ColumnarProductStore
+from scripts.sharded import ShardedProductStore
+
+class TestShardedProductStore(unittest.TestCase):
+
+    def fill(self, inventory):
+        inventory.add_products([Product(i, f"Item {i}", "An item", float(i), i % 12) for i in range(1, 31)])
+        inventory.add_supplier(Supplier(1, "SupplierCo", "supplier@example.com"))
+        inventory.add_link(4, 1)
+        inventory.add_link(5, 1)
+        return inventory
+
+    def test_matches_unsharded_inventory(self):
+        for store_factory in (ProductStore, ColumnarProductStore):
+            with ShardedProductStore(3, store_factory=store_factory) as store:
+                sharded = self.fill(Inventory(product_store=store, thread_safe=True))
+                plain = self.fill(Inventory())
+                for inventory in (sharded, plain):
+                    inventory.update_product(4, name="Renamed", price=2.5)
+                    inventory.remove_product(7)
+                    inventory.reserve(5, 3)
+                    inventory.adjust_quantities({1: 2, 2: 2, 3: 2})
+                    inventory.increase_price(10)
+                    with self.assertRaises(InsufficientStock) as raised:
+                        inventory.reserve(12, 1)
+                    self.assertEqual(raised.exception.quantity, 0)
+
+                self.assertEqual(len(sharded.products), 29)
+                self.assertEqual(sharded.get_product(4).to_dict(), plain.get_product(4).to_dict())
+                self.assertIsNone(sharded.get_product(7))
+                self.assertAlmostEqual(sharded.stock_value(), plain.stock_value())
+                self.assertEqual(sorted(sharded.low_stock(3)), sorted(plain.low_stock(3)))
+                self.assertEqual(sharded.stats(verify=True), sharded.stats())
+                self.assertEqual(sharded.stats()['low_stock'], plain.stats()['low_stock'])
+                self.assertEqual(sorted(sharded.query_products(quantity_below=2)),
+                                 sorted(plain.query_products(quantity_below=2)))
+                exported = [json.loads(line) for line in ''.join(sharded.iter_export(chunk_size=7)).splitlines()]
+                self.assertEqual(sorted(exported, key=lambda record: record['product_id']),
+                                 [p.to_dict() for p in plain.products])
+                # Products come shard by shard: IDs 3, 6, ... first
+                self.assertEqual(sharded.products.keys()[:3], [3, 6, 9])
+                self.assertEqual([p.product_id for p in sharded.products][:3], [3, 6, 9])
+
+                # Adding a batch is all or nothing across shards
+                with self.assertRaises(ValueError):
+                    sharded.products.extend([Product(100, "New", "", 1.0, 1), Product(4, "Taken", "", 1.0, 1)])
+                self.assertNotIn(100, sharded.products)
+
+    def test_range_partitions_and_csv(self):
+        directory = tempfile.mkdtemp()
+        try:
+            product_file = os.path.join(directory, 'products.csv')
+            supplier_file = os.path.join(directory, 'suppliers.csv')
+            self.fill(Inventory()).save_to_csv(product_file, supplier_file)
+
+            store = ShardedProductStore(boundaries=[10, 20], processes=False)
+            self.assertEqual((store.shards, store.shard_of(9), store.shard_of(10), store.shard_of(25)), (3, 0, 1, 2))
+            inventory = Inventory(product_store=store)
+            inventory.load_from_csv(product_file, supplier_file, workers=2)
+            # Range partitions keep ascending IDs in order
+            self.assertEqual(list(inventory.products.columns()['product_id']), list(range(1, 31)))
+            self.assertEqual(inventory.products[9].product_id, 10)
+            self.assertEqual(inventory.get_supplier_products(1), [4, 5])
+            inventory.save_to_csv(product_file, supplier_file, workers=2)
+            self.assertEqual(Inventory().load_from_csv(product_file, supplier_file)['products'], 30)
+        finally:
+            shutil.rmtree(directory)
+
+        with self.assertRaises(ValueError):
+            ShardedProductStore(2, boundaries=[10, 20])
+
+    def test_batched_lookups(self):
+        directory = tempfile.mkdtemp()
+        try:
+            product_file = os.path.join(directory, 'products.csv')
+            supplier_file = os.path.join(directory, 'suppliers.csv')
+            with ShardedProductStore(2) as store:
+                inventory = self.fill(Inventory(product_store=store, thread_safe=True))
+                inventory.save_to_csv(product_file, supplier_file)
+                inventory.update_product(3, name="Renamed item")
+                inventory.update_product(8, name="Renamed too")
+                # Searches and delta saves fetch their products shard by
+                # shard, not one round trip each
+                with mock.patch.object(store, 'get', side_effect=AssertionError("one product at a time")):
+                    self.assertEqual([p.product_id for p in inventory.search_products("renamed")['products']],
+                                     [3, 8])
+                    self.assertEqual(inventory.save_to_csv(product_file, supplier_file, incremental=True)['mode'],
+                                     'delta')
+            loaded = Inventory()
+            loaded.load_from_csv(product_file, supplier_file)
+            self.assertEqual(loaded.get_product(8).name, "Renamed too")
+        finally:
+            shutil.rmtree(directory)
+
+    def test_app_routes(self):
+        # The app module holds one inventory, so it runs in its own process
+        script = textwrap.dedent("""
+            import json
+            import scripts.app as app
+            client = app.app.test_client()
+            assert type(app.inventory.products).__name__ == 'ShardedProductStore'
+            for i in range(1, 5):
+                client.post('/products', json={'product_id': i, 'name': f'P{i}', 'description': 'x',
+                                               'price': 2.0, 'quantity': i})
+            client.post('/products/increase_price', json={'percentage': 50})
+            # Walk the products two at a time, by ID and by price
+            pages = []
+            for sort in ('product_id', 'price'):
+                ids = []
+                url = f'/products?sort={sort}&limit=2'
+                while url:
+                    response = client.get(url)
+                    assert response.status_code == 200, response.status_code
+                    page = response.get_json()
+                    ids.extend(product['product_id'] for product in page['products'])
+                    cursor = page['next_cursor']
+                    url = f'/products?sort={sort}&limit=2&cursor={cursor}' if cursor else None
+                pages.append(ids)
+            print(json.dumps([client.get('/products/3').get_json(), client.get('/stats').get_json(),
+                              len(client.get('/products').get_json()['products']), pages]))
+        """)
+        root = os.path.join(os.path.dirname(__file__), "..")
+        env = dict(os.environ, INVENTORY_SHARDS='2', PYTHONPATH=os.path.abspath(root))
+        result = subprocess.run([sys.executable, '-c', script], env=env, capture_output=True, text=True,
+                                timeout=120, check=True)
+        product, stats, count, pages = json.loads(result.stdout.splitlines()[-1])
+        self.assertEqual(product['price'], 3.0)
+        self.assertEqual((stats['products'], stats['units'], stats['stock_value']), (4, 10, 30.0))
+        self.assertEqual(count, 4)
+        self.assertEqual(pages, [[1, 2, 3, 4], [1, 2, 3, 4]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+# Add the path to the scripts folder
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from scripts.inventory_man import Product, Supplier, Inventory
+from scripts.columnar import ColumnarProductStore
+from scripts.snapshot import csv_to_snapshot, snapshot_to_csv
+
+class TestSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.inventory = Inventory()
+        self.inventory.add_product(Product(1, "Widget", "A simple widget", 10.0, 100))
+        self.inventory.add_product(Product(2, "Gadget", "Ein Gerät für 5 €", 20.5, 50))
+        self.inventory.add_product(Product(3, "Gizmo", "", 1.25, 0))
+        self.inventory.add_supplier(Supplier(1, "SupplierCo", "supplier@example.com"))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_save_and_load_snapshot(self):
+        path = os.path.join(self.directory, 'inventory.snap')
+        self.inventory.save_snapshot(path, meta={'seq': 7})
+        # Saving again replaces the previous snapshot
+        self.inventory.save_snapshot(path, meta={'seq': 8})
+
+        for store in (None, ColumnarProductStore()):
+            for mmap in (True, False):
+                loaded = Inventory(product_store=store)
+                report = loaded.load_snapshot(path, mmap=mmap)
+                self.assertEqual(report['products'], 3)
+                self.assertEqual(report['suppliers'], 1)
+                self.assertEqual(report['meta'], {'seq': 8})
+                self.assertEqual(loaded.get_all_products(), self.inventory.get_all_products())
+                self.assertEqual(loaded.get_all_suppliers(), self.inventory.get_all_suppliers())
+                self.assertIs(type(loaded.get_product(2).price), float)
+
+    def test_snapshot_is_fsynced(self):
+        path = os.path.join(self.directory, 'inventory.snap')
+        synced = set()
+        fsync = os.fsync
+
+        def record(fd):
+            synced.add(os.fstat(fd).st_ino)
+            fsync(fd)
+
+        with mock.patch('os.fsync', record):
+            self.inventory.save_snapshot(path)
+        # Every column, the snapshot directory and the directory it was
+        # renamed in
+        expected = {os.stat(os.path.join(path, name)).st_ino for name in os.listdir(path)}
+        expected |= {os.stat(path).st_ino, os.stat(self.directory).st_ino}
+        self.assertEqual(synced, expected)
+
+    def test_large_columnar_snapshot_is_mapped(self):
+        path = os.path.join(self.directory, 'inventory.snap')
+        inventory = Inventory(product_store=ColumnarProductStore())
+        inventory.products.extend_columns(range(5000), ["Item"] * 5000, ["Filler"] * 5000, [2.0] * 5000, [3] * 5000)
+        inventory.save_snapshot(path)
+
+        loaded = Inventory(product_store=ColumnarProductStore())
+        loaded.load_snapshot(path)
+        loaded.increase_price(50)
+        loaded.add_product(Product(5000, "New", "Added after load", 1.0, 1))
+        self.assertAlmostEqual(loaded.stock_value(), 5000 * 3.0 * 3 + 1.0)
+
+        # Changes to the mapped columns are private to the process
+        reloaded = Inventory(product_store=ColumnarProductStore())
+        reloaded.load_snapshot(path)
+        self.assertAlmostEqual(reloaded.stock_value(), 5000 * 2.0 * 3)
+
+    def test_convert_between_csv_and_snapshot(self):
+        product_file = os.path.join(self.directory, 'products.csv')
+        supplier_file = os.path.join(self.directory, 'suppliers.csv')
+        path = os.path.join(self.directory, 'inventory.snap')
+        self.inventory.save_to_csv(product_file, supplier_file)
+
+        csv_to_snapshot(product_file, supplier_file, path)
+        os.remove(product_file)
+        os.remove(supplier_file)
+        snapshot_to_csv(path, product_file, supplier_file)
+
+        loaded = Inventory()
+        loaded.load_from_csv(product_file, supplier_file)
+        self.assertEqual(loaded.get_all_products(), self.inventory.get_all_products())
+        self.assertEqual(loaded.get_all_suppliers(), self.inventory.get_all_suppliers())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,181 @@
+import sys
+import os
+import multiprocessing
+import shutil
+import tempfile
+import unittest
+
+# Add the path to the scripts folder
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from scripts.inventory_man import InsufficientStock, Product, Supplier, Inventory
+from scripts.sqlite_store import SQLiteLinkStore, SQLiteProductStore, SQLiteSupplierStore
+
+
+def open_inventory(path):
+    return Inventory(product_store=SQLiteProductStore(path), supplier_store=SQLiteSupplierStore(path),
+                     link_store=SQLiteLinkStore(path), thread_safe=True)
+
+
+def reserve_stock(path, rounds):
+    inventory = open_inventory(path)
+    for _ in range(rounds):
+        inventory.adjust_quantities({1: -1, 2: 1})
+
+
+def drain_stock(path, results):
+    inventory = open_inventory(path)
+    reserved = 0
+    while True:
+        try:
+            inventory.reserve(3, 1)
+        except InsufficientStock:
+            break
+        reserved += 1
+    results.put(reserved)
+
+
+class TestSQLiteStore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'inventory.db')
+        self.inventory = open_inventory(self.path)
+        self.inventory.add_product(Product(1, "Widget", "A simple widget", 10.0, 1000))
+        self.inventory.add_product(Product(2, "Gadget", "An advanced gadget", 20.0, 0))
+        self.inventory.add_product(Product(3, "gizmo", "A tiny gizmo", 2.5, 5))
+        self.inventory.add_supplier(Supplier(1, "SupplierCo", "supplier@example.com"))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_inventory_operations(self):
+        inventory = self.inventory
+        self.assertEqual(repr(inventory), "Inventory(Products=3, Suppliers=1)")
+        self.assertEqual(repr(inventory.products[0]), "Product(ID=1, Name=Widget, Description=A simple widget, Price=10.0, Quantity=1000)")
+        with self.assertRaises(ValueError):
+            inventory.add_product(Product(1, "Duplicate", "Same ID", 1.0, 1))
+
+        self.assertTrue(inventory.update_product(3, name="Gizmo XL", price=3.0))
+        self.assertFalse(inventory.update_product(9, name="Missing"))
+        self.assertTrue(inventory.remove_product(2))
+        self.assertFalse(inventory.remove_product(2))
+        inventory.increase_price(10)
+        self.assertEqual(inventory.get_product(3).name, "Gizmo XL")
+        self.assertAlmostEqual(inventory.stock_value(), 11.0 * 1000 + 3.3 * 5)
+        self.assertEqual(inventory.low_stock(10), [3])
+        self.assertTrue(inventory.update_supplier(1, contact_info="sales@supplier.com"))
+        self.assertEqual(inventory.get_all_suppliers(), ["Supplier(ID=1, Name=SupplierCo, Contact Info=sales@supplier.com)"])
+
+        # A second connection to the same database sees the same catalogue
+        self.assertEqual(open_inventory(self.path).get_all_products(), inventory.get_all_products())
+
+    def test_links_match_in_memory_index(self):
+        memory = Inventory()
+        for product in self.inventory.products:
+            memory.add_product(product)
+        memory.add_supplier(Supplier(1, "SupplierCo", "supplier@example.com"))
+        for inventory in (self.inventory, memory):
+            inventory.add_supplier(Supplier(2, "OtherCo", "other@example.com"))
+            for product_id, supplier_id in [(3, 1), (1, 1), (2, 1), (1, 2), (9, 2)]:
+                inventory.add_link(product_id, supplier_id)
+            self.assertTrue(inventory.add_link(1, 2))
+            self.assertTrue(inventory.remove_link(2, 1))
+            self.assertFalse(inventory.remove_link(2, 1))
+            inventory.remove_product(3)
+
+        # Other connections see the links, as the workers of the app do
+        shared = open_inventory(self.path)
+        self.assertEqual(shared.links.columns(), memory.links.columns())
+        self.assertEqual(len(shared.links), len(memory.links))
+        self.assertIn((1, 2), shared.links)
+        for supplier_id in (1, 2, 9):
+            self.assertEqual(shared.get_supplier_products(supplier_id), memory.get_supplier_products(supplier_id))
+        self.assertEqual(shared.get_supplier_products(1, after=0, limit=1), [1])
+        self.assertEqual(shared.get_product_suppliers(1), [1, 2])
+        self.assertEqual(shared.get_all_suppliers(as_dicts=True), memory.get_all_suppliers(as_dicts=True))
+
+        shared.remove_supplier(1)
+        self.assertEqual(self.inventory.get_product_suppliers(1), [2])
+        self.assertEqual(shared.links.remove_product(1), [2])
+        self.assertEqual(len(self.inventory.links), 0)
+
+    def test_search_matches_in_memory_index(self):
+        memory = Inventory()
+        for i in range(4, 60):
+            product = Product(i, f"{'Gear' if i % 3 else 'gadget'} {i}", f"Spare_part for item {i % 5}", 1.0, 1)
+            self.inventory.add_product(product)
+        for product in self.inventory.products:
+            memory.add_product(product)
+        # Changes made through another connection are searched too
+        other = open_inventory(self.path)
+        for inventory in (other, memory):
+            inventory.update_product(5, description="Now a gadget")
+            inventory.remove_product(8)
+
+        for query in ("gadget", "GEAR item 3", "ga", "spare_part it", "gizmo", "missing"):
+            expected = memory.search_products(query, limit=1000)
+            result = self.inventory.search_products(query, limit=1000)
+            self.assertEqual(result['total'], expected['total'])
+            self.assertEqual(sorted(p.product_id for p in result['products']),
+                             sorted(p.product_id for p in expected['products']))
+            self.assertEqual(result['scores'], sorted(result['scores'], reverse=True))
+        page = self.inventory.search_products("gadget", limit=3, offset=2)
+        self.assertEqual([repr(p) for p in page['products']],
+                         [repr(p) for p in self.inventory.search_products("gadget", limit=5)['products'][2:]])
+        # Names weigh more than descriptions
+        self.assertNotEqual(page['products'][0].product_id, 5)
+        self.assertEqual(self.inventory.search_products("  "), {'products': [], 'scores': [], 'total': 0})
+
+    def test_query_matches_in_memory_index(self):
+        memory = Inventory()
+        for i in range(4, 60):
+            product = Product(i, f"{'Gear' if i % 3 else 'gadget'} {i}", "Queried", float(i % 7), i % 11)
+            self.inventory.add_product(product)
+        for product in self.inventory.products:
+            memory.add_product(product)
+
+        for query in ({'sort': 'price'}, {'sort': 'name', 'descending': True}, {'name_prefix': 'GA', 'sort': 'quantity'},
+                      {'min_price': 2, 'max_price': 4, 'quantity_below': 6}):
+            expected = memory.query_products(limit=1000, **query)['products']
+            pages = []
+            after = None
+            while True:
+                page = self.inventory.query_products(limit=4, after=after, **query)
+                pages.extend(page['products'])
+                after = page['next']
+                if after is None:
+                    break
+            self.assertEqual([repr(p) for p in pages], [repr(p) for p in expected])
+
+    def test_processes_share_the_catalogue(self):
+        context = multiprocessing.get_context('spawn')
+        workers = [context.Process(target=reserve_stock, args=(self.path, 100)) for _ in range(3)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+            self.assertEqual(worker.exitcode, 0)
+
+        self.assertEqual(self.inventory.get_product(1).quantity, 700)
+        self.assertEqual(self.inventory.get_product(2).quantity, 300)
+
+    def test_processes_reserve_without_overselling(self):
+        self.inventory.adjust_quantity(3, 295)
+        context = multiprocessing.get_context('spawn')
+        results = context.Queue()
+        workers = [context.Process(target=drain_stock, args=(self.path, results)) for _ in range(3)]
+        for worker in workers:
+            worker.start()
+        reserved = [results.get(timeout=60) for _ in workers]
+        for worker in workers:
+            worker.join()
+            self.assertEqual(worker.exitcode, 0)
+
+        self.assertEqual(sum(reserved), 300)
+        self.assertEqual(self.inventory.get_product(3).quantity, 0)
+        self.assertIsNone(self.inventory.reserve(99, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()